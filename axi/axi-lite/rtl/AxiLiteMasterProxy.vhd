@@ -100,8 +100,13 @@ begin
       axiSlaveRegisterR(axilEp, X"04", 1, r.resp);
       axiSlaveRegister (axilEp, X"08", 0, v.addr);
       axiSlaveRegister (axilEp, X"0C", 0, v.data);
+      -- Command register after Addr/Data: a single block write to 0x08-0x10 starts the transaction
+      axiSlaveRegister (axilEp, X"10", 0, v.rnw);
+      -- Capabilities: BIT0 = command register at 0x10
+      axiSlaveRegisterR(axilEp, X"14", 0, toSlv(1, 32));
       newCmd := '0';
       axiWrDetect (axilEp, X"00", newCmd);
+      axiWrDetect (axilEp, X"10", newCmd);
 
       -- Close out the transaction
       axiSlaveDefault(axilEp, v.sAxiWriteSlave, v.sAxiReadSlave, AXI_RESP_OK_C);
@@ -30,6 +30,7 @@ entity AxiMicronN25QCore is
       EN_PASSWORD_LOCK_G : boolean          := false;
       PASSWORD_LOCK_G    : slv(31 downto 0) := x"DEADBEEF";
       MEM_ADDR_MASK_G    : slv(31 downto 0) := x"00000000";
+      EN_CRC_G           : boolean          := false;     -- Enable the CRC32 checksum engine
       AXI_CLK_FREQ_G     : real             := 200.0E+6;  -- units of Hz
       SPI_CLK_FREQ_G     : real             := 25.0E+6);  -- units of Hz
    port (
@@ -71,6 +72,7 @@ begin
          EN_PASSWORD_LOCK_G => EN_PASSWORD_LOCK_G,
          PASSWORD_LOCK_G    => PASSWORD_LOCK_G,
          MEM_ADDR_MASK_G    => MEM_ADDR_MASK_G,
+         EN_CRC_G           => EN_CRC_G,
          AXI_CLK_FREQ_G     => AXI_CLK_FREQ_G,
          SPI_CLK_FREQ_G     => SPI_CLK_FREQ_G)
       port map(
@@ -28,6 +28,7 @@ entity AxiMicronN25QReg is
       EN_PASSWORD_LOCK_G : boolean          := false;
       PASSWORD_LOCK_G    : slv(31 downto 0) := x"DEADBEEF";
       MEM_ADDR_MASK_G    : slv(31 downto 0) := x"00000000";
+      EN_CRC_G           : boolean          := false;     -- Enable the CRC32 checksum engine
       AXI_CLK_FREQ_G     : real             := 200.0E+6;  -- units of Hz
       SPI_CLK_FREQ_G     : real             := 25.0E+6);  -- units of Hz
    port (
@@ -84,6 +85,14 @@ architecture rtl of AxiMicronN25QReg is
       raddr         : slv(8 downto 0);
       xferSize      : slv(8 downto 0);
       ramDin        : slv(7 downto 0);
+      -- CRC Signals
+      crcSize       : slv(31 downto 0);
+      crcCnt        : slv(31 downto 0);
+      crcBusy       : sl;
+      crcData       : sl;
+      crcReset      : sl;
+      crcValid      : sl;
+      crcByte       : slv(7 downto 0);
       -- SPI Signals
       busy          : sl;
       csL           : sl;
@@ -115,6 +124,14 @@ architecture rtl of AxiMicronN25QReg is
       raddr         => (others => '0'),
       xferSize      => (others => '0'),
       ramDin        => (others => '0'),
+      -- CRC Signals
+      crcSize       => (others => '0'),
+      crcCnt        => (others => '0'),
+      crcBusy       => '0',
+      crcData       => '0',
+      crcReset      => '0',
+      crcValid      => '0',
+      crcByte       => (others => '0'),
       -- SPI Signals
       busy          => '0',
       csL           => '1',
@@ -132,6 +149,7 @@ architecture rtl of AxiMicronN25QReg is
    signal rin : RegType;
 
    signal ramDout : slv(7 downto 0);
+   signal crcOut  : slv(31 downto 0);
 
    -- attribute dont_touch      : string;
    -- attribute dont_touch of r : signal is "true";
@@ -141,8 +159,8 @@ begin
    -------------------------------
    -- Configuration Register
    -------------------------------
-   comb : process (axiReadMaster, axiRst, axiWriteMaster, busyIn, miso, r,
-                   ramDout) is
+   comb : process (axiReadMaster, axiRst, axiWriteMaster, busyIn, crcOut, miso,
+                   r, ramDout) is
       variable v            : RegType;
       variable axiStatus    : AxiLiteStatusType;
       variable axiWriteResp : slv(1 downto 0);
@@ -155,6 +173,8 @@ begin
       axiWriteResp := AXI_RESP_OK_C;
       axiReadResp  := AXI_RESP_OK_C;
       v.we         := '0';
+      v.crcReset   := '0';
+      v.crcValid   := '0';
 
       -- Shift register
       v.rd(1) := r.rd(0);
@@ -205,6 +225,28 @@ begin
                         end if;
                         -- Next state
                         v.state := SCK_LOW_S;
+                     when x"10" =>
+                        if EN_CRC_G then
+                           v.crcSize := axiWriteMaster.wdata;
+                        else
+                           axiWriteResp := AXI_RESP_DECERR_C;
+                        end if;
+                     when x"14" =>
+                        if EN_CRC_G then
+                           -- Restart the checksum
+                           v.crcReset := '1';
+                           -- Continuous read of crcSize bytes from the addr register
+                           if (r.crcSize /= 0) then
+                              v.RnW     := '1';  -- Don't update the RAM
+                              v.cmd     := axiWriteMaster.wdata(23 downto 16);
+                              v.crcCnt  := r.crcSize;
+                              v.crcBusy := '1';
+                              -- Next state
+                              v.state   := SCK_LOW_S;
+                           end if;
+                        else
+                           axiWriteResp := AXI_RESP_DECERR_C;
+                        end if;
                      when others =>
                         axiWriteResp := AXI_RESP_DECERR_C;
                   end case;
@@ -231,6 +273,19 @@ begin
                         v.axiReadSlave.rdata := r.addr;
                      when x"0C" =>
                         v.axiReadSlave.rdata(7 downto 0) := r.status;
+                     when x"10" =>
+                        if EN_CRC_G then
+                           v.axiReadSlave.rdata := r.crcSize;
+                        else
+                           axiReadResp := AXI_RESP_DECERR_C;
+                        end if;
+                     when x"18" =>
+                        if EN_CRC_G then
+                           -- Byte swapped to match the standard (e.g. zlib.crc32) CRC32 value
+                           v.axiReadSlave.rdata := endianSwap(crcOut);
+                        else
+                           axiReadResp := AXI_RESP_DECERR_C;
+                        end if;
                      when others =>
                         axiReadResp := AXI_RESP_DECERR_C;
                   end case;
@@ -364,8 +419,34 @@ begin
                   v.cnt     := r.cnt + 1;
                   -- Set the flag
                   v.rd(0)   := '1';
+                  -- Check for checksum read
+                  if (r.crcBusy = '1') then
+                     -- Check for the end of the command/address header
+                     if (r.addr32BitMode = '1' and r.cnt = 4) or (r.addr32BitMode = '0' and r.cnt = 3) then
+                        v.crcData := '1';
+                     end if;
+                     -- Check for a data byte
+                     if (r.crcData = '1') then
+                        -- Hold the counter (header already sent)
+                        v.cnt      := r.cnt;
+                        -- Forward the byte to the CRC
+                        v.crcValid := '1';
+                        v.crcByte  := v.ramDin;
+                        -- Decrement the counter
+                        v.crcCnt   := r.crcCnt - 1;
+                        -- Check for the last byte
+                        if (r.crcCnt = 1) then
+                           -- Reset the flags
+                           v.crcBusy := '0';
+                           v.crcData := '0';
+                           -- Reset the counter
+                           v.cnt     := (others => '0');
+                           -- Next state
+                           v.state   := MIN_CS_WIDTH_S;
+                        end if;
+                     end if;
                   -- Check the xfer size
-                  if r.cnt = r.xferSize then
+                  elsif r.cnt = r.xferSize then
                      -- Reset the counter
                      v.cnt   := (others => '0');
                      -- Next state
@@ -445,4 +526,23 @@ begin
          addrb => r.raddr,
          doutb => ramDout);
 
+   GEN_CRC : if (EN_CRC_G = true) generate
+      U_Crc32 : entity surf.Crc32Parallel
+         generic map (
+            TPD_G            => TPD_G,
+            BYTE_WIDTH_G     => 1,
+            INPUT_REGISTER_G => false)
+         port map (
+            crcOut       => crcOut,
+            crcClk       => axiClk,
+            crcDataValid => r.crcValid,
+            crcDataWidth => "000",
+            crcIn        => r.crcByte,
+            crcReset     => r.crcReset);
+   end generate;
+
+   NO_CRC : if (EN_CRC_G = false) generate
+      crcOut <= (others => '0');
+   end generate;
+
 end rtl;
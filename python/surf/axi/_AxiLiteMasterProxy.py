@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 import pyrogue as pr
 import rogue
+import surf.misc
 
 import threading
 import time
@@ -19,6 +20,9 @@ class _Regs(pr.Device):
         super().__init__(**kwargs)
 
         self._pollPeriod = pollPeriod
+        self._cmdReg     = None
+        self._monitor    = None
+        self._polls      = 0
 
         self._queue = queue.Queue()
         self._pollThread = threading.Thread(target=self._pollWorker)
@@ -76,73 +80,112 @@ class _Regs(pr.Device):
             groups    = ['NoStream','NoState','NoConfig'],
         ))
 
+        self.add(pr.RemoteVariable(
+            name      = 'Capabilities',
+            mode      = 'RO',
+            offset    = 0x14,
+            bitOffset = 0,
+            bitSize   = 32,
+            groups    = ['NoStream','NoState','NoConfig'],
+        ))
+
     def proxyTransaction(self, transaction):
-        self._queue.put(transaction)
+        self._queue.put((time.monotonic(), transaction))
+        if self._monitor is not None:
+            self._monitor.queued()
 
     def _pollWorker(self):
         while True:
-            #print('Main thread loop start')
-            transaction = self._queue.get()
-            if transaction is None:
+            item = self._queue.get()
+            if item is None:
                 return
+            queued, transaction = item
+            self._polls = 0
+            error = None
             with self._memLock, transaction.lock():
-                #tranId = transaction.id()
-                #print(f'Woke the pollWorker with id: {tranId}')
-
-                # Get the transaction address and write it to the proxy address register
-                addr = transaction.address()
-                #print('Writing address')
-                self.Addr.set(addr, write=True)
-                #print(f'Wrote address {addr:x}')
 
                 if transaction.type() == rogue.interfaces.memory.Write:
-                    # Convert data bytes to int and write data to proxy register
-                    dataBa = bytearray(4)
-                    transaction.getData(dataBa, 0)
-                    data = int.from_bytes(dataBa, 'little', signed=False)
-                    self.Data.set(data, write=True)
-                    #print(f'Wrote data {data:x}')
-
-                    # Kick off the proxy transaction
-                    self.Rnw.setDisp('Write', write=True)
-                    #print(f'Started write transaction: {tranId}')
-
+                    isRead = False
                 elif (transaction.type() == rogue.interfaces.memory.Read) or (transaction.type() == rogue.interfaces.memory.Verify):
-
-                    # Kick off the read proxy txn
-                    self.Rnw.setDisp('Read', write=True)
-                    #print(f'Started read transaction: {tranId}')
-
+                    isRead = True
                 else:
                     # Post transactions not allowed
-                    transaction.error(f'Unsupported transaction type {transaction.type()}')
-                    return
-
-                # Poll done register
-                # Probably need some timeout here
-                done = False
-                while done is False:
-                    done = self.Done.get(read=True)
-                    #print(f'Polled done: {done}')
-                    time.sleep(self._pollPeriod)
-
-                # Check for error flags
-                resp = self.Resp.get(read=True)
-                #print(f'Resp: {resp}')
-                if resp != 0:
-                    transaction.error(f'AXIL tranaction failed with RESP: {resp}')
-
-                # Finish the transaction
-                elif self.Rnw.valueDisp() == 'Write':
-                    transaction.done()
+                    error = f'Unsupported transaction type {transaction.type()}'
+                    transaction.error(error)
+                    self._completed(transaction, queued, error)
+                    continue
+
+                # Check once for the command register (folded Addr/Data/Rnw write)
+                if self._cmdReg is None:
+                    self._cmdReg = self._readCapabilities() & 0x1
+
+                data = bytearray(transaction.size())
+                if not isRead:
+                    transaction.getData(data, 0)
+
+                # Split the transaction into 32-bit proxy transactions
+                for i in range(0, len(data), 4):
+                    error = self._proxyWord(transaction.address()+i, data, i, isRead)
+                    if error is not None:
+                        transaction.error(error)
+                        break
                 else:
-                    data = self.Data.get(read=True)
-                    #print(f'Got read data: {data:x}')
-                    dataBa = bytearray(data.to_bytes(4, 'little', signed=False))
-                    #print(dataBa)
-                    transaction.setData(dataBa, 0)
+                    if isRead:
+                        transaction.setData(data, 0)
                     transaction.done()
-
+                self._completed(transaction, queued, error)
+
+    def _completed(self, transaction, queued, error):
+        if self._monitor is not None:
+            self._monitor.completed(transaction.type(), time.monotonic()-queued, self._polls, error is not None)
+
+    def _proxyWord(self, addr, data, index, isRead):
+        rnw  = (1 if isRead else 0).to_bytes(4, 'little', signed=False)
+        word = bytes(4) if isRead else bytes(data[index:index+4])
+
+        # Kick off the proxy transaction
+        if self._cmdReg:
+            # Addr, Data and Rnw (command register) in one block write
+            cmd = bytearray(addr.to_bytes(4, 'little', signed=False) + word + rnw)
+            self._reqTransaction(self.offset | 0x08, cmd, len(cmd), 0, rogue.interfaces.memory.Write)
+        else:
+            cmd = bytearray(addr.to_bytes(4, 'little', signed=False) + word)
+            self._reqTransaction(self.offset | 0x08, cmd, len(cmd), 0, rogue.interfaces.memory.Write)
+            kick = bytearray(rnw)
+            self._reqTransaction(self.offset | 0x00, kick, len(kick), 0, rogue.interfaces.memory.Write)
+
+        # Poll Done/Resp and Data with one block read (in flight with the command)
+        status = bytearray(12)
+        while True:
+            self._reqTransaction(self.offset | 0x04, status, len(status), 0, rogue.interfaces.memory.Read)
+            self._waitTransaction(0)
+            self._polls += 1
+            error = self._getError()
+            if error:
+                self._clearError()
+                return error
+            if status[0] & 0x1:
+                break
+            time.sleep(self._pollPeriod)
+
+        # Check for error flags
+        resp = (status[0] >> 1) & 0x3
+        if resp != 0:
+            return f'AXIL tranaction failed with RESP: {resp}'
+
+        if isRead:
+            data[index:index+4] = status[8:12]
+        return None
+
+    def _readCapabilities(self):
+        # Older firmware does not have the capabilities register (reads back zero)
+        caps = bytearray(4)
+        self._reqTransaction(self.offset | 0x14, caps, len(caps), 0, rogue.interfaces.memory.Read)
+        self._waitTransaction(0)
+        if self._getError():
+            self._clearError()
+            return 0
+        return int.from_bytes(caps, 'little', signed=False)
 
     def _stop(self):
         self._queue.put(None)
@@ -151,8 +194,9 @@ class _Regs(pr.Device):
 
 class _ProxySlave(rogue.interfaces.memory.Slave):
 
-    def __init__(self, regs):
-        super().__init__(4,4)
+    def __init__(self, regs, maxAccess):
+        # Transactions larger than one word are split by the poll worker
+        super().__init__(4,maxAccess)
         self._regs = regs
 
     def _doTransaction(self, transaction):
@@ -161,7 +205,7 @@ class _ProxySlave(rogue.interfaces.memory.Slave):
 
 class AxiLiteMasterProxy(pr.Device):
 
-    def __init__(self, hidden=True, pollPeriod=0.0, **kwargs):
+    def __init__(self, hidden=True, pollPeriod=0.0, maxAccess=4096, **kwargs):
         super().__init__(hidden=hidden, **kwargs)
 
         self.add(_Regs(
@@ -171,7 +215,14 @@ class AxiLiteMasterProxy(pr.Device):
             hidden  = hidden,
             pollPeriod = pollPeriod,
         ))
-        self.proxy = _ProxySlave(self.Regs)
+        self.proxy = _ProxySlave(self.Regs, maxAccess)
+
+        self.add(surf.misc.ProxyMonitor(
+            name   = 'Monitor',
+            queue  = self.Regs._queue,
+            expand = False,
+        ))
+        self.Regs._monitor = self.Monitor
 
     def add(self, node):
         pr.Node.add(self, node)
@@ -14,6 +14,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 class AxiRingBuffer(pr.Device):
     def __init__(self, **kwargs):
@@ -153,3 +154,6 @@ class AxiRingBuffer(pr.Device):
             bitOffset    = 0,
             function     = lambda cmd: cmd.post(1),
         ))
+
+        # Status registers polled with one block read
+        surf.misc.PollGroupLayout(self).apply()
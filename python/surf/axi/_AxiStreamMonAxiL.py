@@ -14,6 +14,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 class AxiStreamMonChannel(pr.Device):
     def __init__(self, **kwargs):
@@ -154,6 +155,9 @@ class AxiStreamMonChannel(pr.Device):
             pollInterval = 1,
         ))
 
+        # Status registers polled with one block read
+        surf.misc.PollGroupLayout(self).apply()
+
     @staticmethod
     def convMbps(var, read):
         return var.dependencies[0].get(read=read) * 8e-6
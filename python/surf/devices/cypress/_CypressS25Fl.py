@@ -36,7 +36,14 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
         self.FLAG_STATUS_RDY = (0x01)
         self.BRAC_CMD        = (0xB9 << 16)
 
-    def _LoadMcsFile(self,arg,iprogPrint=True):
+        # Largest S25FL erase sector (256kB), so that the differential mode
+        # never erases a sector that is shared with a skipped one
+        self.SECTOR_SIZE     = 0x40000
+
+        # Typical S25FL page program and sector erase times
+        self._flashReady.typical.update({'program': 0.25e-3, 'erase': 0.13})
+
+    def _LoadMcsFile(self,arg,iprogPrint=True,diffMode=False,streamMode=False):
 
         click.secho( f'LoadMcsFile: {arg}', fg='green')
         self._progDone = False
@@ -45,7 +52,7 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
         start = time.time()
 
         # Reset the SPI interface
-        self.resetFlash()
+        self.promBeginProgram()
 
         # Print the status registers
         print("CypressS25Fl Manufacturer ID Code  = {}".format(hex(self.getManufacturerId())))
@@ -53,22 +60,22 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
         print("CypressS25Fl Manufacturer Capacity = {}".format(hex(self.getManufacturerCapacity())))
         print("CypressS25Fl Status Register       = {}".format(hex(self.getPromStatusReg())))
 
-        # Open the MCS file
-        self._mcs.open(arg)
+        if streamMode:
+            # Decode the MCS file while the PROM is being erased, written and verified
+            self._prog.programStream(lambda: self._mcs.stream(arg, self.PAGE_SIZE))
 
-        # Erase the PROM
-        self.eraseProm()
-
-        # Write to the PROM
-        self.writeProm()
+        else:
+            # Open the MCS file
+            self._mcs.open(arg)
 
-        # Verify the PROM
-        self.verifyProm()
+            # Erase, write and verify the PROM (only the changed sectors in diffMode)
+            self._prog.program(self._mcs.image, diffMode=diffMode)
 
         # End time measurement for profiling
         end = time.time()
         elapsed = end - start
         click.secho( f'LoadMcsFile() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        click.secho( self._flashReady.summary(), fg='green')
 
         # Add a power cycle reminder
         self._progDone = True
@@ -100,11 +107,9 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
         else:
             self.setCmd(self.WRITE_MASK|self.BRAC_CMD)
 
-    def waitForFlashReady(self):
-        while True:
-            # Get the status register
-            self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
-            status = (self.getCmdReg()&0xFF)
-            # Check if not busy
-            if ( (status & self.FLAG_STATUS_RDY) == 0 ): # active Low READY
-                break
+    def _isFlashReady(self):
+        # Get the status register
+        self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
+        status = (self.getCmdReg()&0xFF)
+        # Check if not busy
+        return ( (status & self.FLAG_STATUS_RDY) == 0 ) # active Low READY
@@ -15,15 +15,18 @@
 
 import pyrogue   as pr
 import surf.misc
+import numpy     as np
 import click
 import time
 import datetime
-import math
 
-class AxiMicronMt28ew(pr.Device):
+class AxiMicronMt28ew(pr.Device, surf.misc.PromBackend):
     def __init__(self,
                  description = "AXI-Lite Micron MT28EW (or Cypress S29G) PROM",
                  tryCount    = 5,
+                 readyTimeout= 10.0, # Maximum time (seconds) to wait for the flash to become ready
+                 layout      = None, # Multi-boot surf.misc.PromLayout (enables LoadPartition)
+                 axiVersion  = None, # AxiVersion device used for FpgaReloadAtAddress() after LoadPartition
                  hidden      = True,
                  **kwargs):
 
@@ -35,6 +38,22 @@ class AxiMicronMt28ew(pr.Device):
         self._mcs = surf.misc.McsReader()
         self._progDone = False
         self._tryCount = tryCount
+        self._prog     = surf.misc.PromProgrammer(self, name=self.name)
+        self._layout = layout
+        self._axiVersion = axiVersion
+
+        # Typical MT28EW word program and 64-kword block erase times
+        self._flashReady = surf.misc.FlashReadyWait(
+            name    = self.name,
+            typical = {'program': 25e-6, 'erase': 0.8},
+            timeout = readyTimeout,
+        )
+
+        # PROM geometry (see surf.misc.PromBackend)
+        self.PAGE_SIZE   = 512     # 256 x 16-bit words per burst
+        self.ERASE_SIZE  = 0x20000 # Uniform 64-kword per block
+        self.SECTOR_SIZE = 0x20000 # Granularity of the differential programming mode
+        self.WORD_SIZE   = 2       # Only complete 16-bit words are compared
 
         ##############################
         # Setup variables
@@ -128,29 +147,140 @@ class AxiMicronMt28ew(pr.Device):
             value       = '',
         ))
 
-    def _LoadMcsFile(self,arg,iprogPrint=True):
-        click.secho( f'{self.path}.LoadMcsFile: {arg}', fg='green')
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileDiff',
+            function    = self._LoadMcsFileDiff,
+            description = 'Load the .MCS into PROM, only erasing and writing the sectors that differ from the PROM contents',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileStream',
+            function    = self._LoadMcsFileStream,
+            description = 'Load the .MCS into PROM, decoding the file while the PROM is being erased and written',
+            value       = '',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpAddress',
+            description = 'Start byte address of the DumpProm readback',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpSize',
+            description = 'Number of bytes read back by DumpProm',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'DumpProm',
+            function    = self._DumpProm,
+            description = 'Read back DumpSize bytes from DumpAddress into a .bin, .mcs or .mcs.gz file',
+            value       = '',
+        ))
+
+        if layout is not None:
+            self.add(pr.LocalVariable(
+                name        = 'Partition',
+                description = 'Target partition of LoadPartition: ' + ', '.join(p.name for p in layout),
+                mode        = 'RW',
+                value       = next(iter(layout)).name,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalVariable(
+                name        = 'PartitionReload',
+                description = 'Reload the FPGA from the partition after LoadPartition',
+                mode        = 'RW',
+                value       = False,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalCommand(
+                name        = 'LoadPartition',
+                function    = self._LoadPartition,
+                description = 'Load the .MCS (or .bin/.bit) into the Partition only, and check that the other partitions are unchanged',
+                value       = '',
+            ))
+
+    def _LoadMcsFileDiff(self,arg):
+        self._LoadMcsFile(arg, diffMode=True)
+
+    def _LoadMcsFileStream(self,arg):
+        self._LoadMcsFile(arg, streamMode=True)
+
+    def _DumpProm(self,arg):
+        click.secho( f'{self.path}.DumpProm: {arg}', fg='green')
+
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
+
+        # Read back the PROM and save it
+        image = self._prog.dump(self.DumpAddress.get(), self.DumpSize.get())
+        surf.misc.McsWriter().write(arg, image)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'DumpProm() took {datetime.timedelta(seconds=int(elapsed))} to read 0x{image.size:x} bytes', fg='green')
+
+    def _LoadPartition(self,arg):
+        partition = self._layout[self.Partition.get()]
+        click.secho( f'{self.path}.LoadPartition: {arg} -> {partition.name}', fg='green')
         self._progDone = False
 
         # Start time measurement for profiling
         start = time.time()
+        self.promBeginProgram()
 
-        # Open the MCS file
+        # Open the file and program the partition
         self._mcs.open(arg)
+        self._prog.programPartition(self._mcs.image, self._layout, partition.name)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'LoadPartition() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        self._progDone = True
+
+        # Optionally boot the FPGA from the new image
+        if self.PartitionReload.get():
+            if self._axiVersion is None:
+                click.secho( f'{self.path}: no axiVersion device for FpgaReloadAtAddress()', fg='red')
+            else:
+                click.secho( f'Reloading the FPGA from address 0x{partition.reloadAddress:x}', fg='green')
+                self._axiVersion.FpgaReloadAtAddress(partition.reloadAddress)
+
+    def _LoadMcsFile(self,arg,iprogPrint=True,diffMode=False,streamMode=False):
+        click.secho( f'{self.path}.LoadMcsFile: {arg}', fg='green')
+        self._progDone = False
 
-        # Erase the PROM
-        self.eraseProm()
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
 
-        # Write to the PROM
-        self.bufferedWriteProm()
+        if streamMode:
+            # Decode the MCS file while the PROM is being erased, written and verified
+            self._prog.programStream(lambda: self._mcs.stream(arg, self.PAGE_SIZE))
 
-        # Verify the PROM
-        self.bufferedVerifyProm()
+        else:
+            # Open the MCS file
+            self._mcs.open(arg)
+
+            # Erase, write (buffered) and verify the PROM (only the changed sectors in diffMode)
+            self._prog.program(self._mcs.image, diffMode=diffMode)
 
         # End time measurement for profiling
         end = time.time()
         elapsed = end - start
         click.secho( f'LoadMcsFile() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        click.secho( self._flashReady.summary(), fg='green')
 
         # Add a power cycle reminder
         self._progDone = True
@@ -174,25 +304,7 @@ class AxiMicronMt28ew(pr.Device):
         self._writeToFlash(0x555,0xF0)
 
     def eraseProm(self):
-        # Reset the PROM
-        self._resetCmd()
-        # Set the starting address index
-        address    = self._mcs.startAddr >> 1
-        # Uniform block size of 64-kword/block
-        ERASE_SIZE = 0x10000
-        # Setup the status bar
-        with click.progressbar(
-            iterable = range(math.ceil(self._mcs.size/ERASE_SIZE)),
-            label    = click.style('Erasing PROM:  ', fg='green'),
-        ) as bar:
-            for i in bar:
-                # Execute the erase command
-                self._eraseCmd(address)
-                # Increment by one block
-                address += ERASE_SIZE
-        # Check the corner case
-        if ( address< (self._mcs.endAddr>>1) ):
-            self._eraseCmd(address)
+        self._prog.erase(self._mcs.image)
 
     # Erase Command
     def _eraseCmd(self, address):
@@ -202,59 +314,11 @@ class AxiMicronMt28ew(pr.Device):
         self._writeToFlash(0x555,0xAA)
         self._writeToFlash(0x2AA,0x55)
         self._writeToFlash(address,0x30)
+        self._flashReady.start('erase')
         self.waitForFlashReady()
 
     def bufferedWriteProm(self):
-        # Reset the PROM
-        self._resetCmd()
-        # Create a burst data array
-        dataArray = self.BurstData.get(read=False)
-
-        # Set the block transfer size
-        self.TranSize.set(0xFF)
-
-        # Setup the status bar
-        with click.progressbar(
-            length   = self._mcs.size,
-            label    = click.style('Writing PROM:  ', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                if ( (i&0x1) == 0):
-                    # Check for first byte of burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-                        # Get the start bursting address
-                        addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                        # Reset the counter
-                        cnt = 0
-                    # Get the data from MCS file
-                    dataArray[cnt] = int(self._mcs.entry[i][1]) & 0xFF
-                else:
-                    # Get the data from MCS file
-                    dataArray[cnt] |= (int(self._mcs.entry[i][1])   << 8)
-                    cnt += 1
-                    # Check for the last byte
-                    if ( cnt == 256 ):
-
-                        # Write burst data
-                        self.BurstData.set(dataArray)
-                        # Start a burst transfer
-                        self.BurstTran.set(0x7FFFFFFF&addr)
-
-            # Check for leftover data
-            if (cnt != 256):
-                # Fill the rest of the data array with ones
-                for i in range(cnt, 256):
-                    dataArray[i] = 0xFFFF
-
-                # Write burst data
-                self.BurstData.set(dataArray)
-                # Start a burst transfer
-                self.BurstTran.set(0x7FFFFFFF&addr)
-
-            # Close the status bar
-            bar.update(self._mcs.size)
+        self._prog.write(self._mcs.image)
 
     def writeProm(self):
         # Reset the PROM
@@ -277,6 +341,7 @@ class AxiMicronMt28ew(pr.Device):
                     self._writeToFlash(0x2AA,0x55)
                     self._writeToFlash(0x555,0xA0)
                     self._writeToFlash(addr,data)
+                    self._flashReady.start('program')
                     self.waitForFlashReady()
 
                 # Check for burst transfer
@@ -288,79 +353,80 @@ class AxiMicronMt28ew(pr.Device):
             bar.update(self._mcs.size)
 
     def bufferedVerifyProm(self):
+        self._prog.verify(self._mcs.image, name='bufferedVerifyProm()')
+
+    def verifyProm(self):
         # Reset the PROM
         self._resetCmd()
 
-        # Set the data bus
-        self.DataWrBus.set(0xFFFFFFFF)
-        # Set the block transfer size
-        self.TranSize.set(0xFF)
+        # 512 bytes (256 x 16-bit words) per status bar update
+        PAGE_SIZE = 512
+        # Collect all the mismatches
+        report = surf.misc.PromVerifyReport(sectorSize=self.SECTOR_SIZE)
 
         # Setup the status bar
         with click.progressbar(
             length  = self._mcs.size,
             label   = click.style('Verifying PROM:', fg='green'),
         ) as bar:
-            for i in range(self._mcs.size):
-
-                if ( (i&0x1) == 0):
-                    # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
-
-                    # Check for burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-
-                        # Start a burst transfer
-                        self.BurstTran.set(0x80000000|addr)
-
-                        # Get the data
-                        dataArray = self.BurstData.get()
-
-                else:
-                    # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
-                    # Get the prom data from data array
-                    prom = dataArray[(i&0x1FF)>>1]
-                    # Compare PROM to file
-                    if (data != prom):
-                        click.secho(f'\nAddr = 0x{addr:x}: MCS = 0x{data:x} != PROM = 0x{prom:x}', fg='red')
-                        raise surf.misc.McsException('bufferedVerifyProm() Failed\n\n')
+            for i, (addr, data) in enumerate(self._mcs.image.chunks(PAGE_SIZE)):
+                # Only complete 16-bit words are compared
+                data = data[:len(data)&~0x1]
+                # Read the 16-bit words one at a time (16-bit word addressing at the PROM)
+                prom = np.array([self._readFromFlash((addr>>1)+j) for j in range(len(data)>>1)], dtype='<u2').view(np.uint8)
+                # Compare PROM to file
+                report.compare(addr, data, prom)
+                # Throttle down printf rate
+                if ( (i&0x7) == 0x7 ):
+                    bar.update(8*PAGE_SIZE)
             # Close the status bar
             bar.update(self._mcs.size)
-
-    def verifyProm(self):
+        # Report the mismatches
+        self._prog.report = report
+        report.check('verifyProm()')
+
+    def diffProm(self):
+        self._prog.diff(self._mcs.image)
+
+    #########################################
+    # PromBackend interface
+    #########################################
+    def promEraseBlock(self, address):
+        # 16-bit word addressing at the PROM
+        self._eraseCmd(address>>1)
+
+    def promWritePage(self, address, page):
+        # Pack the 512 bytes into little-endian 16-bit words
+        self.BurstData.set(page.view('<u2').astype(np.uint32))
+        # Start a burst transfer (16-bit word addressing at the PROM)
+        self.BurstTran.set(0x7FFFFFFF&(address>>1))
+
+    def promReadPage(self, address):
+        # Start a burst transfer (16-bit word addressing at the PROM)
+        self.BurstTran.set(0x80000000|(address>>1))
+        # Unpack the 256 little-endian 16-bit words into bytes
+        return np.asarray(self.BurstData.get(), dtype=np.uint32).astype('<u2').view(np.uint8)
+
+    def promBeginProgram(self):
+        self._flashReady.resetStats()
+
+    def promBeginErase(self):
         # Reset the PROM
         self._resetCmd()
-        # Setup the status bar
-        with click.progressbar(
-            length  = self._mcs.size,
-            label   = click.style('Verifying PROM:', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                if ( (i&0x1) == 0):
-                    # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
-                else:
-                    # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
-                    # Get the prom data from data array
-                    prom = self._readFromFlash(addr)
-                    # Compare PROM to file
-                    if (data != prom):
-                        click.secho(f'\nAddr = 0x{addr:x}: MCS = 0x{data:x} != PROM = 0x{prom:x}', fg='red')
-                        raise surf.misc.McsException('verifyProm() Failed\n\n')
 
-                # Check for burst transfer
-                if ( (i&0x1FF) == 0):
-                    # Throttle down printf rate
-                    bar.update(0x1FF)
+    def promBeginWrite(self):
+        # Reset the PROM
+        self._resetCmd()
+        # Set the block transfer size
+        self.TranSize.set(0xFF)
 
-            # Close the status bar
-            bar.update(self._mcs.size)
+    def promBeginRead(self):
+        # Reset the PROM
+        self._resetCmd()
+        # Set the data bus
+        self.DataWrBus.set(0xFFFFFFFF)
+        # Set the block transfer size
+        self.TranSize.set(0xFF)
 
     # Generic FLASH write Command
     def _writeToFlash(self, addr, data):
@@ -377,8 +443,9 @@ class AxiMicronMt28ew(pr.Device):
         return self.DataRdBus.get()&0xFFFF
 
     def waitForFlashReady(self):
-        while True:
-            self._writeToFlash(0x555,0x70)
-            status = self._readFromFlash(0x555)
-            if ( (status&0x80) != 0 ):
-                break
+        self._flashReady.wait(self._isFlashReady)
+
+    def _isFlashReady(self):
+        self._writeToFlash(0x555,0x70)
+        status = self._readFromFlash(0x555)
+        return ( (status&0x80) != 0 )
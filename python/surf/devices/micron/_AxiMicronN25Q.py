@@ -15,16 +15,20 @@
 
 import pyrogue   as pr
 import surf.misc
+import numpy     as np
 import click
 import time
 import datetime
-import math
 
-class AxiMicronN25Q(pr.Device):
+class AxiMicronN25Q(pr.Device, surf.misc.PromBackend):
     def __init__(self,
             description = "AXI-Lite Micron N25Q and Micron MT25Q PROM",
             addrMode    = True, # False = 24-bit Address mode, True = 32-bit Address Mode
             tryCount    = 5,
+            readyTimeout= 10.0, # Maximum time (seconds) to wait for the flash to become ready
+            layout      = None, # Multi-boot surf.misc.PromLayout (enables LoadPartition)
+            axiVersion  = None, # AxiVersion device used for FpgaReloadAtAddress() after LoadPartition
+            crcEngine   = False, # True if the firmware is built with EN_CRC_G = true (CRC32 verify)
             hidden      = True,
             **kwargs):
 
@@ -37,6 +41,17 @@ class AxiMicronN25Q(pr.Device):
         self._addrMode = addrMode
         self._progDone = False
         self._tryCount = tryCount
+        self._prog     = surf.misc.PromProgrammer(self, name=self.name)
+        self._layout     = layout
+        self._axiVersion = axiVersion
+        self._crcEngine  = crcEngine
+
+        # Typical MT25Q page program and 64kB sector erase times
+        self._flashReady = surf.misc.FlashReadyWait(
+            name    = self.name,
+            typical = {'program': 0.12e-3, 'erase': 0.15},
+            timeout = readyTimeout,
+        )
 
         ##############################
         # Setup variables
@@ -110,6 +125,50 @@ class AxiMicronN25Q(pr.Device):
             groups      = ['NoStream','NoState','NoConfig'], # Not saving config/state to YAML
         ))
 
+        if crcEngine:
+            self.add(pr.RemoteVariable(
+                name        = 'CrcSize',
+                description = 'Number of bytes from AddrReg covered by the CRC32 checksum',
+                offset      = 0x10,
+                base        = pr.UInt,
+                bitSize     = 32,
+                bitOffset   = 0,
+                retryCount  = tryCount,
+                updateNotify= False,
+                bulkOpEn    = False,
+                hidden      = True,
+                verify      = False,
+            ))
+
+            self.add(pr.RemoteVariable(
+                name        = 'CrcCmdReg',
+                description = 'Write the read command to start the CRC32 checksum',
+                offset      = 0x14,
+                base        = pr.UInt,
+                bitSize     = 32,
+                bitOffset   = 0,
+                mode        = 'WO',
+                retryCount  = tryCount,
+                updateNotify= False,
+                bulkOpEn    = False,
+                hidden      = True,
+                verify      = False,
+            ))
+
+            self.add(pr.RemoteVariable(
+                name        = 'CrcValue',
+                description = 'CRC32 checksum (same as zlib.crc32), the read completes when the checksum is done',
+                offset      = 0x18,
+                base        = pr.UInt,
+                bitSize     = 32,
+                bitOffset   = 0,
+                mode        = 'RO',
+                retryCount  = tryCount,
+                updateNotify= False,
+                bulkOpEn    = False,
+                hidden      = True,
+            ))
+
         ##############################
         # Constants
         ##############################
@@ -162,6 +221,11 @@ class AxiMicronN25Q(pr.Device):
         self.WRITE_MASK  = 0x80000000
         self.VERIFY_MASK = 0x40000000
 
+        # PROM geometry (see surf.misc.PromBackend)
+        self.PAGE_SIZE   = 256     # 64 x 32-bit words per page program burst
+        self.ERASE_SIZE  = 0x10000 # 64kB per sector erase command
+        self.SECTOR_SIZE = 0x10000 # Granularity of the differential programming mode
+
         self.add(pr.LocalCommand(
             name        = 'LoadMcsFile',
             function    = self._LoadMcsFile,
@@ -169,7 +233,117 @@ class AxiMicronN25Q(pr.Device):
             value       = '',
         ))
 
-    def _LoadMcsFile(self,arg,iprogPrint=True):
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileDiff',
+            function    = self._LoadMcsFileDiff,
+            description = 'Load the .MCS into PROM, only erasing and writing the sectors that differ from the PROM contents',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileStream',
+            function    = self._LoadMcsFileStream,
+            description = 'Load the .MCS into PROM, decoding the file while the PROM is being erased and written',
+            value       = '',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpAddress',
+            description = 'Start byte address of the DumpProm readback',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpSize',
+            description = 'Number of bytes read back by DumpProm',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'DumpProm',
+            function    = self._DumpProm,
+            description = 'Read back DumpSize bytes from DumpAddress into a .bin, .mcs or .mcs.gz file',
+            value       = '',
+        ))
+
+        if layout is not None:
+            self.add(pr.LocalVariable(
+                name        = 'Partition',
+                description = 'Target partition of LoadPartition: ' + ', '.join(p.name for p in layout),
+                mode        = 'RW',
+                value       = next(iter(layout)).name,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalVariable(
+                name        = 'PartitionReload',
+                description = 'Reload the FPGA from the partition after LoadPartition',
+                mode        = 'RW',
+                value       = False,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalCommand(
+                name        = 'LoadPartition',
+                function    = self._LoadPartition,
+                description = 'Load the .MCS (or .bin/.bit) into the Partition only, and check that the other partitions are unchanged',
+                value       = '',
+            ))
+
+    def _LoadMcsFileDiff(self,arg):
+        self._LoadMcsFile(arg, diffMode=True)
+
+    def _LoadMcsFileStream(self,arg):
+        self._LoadMcsFile(arg, streamMode=True)
+
+    def _DumpProm(self,arg):
+        click.secho( f'{self.path}.DumpProm: {arg}', fg='green')
+
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
+
+        # Read back the PROM and save it
+        image = self._prog.dump(self.DumpAddress.get(), self.DumpSize.get())
+        surf.misc.McsWriter().write(arg, image)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'DumpProm() took {datetime.timedelta(seconds=int(elapsed))} to read 0x{image.size:x} bytes', fg='green')
+
+    def _LoadPartition(self,arg):
+        partition = self._layout[self.Partition.get()]
+        click.secho( f'{self.path}.LoadPartition: {arg} -> {partition.name}', fg='green')
+        self._progDone = False
+
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
+
+        # Open the file and program the partition
+        self._mcs.open(arg)
+        self._prog.programPartition(self._mcs.image, self._layout, partition.name)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'LoadPartition() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        self._progDone = True
+
+        # Optionally boot the FPGA from the new image
+        if self.PartitionReload.get():
+            if self._axiVersion is None:
+                click.secho( f'{self.path}: no axiVersion device for FpgaReloadAtAddress()', fg='red')
+            else:
+                click.secho( f'Reloading the FPGA from address 0x{partition.reloadAddress:x}', fg='green')
+                self._axiVersion.FpgaReloadAtAddress(partition.reloadAddress)
+
+    def _LoadMcsFile(self,arg,iprogPrint=True,diffMode=False,streamMode=False):
         # arg = value
 
         click.secho( f'{self.path}.LoadMcsFile: {arg}', fg='green')
@@ -179,7 +353,7 @@ class AxiMicronN25Q(pr.Device):
         start = time.time()
 
         # Reset the SPI interface
-        self.resetFlash()
+        self.promBeginProgram()
 
         # Print the status registers
         print("PROM Manufacturer ID Code  = {}".format(hex(self.getManufacturerId())))
@@ -188,22 +362,22 @@ class AxiMicronN25Q(pr.Device):
         print("PROM Status Register       = {}".format(hex(self.getPromStatusReg())))
         print("PROM Volatile Config Reg   = {}".format(hex(self.getPromConfigReg())))
 
-        # Open the MCS file
-        self._mcs.open(arg)
-
-        # Erase the PROM
-        self.eraseProm()
+        if streamMode:
+            # Decode the MCS file while the PROM is being erased, written and verified
+            self._prog.programStream(lambda: self._mcs.stream(arg, self.PAGE_SIZE))
 
-        # Write to the PROM
-        self.writeProm()
+        else:
+            # Open the MCS file
+            self._mcs.open(arg)
 
-        # Verify the PROM
-        self.verifyProm()
+            # Erase, write and verify the PROM (only the changed sectors in diffMode)
+            self._prog.program(self._mcs.image, diffMode=diffMode)
 
         # End time measurement for profiling
         end = time.time()
         elapsed = end - start
         click.secho( f'LoadMcsFile() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        click.secho( self._flashReady.summary(), fg='green')
 
         # Add a power cycle reminder
         self._progDone = True
@@ -221,123 +395,19 @@ class AxiMicronN25Q(pr.Device):
             )
 
     def eraseProm(self):
-        # Set the starting address index
-        address    = self._mcs.startAddr
-        # 64kB per sector
-        ERASE_SIZE = 0x10000
-        # Setup the status bar
-        with click.progressbar(
-            iterable = range(math.ceil(self._mcs.size/ERASE_SIZE)),
-            label    = click.style('Erasing PROM:  ', fg='green'),
-        ) as bar:
-            for i in bar:
-                # Execute the erase command
-                self.eraseCmd(address)
-                # Increment by one block
-                address += ERASE_SIZE
-        # Check the corner case
-        if ( address<=self._mcs.endAddr ):
-            self.eraseCmd(address)
+        self._prog.erase(self._mcs.image)
 
     def writeProm(self):
-        # Initialize the variables
-        wordCnt = 0
-        byteCnt = 0
-        # Create a burst data array
-        dataArray = self.getDataReg(read=False)
-        # Setup the status bar
-        with click.progressbar(
-            length   = self._mcs.size,
-            label    = click.style('Writing PROM:  ', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                # Check for first byte of burst transfer
-                if ( (i&0xFFF) == 0):
-                    # Throttle down printf rate
-                    bar.update(0xFFF)
-                # Get the start bursting address
-                if ( (byteCnt==0) and (wordCnt==0) ):
-                    addr = int(self._mcs.entry[i][0])
-                # Pack the bytes into a 32-bit word
-                if ( byteCnt==0 ):
-                    wrd = (int(self._mcs.entry[i][1]) & 0xFF) << (8*(3-byteCnt))
-                else:
-                    wrd |= (int(self._mcs.entry[i][1]) & 0xFF) << (8*(3-byteCnt))
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    dataArray[wordCnt] = wrd
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        wordCnt = 0
-                        self.setDataReg(dataArray)
-                        self.writeCmd(addr)
-            # Close the status bar
-            bar.update(self._mcs.size)
-
-        # Check for leftover data
-        if ( (wordCnt != 0) or (byteCnt != 0) ):
-            while (wordCnt != 64):
-                # Pack the bytes into a 32-bit word
-                if ( byteCnt==0 ):
-                    wrd = (0xFF) << (8*(3-byteCnt))
-                else:
-                    wrd |= (0xFF) << (8*(3-byteCnt))
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    dataArray[wordCnt] = wrd
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        self.setDataReg(dataArray)
-                        self.writeCmd(addr)
-                        break
+        self._prog.write(self._mcs.image)
 
     def verifyProm(self):
-        # Wait for last transaction to finish
-        self.waitForFlashReady()
-        # Initialize the variables
-        wordCnt = 0
-        byteCnt = 0
-        # Setup the status bar
-        with click.progressbar(
-            length  = self._mcs.size,
-            label   = click.style('Verifying PROM:', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                # Check for first byte of burst transfer
-                if ( (i&0xFFF) == 0):
-                    # Throttle down printf rate
-                    bar.update(0xFFF)
-                # Get the start bursting address
-                if ( (byteCnt==0) and (wordCnt==0) ):
-                    # Start address of a burst transfer
-                    self.readCmd(int(self._mcs.entry[i][0]))
-                    # Get the data
-                    dataArray = self.getDataReg()
-                # Get the data/addr for MCS file
-                data = int(self._mcs.entry[i][1])
-                addr = int(self._mcs.entry[i][0])
-                # Get the prom data from data array
-                prom = ((dataArray[wordCnt] >> 8*(3-byteCnt)) & 0xFF)
-                # Compare PROM to file
-                if (data != prom):
-                    click.secho(f'\nAddr = 0x{addr:x}: MCS = 0x{data:x} != PROM = 0x{prom:x}', fg='red')
-                    raise surf.misc.McsException('verifyProm() Failed\n\n')
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        wordCnt = 0
-            # Close the status bar
-            bar.update(self._mcs.size)
+        self._prog.verify(self._mcs.image)
+
+    def verifyPromCrc(self):
+        self._prog.verifyCrc(self._mcs.image)
+
+    def diffProm(self):
+        self._prog.diff(self._mcs.image)
 
     def eraseCmd(self, address):
         self.setAddrReg(address)
@@ -416,17 +486,26 @@ class AxiMicronN25Q(pr.Device):
             self.waitForFlashReady()
             self.setCmdReg(self.WRITE_MASK|self.WRITE_ENABLE_CMD)
             self.setCmdReg(value)
+            # Time the operation until the next ready check
+            cmd = value & 0x00FF0000
+            if cmd in (self.ERASE_3BYTE_CMD, self.ERASE_4BYTE_CMD):
+                self._flashReady.start('erase')
+            elif cmd in (self.WRITE_3BYTE_CMD, self.WRITE_4BYTE_CMD):
+                self._flashReady.start('program')
+            else:
+                self._flashReady.start('command')
         else:
             self.setCmdReg(value)
 
     def waitForFlashReady(self):
-        while True:
-            # Get the status register
-            self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
-            status = (self.getCmdReg()&0xFF)
-            # Check if not busy
-            if ( (status & self.FLAG_STATUS_RDY) != 0 ):
-                break
+        self._flashReady.wait(self._isFlashReady)
+
+    def _isFlashReady(self):
+        # Get the status register
+        self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
+        status = (self.getCmdReg()&0xFF)
+        # Check if not busy
+        return ( (status & self.FLAG_STATUS_RDY) != 0 )
 
     #########################################
     # Command wrappers
@@ -451,3 +530,40 @@ class AxiMicronN25Q(pr.Device):
 
     def getDataReg(self,read=True):
         return self.DataReg.get(read=read)
+
+    #########################################
+    # PromBackend interface
+    #########################################
+    def promEraseBlock(self, address):
+        self.eraseCmd(address)
+
+    def promWritePage(self, address, page):
+        # Pack the 256 bytes into big-endian 32-bit words
+        self.setDataReg(page.view('>u4').astype(np.uint32))
+        self.writeCmd(address)
+
+    def promReadPage(self, address):
+        # Unpack the 64 big-endian 32-bit words into bytes
+        self.readCmd(address)
+        return np.asarray(self.getDataReg(), dtype=np.uint32).astype('>u4').view(np.uint8)
+
+    def promCrc(self, address, length):
+        if not self._crcEngine:
+            return None
+        # Continuous read of the sector by the firmware checksum engine
+        self.setAddrReg(address)
+        self.CrcSize.set(length)
+        if (self._addrMode):
+            self.CrcCmdReg.set(self.READ_MASK|self.READ_4BYTE_CMD)
+        else:
+            self.CrcCmdReg.set(self.READ_MASK|self.READ_3BYTE_CMD)
+        return self.CrcValue.get()
+
+    def promBeginProgram(self):
+        # Reset the SPI interface
+        self.resetFlash()
+        self._flashReady.resetStats()
+
+    def promBeginRead(self):
+        # Wait for last transaction to finish
+        self.waitForFlashReady()
@@ -15,15 +15,17 @@
 
 import pyrogue   as pr
 import surf.misc
+import numpy     as np
 import click
 import time
 import datetime
-import math
 
-class AxiMicronP30(pr.Device):
+class AxiMicronP30(pr.Device, surf.misc.PromBackend):
     def __init__(self,
             description = "AXI-Lite Micron P30 PROM",
             tryCount    = 5,
+            layout      = None, # Multi-boot surf.misc.PromLayout (enables LoadPartition)
+            axiVersion  = None, # AxiVersion device used for FpgaReloadAtAddress() after LoadPartition
             hidden      = True,
             **kwargs):
 
@@ -35,6 +37,15 @@ class AxiMicronP30(pr.Device):
         self._mcs = surf.misc.McsReader()
         self._progDone = False
         self._tryCount = tryCount
+        self._prog     = surf.misc.PromProgrammer(self, name=self.name)
+        self._layout = layout
+        self._axiVersion = axiVersion
+
+        # PROM geometry (see surf.misc.PromBackend)
+        self.PAGE_SIZE   = 512     # 256 x 16-bit words per burst
+        self.ERASE_SIZE  = 0x8000  # 16-kword per parameter block (64-kword main blocks are erased more than once)
+        self.SECTOR_SIZE = 0x20000 # Granularity of the differential programming mode (64-kword per block)
+        self.WORD_SIZE   = 2       # Only complete 16-bit words are compared
 
         ##############################
         # Setup variables
@@ -128,7 +139,117 @@ class AxiMicronP30(pr.Device):
             value       = '',
         ))
 
-    def _LoadMcsFile(self,arg,iprogPrint=True):
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileDiff',
+            function    = self._LoadMcsFileDiff,
+            description = 'Load the .MCS into PROM, only erasing and writing the sectors that differ from the PROM contents',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFileStream',
+            function    = self._LoadMcsFileStream,
+            description = 'Load the .MCS into PROM, decoding the file while the PROM is being erased and written',
+            value       = '',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpAddress',
+            description = 'Start byte address of the DumpProm readback',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpSize',
+            description = 'Number of bytes read back by DumpProm',
+            mode        = 'RW',
+            value       = 0x0,
+            groups      = ['NoStream','NoState','NoConfig'],
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'DumpProm',
+            function    = self._DumpProm,
+            description = 'Read back DumpSize bytes from DumpAddress into a .bin, .mcs or .mcs.gz file',
+            value       = '',
+        ))
+
+        if layout is not None:
+            self.add(pr.LocalVariable(
+                name        = 'Partition',
+                description = 'Target partition of LoadPartition: ' + ', '.join(p.name for p in layout),
+                mode        = 'RW',
+                value       = next(iter(layout)).name,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalVariable(
+                name        = 'PartitionReload',
+                description = 'Reload the FPGA from the partition after LoadPartition',
+                mode        = 'RW',
+                value       = False,
+                groups      = ['NoStream','NoState','NoConfig'],
+            ))
+
+            self.add(pr.LocalCommand(
+                name        = 'LoadPartition',
+                function    = self._LoadPartition,
+                description = 'Load the .MCS (or .bin/.bit) into the Partition only, and check that the other partitions are unchanged',
+                value       = '',
+            ))
+
+    def _LoadMcsFileDiff(self,arg):
+        self._LoadMcsFile(arg, diffMode=True)
+
+    def _LoadMcsFileStream(self,arg):
+        self._LoadMcsFile(arg, streamMode=True)
+
+    def _DumpProm(self,arg):
+        click.secho( f'{self.path}.DumpProm: {arg}', fg='green')
+
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
+
+        # Read back the PROM and save it
+        image = self._prog.dump(self.DumpAddress.get(), self.DumpSize.get())
+        surf.misc.McsWriter().write(arg, image)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'DumpProm() took {datetime.timedelta(seconds=int(elapsed))} to read 0x{image.size:x} bytes', fg='green')
+
+    def _LoadPartition(self,arg):
+        partition = self._layout[self.Partition.get()]
+        click.secho( f'{self.path}.LoadPartition: {arg} -> {partition.name}', fg='green')
+        self._progDone = False
+
+        # Start time measurement for profiling
+        start = time.time()
+        self.promBeginProgram()
+
+        # Open the file and program the partition
+        self._mcs.open(arg)
+        self._prog.programPartition(self._mcs.image, self._layout, partition.name)
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho( f'LoadPartition() took {datetime.timedelta(seconds=int(elapsed))} to program the PROM', fg='green')
+        self._progDone = True
+
+        # Optionally boot the FPGA from the new image
+        if self.PartitionReload.get():
+            if self._axiVersion is None:
+                click.secho( f'{self.path}: no axiVersion device for FpgaReloadAtAddress()', fg='red')
+            else:
+                click.secho( f'Reloading the FPGA from address 0x{partition.reloadAddress:x}', fg='green')
+                self._axiVersion.FpgaReloadAtAddress(partition.reloadAddress)
+
+    def _LoadMcsFile(self,arg,iprogPrint=True,diffMode=False,streamMode=False):
 
         click.secho( f'{self.path}.LoadMcsFile: {arg}', fg='green')
         self._progDone = False
@@ -137,19 +258,18 @@ class AxiMicronP30(pr.Device):
         start = time.time()
 
         # Configuration: Force default configurations
-        self._writeToFlash(0xFD4F,0x60,0x03)
-
-        # Open the MCS file
-        self._mcs.open(arg)
+        self.promBeginProgram()
 
-        # Erase the PROM
-        self.eraseProm()
+        if streamMode:
+            # Decode the MCS file while the PROM is being erased, written and verified
+            self._prog.programStream(lambda: self._mcs.stream(arg, self.PAGE_SIZE))
 
-        # Write to the PROM
-        self.writeProm()
+        else:
+            # Open the MCS file
+            self._mcs.open(arg)
 
-        # Verify the PROM
-        self.verifyProm()
+            # Erase, write and verify the PROM (only the changed sectors in diffMode)
+            self._prog.program(self._mcs.image, diffMode=diffMode)
 
         # End time measurement for profiling
         end = time.time()
@@ -172,23 +292,7 @@ class AxiMicronP30(pr.Device):
             )
 
     def eraseProm(self):
-        # Set the starting address index
-        address    = self._mcs.startAddr >> 1
-        # Assume the smallest block size of 16-kword/block
-        ERASE_SIZE = 0x4000
-        # Setup the status bar
-        with click.progressbar(
-            iterable = range(math.ceil(self._mcs.size/ERASE_SIZE)),
-            label    = click.style('Erasing PROM:  ', fg='green'),
-        ) as bar:
-            for i in bar:
-                # Execute the erase command
-                self._eraseCmd(address)
-                # Increment by one block
-                address += ERASE_SIZE
-        # Check the corner case
-        if ( address< (self._mcs.endAddr>>1) ):
-            self._eraseCmd(address)
+        self._prog.erase(self._mcs.image)
 
     # Erase Command
     def _eraseCmd(self, address):
@@ -215,94 +319,47 @@ class AxiMicronP30(pr.Device):
         self._writeToFlash(address,0x60,0x01)
 
     def writeProm(self):
-        # Create a burst data array
-        dataArray = self.BurstData.get(read=False)
+        self._prog.write(self._mcs.image)
+
+    def verifyProm(self):
+        self._prog.verify(self._mcs.image)
+
+    def diffProm(self):
+        self._prog.diff(self._mcs.image)
+
+    #########################################
+    # PromBackend interface
+    #########################################
+    def promEraseBlock(self, address):
+        # 16-bit word addressing at the PROM
+        self._eraseCmd(address>>1)
+
+    def promWritePage(self, address, page):
+        # Pack the 512 bytes into little-endian 16-bit words
+        self.BurstData.set(page.view('<u2').astype(np.uint32))
+        # Start a burst transfer (16-bit word addressing at the PROM)
+        self.BurstTran.set(0x7FFFFFFF&(address>>1))
+
+    def promReadPage(self, address):
+        # Start a burst transfer (16-bit word addressing at the PROM)
+        self.BurstTran.set(0x80000000|(address>>1))
+        # Unpack the 256 little-endian 16-bit words into bytes
+        return np.asarray(self.BurstData.get(), dtype=np.uint32).astype('<u2').view(np.uint8)
+
+    def promBeginProgram(self):
+        # Configuration: Force default configurations
+        self._writeToFlash(0xFD4F,0x60,0x03)
 
+    def promBeginWrite(self):
         # Set the block transfer size
         self.TranSize.set(0xFF)
 
-        # Setup the status bar
-        with click.progressbar(
-            length   = self._mcs.size,
-            label    = click.style('Writing PROM:  ', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                if ( (i&0x1) == 0):
-                    # Check for first byte of burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-                        # Get the start bursting address
-                        addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                        # Reset the counter
-                        cnt = 0
-                    # Get the data from MCS file
-                    dataArray[cnt] = int(self._mcs.entry[i][1]) & 0xFF
-                else:
-                    # Get the data from MCS file
-                    dataArray[cnt] |= (int(self._mcs.entry[i][1])   << 8)
-                    cnt += 1
-                    # Check for the last byte
-                    if ( cnt == 256 ):
-
-                        # Write burst data
-                        self.BurstData.set(dataArray)
-                        # Start a burst transfer
-                        self.BurstTran.set(0x7FFFFFFF&addr)
-
-            if (cnt != 256):
-                # Fill the rest of the data array with ones
-                for i in range(cnt, 256):
-                    dataArray[i] = 0xFFFF
-
-                # Write burst data
-                self.BurstData.set(dataArray)
-                # Start a burst transfer
-                self.BurstTran.set(0x7FFFFFFF&addr)
-
-            # Close the status bar
-            bar.update(self._mcs.size)
-
-    def verifyProm(self):
-
+    def promBeginRead(self):
         # Set the data bus
         self.DataWrBus.set(0xFFFFFFFF)
         # Set the block transfer size
         self.TranSize.set(0xFF)
 
-        # Setup the status bar
-        with click.progressbar(
-            length  = self._mcs.size,
-            label   = click.style('Verifying PROM:', fg='green'),
-        ) as bar:
-            for i in range(self._mcs.size):
-                if ( (i&0x1) == 0):
-                    # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
-                    # Check for burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-
-                        # Start a burst transfer
-                        self.BurstTran.set(0x80000000|addr)
-
-                        # Get the data
-                        dataArray = self.BurstData.get()
-
-                else:
-                    # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
-                    # Get the prom data from data array
-                    prom = dataArray[(i&0x1FF)>>1]
-                    # Compare PROM to file
-                    if (data != prom):
-                        click.secho(f'\nAddr = 0x{addr:x}: MCS = 0x{data:x} != PROM = 0x{prom:x}', fg='red')
-                        raise surf.misc.McsException('verifyProm() Failed\n\n')
-            # Close the status bar
-            bar.update(self._mcs.size)
-
     # Generic FLASH write Command
     def _writeToFlash(self, addr, cmd, data):
         # Set the data bus
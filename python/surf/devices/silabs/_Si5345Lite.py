@@ -10,7 +10,7 @@
 
 import pyrogue as pr
 import surf.devices.silabs as silabs
-import csv
+import surf.misc
 import click
 import fnmatch
 import time
@@ -43,30 +43,21 @@ class Si5345Lite(pr.Device):
                 # Use the variable path instead
                 path = self.CsvFilePath.get()
 
-            # Check for .csv file
-            if fnmatch.fnmatch(path, '*.csv'):
+            # Check for .csv file (or its compiled surf.misc.ClockConfig image)
+            if fnmatch.fnmatch(path, '*.csv') or fnmatch.fnmatch(path, '*' + surf.misc.ClockConfig.EXTENSION):
                 click.secho( f'{self.path}.LoadCsvFile(): {path}', fg='green')
             else:
                 click.secho( f'{self.path}.LoadCsvFile(): {path} is not .csv', fg='red')
                 return
 
+            # Compile and validate the whole file before touching the device
+            image = surf.misc.ClockConfig.open(path, 'Si5345')
+
             # Power down during the configuration load
             self.Page0.PDN.set(0x1)
 
-            # Open the .CSV file
-            with open(path) as csvfile:
-                reader = csv.reader(csvfile, delimiter=',', quoting=csv.QUOTE_NONE)
-                # Loop through the rows in the CSV file
-                for row in reader:
-                    if (row[0]!='Address'):
-                        self._setValue(
-                            offset = (int(row[0],16)<<2),
-                            data   = int(row[1],16),
-                        )
-
-            # Update local RemoteVariables and verify conflagration
-            self.readBlocks(recurse=True)
-            self.checkBlocks(recurse=True)
+            # Write the registers of the image and verify conflagration
+            self._writeImage(image)
 
             # Execute the Page5.BW_UPDATE_PLL command
             self.Page5.BW_UPDATE_PLL.set(0x1)
@@ -117,9 +108,23 @@ class Si5345Lite(pr.Device):
             function     = lambda cmd: cmd.post(1),
         ))
 
-    def _setValue(self,offset,data):
+    def _setValue(self,offset,data,write=True):
         # Note: index is byte index (not word index)
-        self._pages[offset // 0x400].DataBlock.set(value=data,index=(offset%0x400)>>2)
+        self._pages[offset // 0x400].DataBlock.set(value=data,index=(offset%0x400)>>2,write=write)
+
+    def _writeImage(self, image):
+        # One write transaction per run of consecutive registers in the same page (file order kept),
+        # then only the written registers are read back
+        mismatch = []
+        for addr, data, value in image.writeDevice(self, pageSize=0x100):
+            # Update the local RemoteVariables
+            self._setValue(offset=(addr<<2), data=value, write=False)
+            if value != data:
+                mismatch.append(f'0x{addr:04X}')
+
+        # Self-clearing registers (e.g. SOFT_RST, BW_UPDATE_PLL) do not read back the written value
+        if mismatch:
+            click.secho(f'{self.path}.LoadCsvFile(): {len(mismatch)} register(s) read back a different value: {", ".join(mismatch)}', fg='yellow')
 
     def LockedWait(self, timeout=100):
         # Initialize watchdog counter
@@ -12,8 +12,373 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
-import time
 import surf.devices.ti
+import surf.misc
+
+##############################
+# Command register sequences
+##############################
+
+_POWERUP_ANALOG_CONFIG = surf.misc.RegSequence([
+    ('write', 'GeneralAddr_index_0x000', 0x81),
+    ('write', 'GeneralAddr_index_0x011', 0xFF),
+    ('write', 'GeneralAddr_index_0x022', 0xC0),
+    ('write', 'GeneralAddr_index_0x032', 0x80),
+    ('write', 'GeneralAddr_index_0x033', 0x08),
+    ('write', 'GeneralAddr_index_0x042', 0x03),
+    ('write', 'GeneralAddr_index_0x043', 0x03),
+    ('write', 'GeneralAddr_index_0x045', 0x58),
+    ('write', 'GeneralAddr_index_0x046', 0xC4),
+    ('write', 'GeneralAddr_index_0x047', 0x01),
+    ('write', 'GeneralAddr_index_0x053', 0x01),
+    ('write', 'GeneralAddr_index_0x054', 0x08),
+    ('write', 'GeneralAddr_index_0x064', 0x05),
+    ('write', 'GeneralAddr_index_0x072', 0x84),
+    ('write', 'GeneralAddr_index_0x08C', 0x80),
+    ('write', 'GeneralAddr_index_0x097', 0x80),
+    ('write', 'GeneralAddr_index_0x0F0', 0x38),
+    ('write', 'GeneralAddr_index_0x0F1', 0xBF),
+    ('write', 'GeneralAddr_index_0x011', 0x00),
+    ('write', 'GeneralAddr_index_0x012', 0x04),
+    ('write', 'GeneralAddr_index_0x025', 0x01),
+    ('write', 'GeneralAddr_index_0x026', 0x40),
+    ('write', 'GeneralAddr_index_0x027', 0x80),
+    ('write', 'GeneralAddr_index_0x029', 0x40),
+    ('write', 'GeneralAddr_index_0x02A', 0x80),
+    ('write', 'GeneralAddr_index_0x02C', 0x40),
+    ('write', 'GeneralAddr_index_0x02D', 0x80),
+    ('write', 'GeneralAddr_index_0x02F', 0x40),
+    ('write', 'GeneralAddr_index_0x034', 0x01),
+    ('write', 'GeneralAddr_index_0x03F', 0x01),
+    ('write', 'GeneralAddr_index_0x039', 0x50),
+    ('write', 'GeneralAddr_index_0x03B', 0x28),
+    ('write', 'GeneralAddr_index_0x040', 0x80),
+    ('write', 'GeneralAddr_index_0x042', 0x40),
+    ('write', 'GeneralAddr_index_0x043', 0x80),
+    ('write', 'GeneralAddr_index_0x045', 0x40),
+    ('write', 'GeneralAddr_index_0x046', 0x80),
+    ('write', 'GeneralAddr_index_0x048', 0x40),
+    ('write', 'GeneralAddr_index_0x049', 0x80),
+    ('write', 'GeneralAddr_index_0x04B', 0x40),
+    ('write', 'GeneralAddr_index_0x053', 0x60),
+    ('write', 'GeneralAddr_index_0x059', 0x02),
+    ('write', 'GeneralAddr_index_0x05B', 0x08),
+    ('write', 'GeneralAddr_index_0x05C', 0x07),
+    ('write', 'GeneralAddr_index_0x057', 0x10),
+    ('write', 'GeneralAddr_index_0x057', 0x18),
+    ('write', 'GeneralAddr_index_0x057', 0x10),
+    ('write', 'GeneralAddr_index_0x057', 0x18),
+    ('write', 'GeneralAddr_index_0x057', 0x10),
+    ('write', 'GeneralAddr_index_0x057', 0x00),
+    ('write', 'GeneralAddr_index_0x056', 0x00),
+    ('write', 'GeneralAddr_index_0x020', 0x00),
+    ('write', 'GeneralAddr_index_0x012', 0x00),
+    ('write', 'GeneralAddr_index_0x011', 0xFF),
+    ('write', 'GeneralAddr_index_0x083', 0x07),
+    ('write', 'GeneralAddr_index_0x05C', 0x00),
+    ('write', 'GeneralAddr_index_0x05C', 0x01),
+    ('write', 'GeneralAddr_index_0x011', 0x00),
+
+    ('write', 'RawInterface4_index_0x001', 0x00),
+    ('write', 'RawInterface4_index_0x002', 0x00),
+    ('write', 'RawInterface4_index_0x003', 0x00),
+    ('write', 'RawInterface4_index_0x004', 0x61),
+    ('write', 'RawInterface6_index_0x068', 0x22),
+    ('write', 'RawInterface4_index_0x003', 0x01),
+    ('write', 'RawInterface6_index_0x068', 0x22),
+])
+
+_IL_CONFIG_NYQ1_CHA = surf.misc.RegSequence([
+    ('write', 'CH[0].MainDigital_index_0x044', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x068', 0x04),
+    ('write', 'CH[0].MainDigital_index_0x0FF', 0xC0),
+    ('write', 'CH[0].MainDigital_index_0x0A2', 0x08),
+    ('write', 'CH[0].MainDigital_index_0x0A9', 0x03),
+    ('write', 'CH[0].MainDigital_index_0x0AB', 0x77),
+    ('write', 'CH[0].MainDigital_index_0x0AC', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x0AD', 0x77),
+    ('write', 'CH[0].MainDigital_index_0x0AE', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x096', 0x0F),
+    ('write', 'CH[0].MainDigital_index_0x097', 0x26),
+    ('write', 'CH[0].MainDigital_index_0x08F', 0x0C),
+    ('write', 'CH[0].MainDigital_index_0x08C', 0x08),
+    ('write', 'CH[0].MainDigital_index_0x080', 0x0F),
+    ('write', 'CH[0].MainDigital_index_0x081', 0xCB),
+    ('write', 'CH[0].MainDigital_index_0x07D', 0x03),
+    ('write', 'CH[0].MainDigital_index_0x056', 0x75),
+    ('write', 'CH[0].MainDigital_index_0x057', 0x75),
+    ('write', 'CH[0].MainDigital_index_0x053', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x04B', 0x03),
+    ('write', 'CH[0].MainDigital_index_0x049', 0x80),
+    ('write', 'CH[0].MainDigital_index_0x043', 0x26),
+    ('write', 'CH[0].MainDigital_index_0x05E', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x042', 0x38),
+    ('write', 'CH[0].MainDigital_index_0x05A', 0x04),
+    ('write', 'CH[0].MainDigital_index_0x071', 0x20),
+    ('write', 'CH[0].MainDigital_index_0x062', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x098', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x099', 0x08),
+    ('write', 'CH[0].MainDigital_index_0x09C', 0x08),
+    ('write', 'CH[0].MainDigital_index_0x09D', 0x20),
+    ('write', 'CH[0].MainDigital_index_0x0BE', 0x03),
+    ('write', 'CH[0].MainDigital_index_0x069', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x045', 0x10),
+    ('write', 'CH[0].MainDigital_index_0x08D', 0x64),
+    ('write', 'CH[0].MainDigital_index_0x08B', 0x20),
+    ('write', 'CH[0].MainDigital_index_0x000', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x000', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x000', 0x00),
+])
+
+_IL_CONFIG_NYQ1_CHB = surf.misc.RegSequence([
+    ('write', 'CH[1].MainDigital_index_0x049', 0x80),
+    ('write', 'CH[1].MainDigital_index_0x042', 0x20),
+    ('write', 'CH[1].MainDigital_index_0x0A2', 0x08),
+    ('write', 'CH[1].MainDigital_index_0x003', 0x00),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x00),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x01),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x00),
+])
+
+_SET_NL_TRIM = surf.misc.RegSequence([
+    # Nonlinearity trims
+    ('write', 'RawInterface4_index_0x003', 0x00),
+    ('write', 'RawInterface4_index_0x004', 0x20),
+    ('write', 'RawInterface4_index_0x002', 0xF8),
+    ('write', 'RawInterface6_index_0x03C', 0xF5),
+    ('write', 'RawInterface6_index_0x03D', 0x01),
+    ('write', 'RawInterface6_index_0x03E', 0xF0),
+    ('write', 'RawInterface6_index_0x03F', 0x0C),
+    ('write', 'RawInterface6_index_0x040', 0x0A),
+    ('write', 'RawInterface6_index_0x041', 0xFE),
+    ('write', 'RawInterface6_index_0x053', 0xF5),
+    ('write', 'RawInterface6_index_0x054', 0x01),
+    ('write', 'RawInterface6_index_0x055', 0xEE),
+    ('write', 'RawInterface6_index_0x056', 0x0E),
+    ('write', 'RawInterface6_index_0x057', 0x0B),
+    ('write', 'RawInterface6_index_0x058', 0xFE),
+    ('write', 'RawInterface6_index_0x06A', 0xF4),
+    ('write', 'RawInterface6_index_0x06B', 0x01),
+    ('write', 'RawInterface6_index_0x06C', 0xF0),
+    ('write', 'RawInterface6_index_0x06D', 0x0B),
+    ('write', 'RawInterface6_index_0x06E', 0x09),
+    ('write', 'RawInterface6_index_0x06F', 0xFE),
+    ('write', 'RawInterface6_index_0x081', 0xF5),
+    ('write', 'RawInterface6_index_0x082', 0x01),
+    ('write', 'RawInterface6_index_0x083', 0xEE),
+    ('write', 'RawInterface6_index_0x084', 0x0D),
+    ('write', 'RawInterface6_index_0x085', 0x0A),
+    ('write', 'RawInterface6_index_0x086', 0xFE),
+    ('write', 'RawInterface6_index_0x098', 0xFD),
+    ('write', 'RawInterface6_index_0x099', 0x00),
+    ('write', 'RawInterface6_index_0x09A', 0x00),
+    ('write', 'RawInterface6_index_0x09B', 0x00),
+    ('write', 'RawInterface6_index_0x09C', 0x00),
+    ('write', 'RawInterface6_index_0x09D', 0x00),
+    ('write', 'RawInterface6_index_0x0AF', 0xFF),
+    ('write', 'RawInterface6_index_0x0B0', 0x00),
+    ('write', 'RawInterface6_index_0x0B1', 0x01),
+    ('write', 'RawInterface6_index_0x0B2', 0xFF),
+    ('write', 'RawInterface6_index_0x0B3', 0xFF),
+    ('write', 'RawInterface6_index_0x0B4', 0x00),
+    ('write', 'RawInterface6_index_0x0C6', 0xFE),
+    ('write', 'RawInterface6_index_0x0C7', 0x00),
+    ('write', 'RawInterface6_index_0x0C8', 0x00),
+    ('write', 'RawInterface6_index_0x0C9', 0x02),
+    ('write', 'RawInterface6_index_0x0CA', 0x00),
+    ('write', 'RawInterface6_index_0x0CB', 0x00),
+    ('write', 'RawInterface6_index_0x0DD', 0xFF),
+    ('write', 'RawInterface6_index_0x0DE', 0x00),
+    ('write', 'RawInterface6_index_0x0DF', 0x02),
+    ('write', 'RawInterface6_index_0x0E0', 0x00),
+    ('write', 'RawInterface6_index_0x0E1', 0xFE),
+    ('write', 'RawInterface6_index_0x0E2', 0x00),
+    ('write', 'RawInterface6_index_0x0F4', 0x00),
+    ('write', 'RawInterface6_index_0x0F5', 0x00),
+    ('write', 'RawInterface6_index_0x0FB', 0x01),
+    ('write', 'RawInterface6_index_0x0FC', 0x01),
+    ('write', 'RawInterface4_index_0x003', 0x00),
+    ('write', 'RawInterface4_index_0x004', 0x20),
+    ('write', 'RawInterface4_index_0x002', 0xF9),
+    ('write', 'RawInterface6_index_0x074', 0xF4),
+    ('write', 'RawInterface6_index_0x075', 0x01),
+    ('write', 'RawInterface6_index_0x076', 0xEF),
+    ('write', 'RawInterface6_index_0x077', 0x0C),
+    ('write', 'RawInterface6_index_0x078', 0x0A),
+    ('write', 'RawInterface6_index_0x079', 0xFE),
+    ('write', 'RawInterface6_index_0x08B', 0xF4),
+    ('write', 'RawInterface6_index_0x08C', 0x01),
+    ('write', 'RawInterface6_index_0x08D', 0xEE),
+    ('write', 'RawInterface6_index_0x08E', 0x0D),
+    ('write', 'RawInterface6_index_0x08F', 0x0A),
+    ('write', 'RawInterface6_index_0x090', 0xFE),
+    ('write', 'RawInterface6_index_0x0A2', 0xF4),
+    ('write', 'RawInterface6_index_0x0A3', 0x01),
+    ('write', 'RawInterface6_index_0x0A4', 0xEF),
+    ('write', 'RawInterface6_index_0x0A5', 0x0C),
+    ('write', 'RawInterface6_index_0x0A6', 0x0A),
+    ('write', 'RawInterface6_index_0x0A7', 0xFE),
+    ('write', 'RawInterface6_index_0x0B9', 0xF4),
+    ('write', 'RawInterface6_index_0x0BA', 0x01),
+    ('write', 'RawInterface6_index_0x0BB', 0xEF),
+    ('write', 'RawInterface6_index_0x0BC', 0x0D),
+    ('write', 'RawInterface6_index_0x0BD', 0x0A),
+    ('write', 'RawInterface6_index_0x0BE', 0xFE),
+    ('write', 'RawInterface6_index_0x0D0', 0xFF),
+    ('write', 'RawInterface6_index_0x0D1', 0x00),
+    ('write', 'RawInterface6_index_0x0D2', 0xFF),
+    ('write', 'RawInterface6_index_0x0D3', 0x01),
+    ('write', 'RawInterface6_index_0x0D4', 0x00),
+    ('write', 'RawInterface6_index_0x0D5', 0x00),
+    ('write', 'RawInterface6_index_0x0E7', 0xFF),
+    ('write', 'RawInterface6_index_0x0E8', 0x00),
+    ('write', 'RawInterface6_index_0x0E9', 0x01),
+    ('write', 'RawInterface6_index_0x0EA', 0x00),
+    ('write', 'RawInterface6_index_0x0EB', 0x00),
+    ('write', 'RawInterface6_index_0x0EC', 0x00),
+    ('write', 'RawInterface6_index_0x0FE', 0xFE),
+    ('write', 'RawInterface6_index_0x0FF', 0x00),
+    ('write', 'RawInterface4_index_0x002', 0xFA),
+    ('write', 'RawInterface6_index_0x000', 0xFF),
+    ('write', 'RawInterface6_index_0x001', 0x02),
+    ('write', 'RawInterface6_index_0x002', 0x01),
+    ('write', 'RawInterface6_index_0x003', 0x00),
+    ('write', 'RawInterface6_index_0x015', 0xFF),
+    ('write', 'RawInterface6_index_0x016', 0x00),
+    ('write', 'RawInterface6_index_0x017', 0x01),
+    ('write', 'RawInterface6_index_0x018', 0x00),
+    ('write', 'RawInterface6_index_0x019', 0xFF),
+    ('write', 'RawInterface6_index_0x01A', 0x00),
+    ('write', 'RawInterface6_index_0x02C', 0x00),
+    ('write', 'RawInterface6_index_0x02D', 0x00),
+    ('write', 'RawInterface6_index_0x033', 0x01),
+    ('write', 'RawInterface6_index_0x034', 0x01),
+    ('write', 'RawInterface4_index_0x002', 0x00),
+    ('write', 'RawInterface4_index_0x003', 0x00),
+    ('write', 'RawInterface4_index_0x004', 0x68),
+    ('write', 'RawInterface6_index_0x068', 0x00),
+    ('write', 'RawInterface0_index_0x011', 0x00),
+    ('write', 'RawInterface0_index_0x012', 0x04),
+    ('write', 'RawInterface0_index_0x05C', 0x87),
+    ('write', 'RawInterface0_index_0x012', 0x00),
+])
+
+def _jesdDdcConfig(ch):
+    return [
+        # JESD DIGITAL PAGE
+        ('write', f'{ch}.SCRAMBLE_EN', 0x1),
+        ('write', f'{ch}.12BIT_MODE', 0x0),
+        ('write', f'{ch}.SYNC_REG_EN', 0x0),
+        ('write', f'{ch}.SYNC_REG', 0x0),
+        ('write', f'{ch}.RAMP_12BIT', 0x0),
+        ('write', f'{ch}.JESD_MODE0', 0x0),
+        ('write', f'{ch}.JESD_MODE1', 0x0),
+        ('write', f'{ch}.JESD_MODE2', 0x1),
+        ('write', f'{ch}.LMFC_MASK_RESET', 0x0),
+        ('write', f'{ch}.LINK_LAY_RPAT', 0x0),
+        ('write', f'{ch}.LINK_LAYER_TESTMODE', 0x0),
+        ('write', f'{ch}.40X_MODE', 0x7),
+        ('write', f'{ch}.PLL_MODE', 0x2),
+        ('write', f'{ch}.SEL_EMP_LANE0', 0x03),
+        ('write', f'{ch}.SEL_EMP_LANE1', 0x3F), # unused lane
+        ('write', f'{ch}.SEL_EMP_LANE2', 0x03),
+        ('write', f'{ch}.SEL_EMP_LANE3', 0x3F), # unused lane
+        ('write', f'{ch}.TX_LINK_DIS', 0x0),
+        ('write', f'{ch}.FRAME_ALIGN', 0x1),
+        ('write', f'{ch}.LANE_ALIGN', 0x1),
+        ('write', f'{ch}.TESTMODE_EN', 0x0),
+        ('write', f'{ch}.CTRL_K', 0x1),
+        ('write', f'{ch}.FRAMES_PER_MULTIFRAME', 0x1F),
+
+        # Decimation filter page
+        ('write', f'{ch}.DDC_EN', 0x1),
+        ('write', f'{ch}.DECIM_FACTOR', 0x0),
+        ('write', f'{ch}.DUAL_BAND_EN', 0x0),
+        ('write', f'{ch}.REAL_OUT_EN', 0x0),
+        # Write the value that has been loaded via yaml,
+        # or write the default value defined in _AdcRf45Channel.py
+        ('update', f'{ch}.DDC0_NCO1_LSB'),
+        ('update', f'{ch}.DDC0_NCO1_MSB'),
+        ('update', f'{ch}.DDC0_NCO2_LSB'),
+        ('update', f'{ch}.DDC0_NCO2_MSB'),
+        ('update', f'{ch}.DDC0_NCO3_LSB'),
+        ('update', f'{ch}.DDC0_NCO3_MSB'),
+        ('write', f'{ch}.NCO_SEL_PIN', 0x00),
+        ('write', f'{ch}.NCO_SEL', 0x00),
+        ('write', f'{ch}.LMFC_RESET_MODE', 0x00),
+        ('write', f'{ch}.DDC0_6DB_GAIN', 0x01),
+        ('write', f'{ch}.DDC1_6DB_GAIN', 0x01),
+        ('write', f'{ch}.DDC_DET_LAT', 0x05),
+        ('write', f'{ch}.WBF_6DB_GAIN', 0x01),
+        ('write', f'{ch}.CUSTOM_PATTERN1_LSB', 0x00),
+        ('write', f'{ch}.CUSTOM_PATTERN1_MSB', 0x00),
+        ('write', f'{ch}.CUSTOM_PATTERN2_LSB', 0x00),
+        ('write', f'{ch}.CUSTOM_PATTERN2_MSB', 0x00),
+        ('write', f'{ch}.TEST_PATTERN_SEL', 0x00),
+        ('write', f'{ch}.TEST_PAT_RES', 0x00),
+        ('write', f'{ch}.TP_RES_EN', 0x00),
+    ]
+
+_JESD_DDC_CONFIG = surf.misc.RegSequence(_jesdDdcConfig('CH[0]') + _jesdDdcConfig('CH[1]'))
+
+_INIT = surf.misc.RegSequence([
+    ('write', 'GeneralAddr_index_0x012', 0x04), # write 4 to address 12 page select
+    ('write', 'GeneralAddr_index_0x056', 0x00), # sysref dis - check this was written earlier
+    ('write', 'GeneralAddr_index_0x057', 0x00), # sysref dis - whether it has to be zero
+    ('write', 'GeneralAddr_index_0x020', 0x00),
+    ('write', 'CH[0].JesdDigital_index_0x03E', 0x00),
+    ('write', 'CH[1].JesdDigital_index_0x03E', 0x00),
+
+    _IL_CONFIG_NYQ1_CHA,
+    _IL_CONFIG_NYQ1_CHB,
+
+    ('delay', 0.250),
+
+    _SET_NL_TRIM,
+
+    ('delay', 0.250),
+
+    _JESD_DDC_CONFIG,
+
+    ('delay', 0.250),
+
+    ('write', 'CH[0].OffsetCorrector_index_0x068', 0xA2), #... freeze offset estimation
+    ('write', 'CH[1].OffsetCorrector_index_0x068', 0xA2), #... freeze offset estimation
+
+    ('write', 'GeneralAddr_index_0x012', 0x04), # write 4 to address 12 page select
+    ('write', 'GeneralAddr_index_0x056', 0x00), # sysref dis - check this was written earlier
+    ('write', 'GeneralAddr_index_0x057', 0x00), # sysref dis - whether it has to be zero
+    ('write', 'GeneralAddr_index_0x020', 0x00),
+
+    ('write', 'GeneralAddr_index_0x012', 0x04), # write 4 to address 12 page select
+    ('write', 'CH[0].JesdDigital_index_0x03E', 0x40), #... MASK CLKDIV SYSREF
+    ('write', 'CH[1].JesdDigital_index_0x03E', 0x40), #... MASK CLKDIV SYSREF
+
+    ('write', 'CH[0].JesdDigital_index_0x03E', 0x60), #... MASK CLKDIV SYSREF + MASK NCO SYSREF
+    ('write', 'CH[1].JesdDigital_index_0x03E', 0x60), #... MASK CLKDIV SYSREF + MASK NCO SYSREF
+
+    ('write', 'GeneralAddr_index_0x020', 0x10), # PDN_SYSREF = 0x1
+])
+
+_DIG_RST = surf.misc.RegSequence([
+    # Wait for 50 ms for the device to estimate the interleaving errors
+    ('delay', 0.250), # TODO: Optimize this timeout
+    ('write', 'CH[0].JesdDigital_index_0x000', 0x00),
+    ('write', 'CH[1].JesdDigital_index_0x000', 0x00),
+    ('write', 'CH[0].JesdDigital_index_0x000', 0x01),
+    ('write', 'CH[1].JesdDigital_index_0x000', 0x01),
+    ('write', 'CH[0].JesdDigital_index_0x000', 0x00),
+    ('write', 'CH[1].JesdDigital_index_0x000', 0x00),
+
+    # Wait for 50 ms for the device to estimate the interleaving errors
+    ('delay', 0.250), # TODO: Optimize this timeout
+    ('write', 'CH[0].MainDigital_index_0x000', 0x00),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x00),
+    ('write', 'CH[0].MainDigital_index_0x000', 0x01),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x01),
+    ('write', 'CH[0].MainDigital_index_0x000', 0x00),
+    ('write', 'CH[1].MainDigital_index_0x000', 0x00),
+])
 
 class Adc32Rf45(pr.Device):
     def __init__( self, verify=True, **kwargs):
@@ -476,360 +841,28 @@ class Adc32Rf45(pr.Device):
         ##############################
         @self.command(description  = "Device Initiation")
         def Init():
-            self.GeneralAddr_index_0x012.set(value=0x04) # write 4 to address 12 page select
-            self.GeneralAddr_index_0x056.set(value=0x00) # sysref dis - check this was written earlier
-            self.GeneralAddr_index_0x057.set(value=0x00) # sysref dis - whether it has to be zero
-            self.GeneralAddr_index_0x020.set(value=0x00)
-            self.CH[0].JesdDigital_index_0x03E.set(value=0x00)
-            self.CH[1].JesdDigital_index_0x03E.set(value=0x00)
-
-            self.IL_Config_Nyq1_ChA()
-            self.IL_Config_Nyq1_ChB()
-
-            time.sleep(0.250)
-
-            self.SetNLTrim()
-
-            time.sleep(0.250)
-
-            self.JESD_DDC_config()
-
-            time.sleep(0.250)
-
-            self.CH[0].OffsetCorrector_index_0x068.set(value=0xA2) #... freeze offset estimation
-            self.CH[1].OffsetCorrector_index_0x068.set(value=0xA2) #... freeze offset estimation
-
-            self.GeneralAddr_index_0x012.set(value=0x04) # write 4 to address 12 page select
-            self.GeneralAddr_index_0x056.set(value=0x00) # sysref dis - check this was written earlier
-            self.GeneralAddr_index_0x057.set(value=0x00) # sysref dis - whether it has to be zero
-            self.GeneralAddr_index_0x020.set(value=0x00)
-
-            self.GeneralAddr_index_0x012.set(value=0x04) # write 4 to address 12 page select
-            self.CH[0].JesdDigital_index_0x03E.set(value=0x40,) #... MASK CLKDIV SYSREF
-            self.CH[1].JesdDigital_index_0x03E.set(value=0x40) #... MASK CLKDIV SYSREF
-
-            self.CH[0].JesdDigital_index_0x03E.set(value=0x60) #... MASK CLKDIV SYSREF + MASK NCO SYSREF
-            self.CH[1].JesdDigital_index_0x03E.set(value=0x60) #... MASK CLKDIV SYSREF + MASK NCO SYSREF
-
-            self.GeneralAddr_index_0x020.set(value=0x10) # PDN_SYSREF = 0x1
+            return _INIT.run(self)
 
         @self.command()
         def Powerup_AnalogConfig():
-            self.GeneralAddr_index_0x000.set(value=0x81)
-            self.GeneralAddr_index_0x011.set(value=0xFF)
-            self.GeneralAddr_index_0x022.set(value=0xC0)
-            self.GeneralAddr_index_0x032.set(value=0x80)
-            self.GeneralAddr_index_0x033.set(value=0x08)
-            self.GeneralAddr_index_0x042.set(value=0x03)
-            self.GeneralAddr_index_0x043.set(value=0x03)
-            self.GeneralAddr_index_0x045.set(value=0x58)
-            self.GeneralAddr_index_0x046.set(value=0xC4)
-            self.GeneralAddr_index_0x047.set(value=0x01)
-            self.GeneralAddr_index_0x053.set(value=0x01)
-            self.GeneralAddr_index_0x054.set(value=0x08)
-            self.GeneralAddr_index_0x064.set(value=0x05)
-            self.GeneralAddr_index_0x072.set(value=0x84)
-            self.GeneralAddr_index_0x08C.set(value=0x80)
-            self.GeneralAddr_index_0x097.set(value=0x80)
-            self.GeneralAddr_index_0x0F0.set(value=0x38)
-            self.GeneralAddr_index_0x0F1.set(value=0xBF)
-            self.GeneralAddr_index_0x011.set(value=0x00)
-            self.GeneralAddr_index_0x012.set(value=0x04)
-            self.GeneralAddr_index_0x025.set(value=0x01)
-            self.GeneralAddr_index_0x026.set(value=0x40)
-            self.GeneralAddr_index_0x027.set(value=0x80)
-            self.GeneralAddr_index_0x029.set(value=0x40)
-            self.GeneralAddr_index_0x02A.set(value=0x80)
-            self.GeneralAddr_index_0x02C.set(value=0x40)
-            self.GeneralAddr_index_0x02D.set(value=0x80)
-            self.GeneralAddr_index_0x02F.set(value=0x40)
-            self.GeneralAddr_index_0x034.set(value=0x01)
-            self.GeneralAddr_index_0x03F.set(value=0x01)
-            self.GeneralAddr_index_0x039.set(value=0x50)
-            self.GeneralAddr_index_0x03B.set(value=0x28)
-            self.GeneralAddr_index_0x040.set(value=0x80)
-            self.GeneralAddr_index_0x042.set(value=0x40)
-            self.GeneralAddr_index_0x043.set(value=0x80)
-            self.GeneralAddr_index_0x045.set(value=0x40)
-            self.GeneralAddr_index_0x046.set(value=0x80)
-            self.GeneralAddr_index_0x048.set(value=0x40)
-            self.GeneralAddr_index_0x049.set(value=0x80)
-            self.GeneralAddr_index_0x04B.set(value=0x40)
-            self.GeneralAddr_index_0x053.set(value=0x60)
-            self.GeneralAddr_index_0x059.set(value=0x02)
-            self.GeneralAddr_index_0x05B.set(value=0x08)
-            self.GeneralAddr_index_0x05C.set(value=0x07)
-            self.GeneralAddr_index_0x057.set(value=0x10)
-            self.GeneralAddr_index_0x057.set(value=0x18)
-            self.GeneralAddr_index_0x057.set(value=0x10)
-            self.GeneralAddr_index_0x057.set(value=0x18)
-            self.GeneralAddr_index_0x057.set(value=0x10)
-            self.GeneralAddr_index_0x057.set(value=0x00)
-            self.GeneralAddr_index_0x056.set(value=0x00)
-            self.GeneralAddr_index_0x020.set(value=0x00)
-            self.GeneralAddr_index_0x012.set(value=0x00)
-            self.GeneralAddr_index_0x011.set(value=0xFF)
-            self.GeneralAddr_index_0x083.set(value=0x07)
-            self.GeneralAddr_index_0x05C.set(value=0x00)
-            self.GeneralAddr_index_0x05C.set(value=0x01)
-            self.GeneralAddr_index_0x011.set(value=0x00)
-
-            self.RawInterface4_index_0x001.set(value=0x00)
-            self.RawInterface4_index_0x002.set(value=0x00)
-            self.RawInterface4_index_0x003.set(value=0x00)
-            self.RawInterface4_index_0x004.set(value=0x61)
-            self.RawInterface6_index_0x068.set(value=0x22)
-            self.RawInterface4_index_0x003.set(value=0x01)
-            self.RawInterface6_index_0x068.set(value=0x22)
+            return _POWERUP_ANALOG_CONFIG.run(self)
 
         @self.command(description = "Set IL ChA")
         def IL_Config_Nyq1_ChA():
-            self.CH[0].MainDigital_index_0x044.set(value=0x01)
-            self.CH[0].MainDigital_index_0x068.set(value=0x04)
-            self.CH[0].MainDigital_index_0x0FF.set(value=0xC0)
-            self.CH[0].MainDigital_index_0x0A2.set(value=0x08)
-            self.CH[0].MainDigital_index_0x0A9.set(value=0x03)
-            self.CH[0].MainDigital_index_0x0AB.set(value=0x77)
-            self.CH[0].MainDigital_index_0x0AC.set(value=0x01)
-            self.CH[0].MainDigital_index_0x0AD.set(value=0x77)
-            self.CH[0].MainDigital_index_0x0AE.set(value=0x01)
-            self.CH[0].MainDigital_index_0x096.set(value=0x0F)
-            self.CH[0].MainDigital_index_0x097.set(value=0x26)
-            self.CH[0].MainDigital_index_0x08F.set(value=0x0C)
-            self.CH[0].MainDigital_index_0x08C.set(value=0x08)
-            self.CH[0].MainDigital_index_0x080.set(value=0x0F)
-            self.CH[0].MainDigital_index_0x081.set(value=0xCB)
-            self.CH[0].MainDigital_index_0x07D.set(value=0x03)
-            self.CH[0].MainDigital_index_0x056.set(value=0x75)
-            self.CH[0].MainDigital_index_0x057.set(value=0x75)
-            self.CH[0].MainDigital_index_0x053.set(value=0x00)
-            self.CH[0].MainDigital_index_0x04B.set(value=0x03)
-            self.CH[0].MainDigital_index_0x049.set(value=0x80)
-            self.CH[0].MainDigital_index_0x043.set(value=0x26)
-            self.CH[0].MainDigital_index_0x05E.set(value=0x01)
-            self.CH[0].MainDigital_index_0x042.set(value=0x38)
-            self.CH[0].MainDigital_index_0x05A.set(value=0x04)
-            self.CH[0].MainDigital_index_0x071.set(value=0x20)
-            self.CH[0].MainDigital_index_0x062.set(value=0x00)
-            self.CH[0].MainDigital_index_0x098.set(value=0x00)
-            self.CH[0].MainDigital_index_0x099.set(value=0x08)
-            self.CH[0].MainDigital_index_0x09C.set(value=0x08)
-            self.CH[0].MainDigital_index_0x09D.set(value=0x20)
-            self.CH[0].MainDigital_index_0x0BE.set(value=0x03)
-            self.CH[0].MainDigital_index_0x069.set(value=0x00)
-            self.CH[0].MainDigital_index_0x045.set(value=0x10)
-            self.CH[0].MainDigital_index_0x08D.set(value=0x64)
-            self.CH[0].MainDigital_index_0x08B.set(value=0x20)
-            self.CH[0].MainDigital_index_0x000.set(value=0x00)
-            self.CH[0].MainDigital_index_0x000.set(value=0x01)
-            self.CH[0].MainDigital_index_0x000.set(value=0x00)
+            return _IL_CONFIG_NYQ1_CHA.run(self)
 
         @self.command()
         def IL_Config_Nyq1_ChB():
-            self.CH[1].MainDigital_index_0x049.set(value=0x80)
-            self.CH[1].MainDigital_index_0x042.set(value=0x20)
-            self.CH[1].MainDigital_index_0x0A2.set(value=0x08)
-            self.CH[1].MainDigital_index_0x003.set(value=0x00)
-            self.CH[1].MainDigital_index_0x000.set(value=0x00)
-            self.CH[1].MainDigital_index_0x000.set(value=0x01)
-            self.CH[1].MainDigital_index_0x000.set(value=0x00)
+            return _IL_CONFIG_NYQ1_CHB.run(self)
 
         @self.command(description  = "Set nonlinear trims")
         def SetNLTrim():
-            # Nonlinearity trims
-            self.RawInterface4_index_0x003.set(value=0x00)
-            self.RawInterface4_index_0x004.set(value=0x20)
-            self.RawInterface4_index_0x002.set(value=0xF8)
-            self.RawInterface6_index_0x03C.set(value=0xF5)
-            self.RawInterface6_index_0x03D.set(value=0x01)
-            self.RawInterface6_index_0x03E.set(value=0xF0)
-            self.RawInterface6_index_0x03F.set(value=0x0C)
-            self.RawInterface6_index_0x040.set(value=0x0A)
-            self.RawInterface6_index_0x041.set(value=0xFE)
-            self.RawInterface6_index_0x053.set(value=0xF5)
-            self.RawInterface6_index_0x054.set(value=0x01)
-            self.RawInterface6_index_0x055.set(value=0xEE)
-            self.RawInterface6_index_0x056.set(value=0x0E)
-            self.RawInterface6_index_0x057.set(value=0x0B)
-            self.RawInterface6_index_0x058.set(value=0xFE)
-            self.RawInterface6_index_0x06A.set(value=0xF4)
-            self.RawInterface6_index_0x06B.set(value=0x01)
-            self.RawInterface6_index_0x06C.set(value=0xF0)
-            self.RawInterface6_index_0x06D.set(value=0x0B)
-            self.RawInterface6_index_0x06E.set(value=0x09)
-            self.RawInterface6_index_0x06F.set(value=0xFE)
-            self.RawInterface6_index_0x081.set(value=0xF5)
-            self.RawInterface6_index_0x082.set(value=0x01)
-            self.RawInterface6_index_0x083.set(value=0xEE)
-            self.RawInterface6_index_0x084.set(value=0x0D)
-            self.RawInterface6_index_0x085.set(value=0x0A)
-            self.RawInterface6_index_0x086.set(value=0xFE)
-            self.RawInterface6_index_0x098.set(value=0xFD)
-            self.RawInterface6_index_0x099.set(value=0x00)
-            self.RawInterface6_index_0x09A.set(value=0x00)
-            self.RawInterface6_index_0x09B.set(value=0x00)
-            self.RawInterface6_index_0x09C.set(value=0x00)
-            self.RawInterface6_index_0x09D.set(value=0x00)
-            self.RawInterface6_index_0x0AF.set(value=0xFF)
-            self.RawInterface6_index_0x0B0.set(value=0x00)
-            self.RawInterface6_index_0x0B1.set(value=0x01)
-            self.RawInterface6_index_0x0B2.set(value=0xFF)
-            self.RawInterface6_index_0x0B3.set(value=0xFF)
-            self.RawInterface6_index_0x0B4.set(value=0x00)
-            self.RawInterface6_index_0x0C6.set(value=0xFE)
-            self.RawInterface6_index_0x0C7.set(value=0x00)
-            self.RawInterface6_index_0x0C8.set(value=0x00)
-            self.RawInterface6_index_0x0C9.set(value=0x02)
-            self.RawInterface6_index_0x0CA.set(value=0x00)
-            self.RawInterface6_index_0x0CB.set(value=0x00)
-            self.RawInterface6_index_0x0DD.set(value=0xFF)
-            self.RawInterface6_index_0x0DE.set(value=0x00)
-            self.RawInterface6_index_0x0DF.set(value=0x02)
-            self.RawInterface6_index_0x0E0.set(value=0x00)
-            self.RawInterface6_index_0x0E1.set(value=0xFE)
-            self.RawInterface6_index_0x0E2.set(value=0x00)
-            self.RawInterface6_index_0x0F4.set(value=0x00)
-            self.RawInterface6_index_0x0F5.set(value=0x00)
-            self.RawInterface6_index_0x0FB.set(value=0x01)
-            self.RawInterface6_index_0x0FC.set(value=0x01)
-            self.RawInterface4_index_0x003.set(value=0x00)
-            self.RawInterface4_index_0x004.set(value=0x20)
-            self.RawInterface4_index_0x002.set(value=0xF9)
-            self.RawInterface6_index_0x074.set(value=0xF4)
-            self.RawInterface6_index_0x075.set(value=0x01)
-            self.RawInterface6_index_0x076.set(value=0xEF)
-            self.RawInterface6_index_0x077.set(value=0x0C)
-            self.RawInterface6_index_0x078.set(value=0x0A)
-            self.RawInterface6_index_0x079.set(value=0xFE)
-            self.RawInterface6_index_0x08B.set(value=0xF4)
-            self.RawInterface6_index_0x08C.set(value=0x01)
-            self.RawInterface6_index_0x08D.set(value=0xEE)
-            self.RawInterface6_index_0x08E.set(value=0x0D)
-            self.RawInterface6_index_0x08F.set(value=0x0A)
-            self.RawInterface6_index_0x090.set(value=0xFE)
-            self.RawInterface6_index_0x0A2.set(value=0xF4)
-            self.RawInterface6_index_0x0A3.set(value=0x01)
-            self.RawInterface6_index_0x0A4.set(value=0xEF)
-            self.RawInterface6_index_0x0A5.set(value=0x0C)
-            self.RawInterface6_index_0x0A6.set(value=0x0A)
-            self.RawInterface6_index_0x0A7.set(value=0xFE)
-            self.RawInterface6_index_0x0B9.set(value=0xF4)
-            self.RawInterface6_index_0x0BA.set(value=0x01)
-            self.RawInterface6_index_0x0BB.set(value=0xEF)
-            self.RawInterface6_index_0x0BC.set(value=0x0D)
-            self.RawInterface6_index_0x0BD.set(value=0x0A)
-            self.RawInterface6_index_0x0BE.set(value=0xFE)
-            self.RawInterface6_index_0x0D0.set(value=0xFF)
-            self.RawInterface6_index_0x0D1.set(value=0x00)
-            self.RawInterface6_index_0x0D2.set(value=0xFF)
-            self.RawInterface6_index_0x0D3.set(value=0x01)
-            self.RawInterface6_index_0x0D4.set(value=0x00)
-            self.RawInterface6_index_0x0D5.set(value=0x00)
-            self.RawInterface6_index_0x0E7.set(value=0xFF)
-            self.RawInterface6_index_0x0E8.set(value=0x00)
-            self.RawInterface6_index_0x0E9.set(value=0x01)
-            self.RawInterface6_index_0x0EA.set(value=0x00)
-            self.RawInterface6_index_0x0EB.set(value=0x00)
-            self.RawInterface6_index_0x0EC.set(value=0x00)
-            self.RawInterface6_index_0x0FE.set(value=0xFE)
-            self.RawInterface6_index_0x0FF.set(value=0x00)
-            self.RawInterface4_index_0x002.set(value=0xFA)
-            self.RawInterface6_index_0x000.set(value=0xFF)
-            self.RawInterface6_index_0x001.set(value=0x02)
-            self.RawInterface6_index_0x002.set(value=0x01)
-            self.RawInterface6_index_0x003.set(value=0x00)
-            self.RawInterface6_index_0x015.set(value=0xFF)
-            self.RawInterface6_index_0x016.set(value=0x00)
-            self.RawInterface6_index_0x017.set(value=0x01)
-            self.RawInterface6_index_0x018.set(value=0x00)
-            self.RawInterface6_index_0x019.set(value=0xFF)
-            self.RawInterface6_index_0x01A.set(value=0x00)
-            self.RawInterface6_index_0x02C.set(value=0x00)
-            self.RawInterface6_index_0x02D.set(value=0x00)
-            self.RawInterface6_index_0x033.set(value=0x01)
-            self.RawInterface6_index_0x034.set(value=0x01)
-            self.RawInterface4_index_0x002.set(value=0x00)
-            self.RawInterface4_index_0x003.set(value=0x00)
-            self.RawInterface4_index_0x004.set(value=0x68)
-            self.RawInterface6_index_0x068.set(value=0x00)
-            self.RawInterface0_index_0x011.set(value=0x00)
-            self.RawInterface0_index_0x012.set(value=0x04)
-            self.RawInterface0_index_0x05C.set(value=0x87)
-            self.RawInterface0_index_0x012.set(value=0x00)
+            return _SET_NL_TRIM.run(self)
 
         @self.command()
         def JESD_DDC_config():
-            # JESD DIGITAL PAGE
-            channels = self.find(typ=surf.devices.ti.Adc32Rf45Channel)
-            for channel in channels:
-                channel.SCRAMBLE_EN.set(0x1, write=True)
-                channel.node('12BIT_MODE').set(0x0, write=True)       # need to use node to find variables with leading #
-                channel.SYNC_REG_EN.set(0x0, write=True)
-                channel.SYNC_REG.set(0x0, write=True)
-                channel.RAMP_12BIT.set(0x0, write=True)
-                channel.JESD_MODE0.set(0x0, write=True)
-                channel.JESD_MODE1.set(0x0, write=True)
-                channel.JESD_MODE2.set(0x1, write=True)
-                channel.LMFC_MASK_RESET.set(0x0, write=True)
-                channel.LINK_LAY_RPAT.set(0x0, write=True)
-                channel.LINK_LAYER_TESTMODE.set(0x0, write=True)
-                channel.node('40X_MODE').set(0x7, write=True)          # need to use node to find variables with leading 3
-                channel.PLL_MODE.set(0x2, write=True)
-                channel.SEL_EMP_LANE0.set(0x03, write=True)
-                channel.SEL_EMP_LANE1.set(0x3F, write=True)  # unused lane
-                channel.SEL_EMP_LANE2.set(0x03, write=True)
-                channel.SEL_EMP_LANE3.set(0x3F, write=True)  # unused lane
-                channel.TX_LINK_DIS.set(0x0, write=True)
-                channel.FRAME_ALIGN.set(0x1, write=True)
-                channel.LANE_ALIGN.set(0x1, write=True)
-                channel.TESTMODE_EN.set(0x0, write=True)
-                channel.CTRL_K.set(0x1, write=True)
-                channel.FRAMES_PER_MULTIFRAME.set(0x1F, write=True)
-
-                # Decimation filter page
-                channel.DDC_EN.set(0x1,write=True)
-                channel.DECIM_FACTOR.set(0x0,write=True)
-                channel.DUAL_BAND_EN.set(0x0,write=True)
-                channel.REAL_OUT_EN.set(0x0,write=True)
-                # Write the value that has been loaded via yaml,
-                # or write the default value defined in _AdcRf45Channel.py
-                channel.DDC0_NCO1_LSB.write()
-                channel.DDC0_NCO1_MSB.write()
-                channel.DDC0_NCO2_LSB.write()
-                channel.DDC0_NCO2_MSB.write()
-                channel.DDC0_NCO3_LSB.write()
-                channel.DDC0_NCO3_MSB.write()
-                channel.NCO_SEL_PIN.set(0x00,write=True)
-                channel.NCO_SEL.set(0x00,write=True)
-                channel.LMFC_RESET_MODE.set(0x00,write=True)
-                channel.DDC0_6DB_GAIN.set(0x01,write=True)
-                channel.DDC1_6DB_GAIN.set(0x01,write=True)
-                channel.DDC_DET_LAT.set(0x05,write=True)
-                channel.WBF_6DB_GAIN.set(0x01,write=True)
-                channel.CUSTOM_PATTERN1_LSB.set(0x00,write=True)
-                channel.CUSTOM_PATTERN1_MSB.set(0x00,write=True)
-                channel.CUSTOM_PATTERN2_LSB.set(0x00,write=True)
-                channel.CUSTOM_PATTERN2_MSB.set(0x00,write=True)
-                channel.TEST_PATTERN_SEL.set(0x00,write=True)
-                channel.TEST_PAT_RES.set(0x00,write=True)
-                channel.TP_RES_EN.set(0x00,write=True)
+            return _JESD_DDC_CONFIG.run(self)
 
         @self.command(description  = "Digital Reset")
         def DigRst():
-            # Wait for 50 ms for the device to estimate the interleaving errors
-            time.sleep(0.250) # TODO: Optimize this timeout
-            self.CH[0].JesdDigital_index_0x000.set(value=0x00)
-            self.CH[1].JesdDigital_index_0x000.set(value=0x00)
-            self.CH[0].JesdDigital_index_0x000.set(value=0x01)
-            self.CH[1].JesdDigital_index_0x000.set(value=0x01)
-            self.CH[0].JesdDigital_index_0x000.set(value=0x00)
-            self.CH[1].JesdDigital_index_0x000.set(value=0x00)
-
-            # Wait for 50 ms for the device to estimate the interleaving errors
-            time.sleep(0.250) # TODO: Optimize this timeout
-            self.CH[0].MainDigital_index_0x000.set(value=0x00)
-            self.CH[1].MainDigital_index_0x000.set(value=0x00)
-            self.CH[0].MainDigital_index_0x000.set(value=0x01)
-            self.CH[1].MainDigital_index_0x000.set(value=0x01)
-            self.CH[0].MainDigital_index_0x000.set(value=0x00)
-            self.CH[1].MainDigital_index_0x000.set(value=0x00)
+            return _DIG_RST.run(self)
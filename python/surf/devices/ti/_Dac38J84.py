@@ -14,7 +14,70 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
-import time
+import surf.misc
+
+##############################
+# Command register sequences
+##############################
+
+_CLEAR_ALARMS = surf.misc.RegSequence([
+    ('write', f'DacReg[{i}]', 0) for i in range(100, 110)
+])
+
+_NCO_SYNC = surf.misc.RegSequence([
+    ('write', 'EnableTx', 0x0),
+    ('delay', 0.010),
+    ('write', 'InitJesd', 0x1),
+    ('delay', 0.010),
+    ('write', 'JesdRstN', 0x0),
+    ('delay', 0.010),
+    ('write', 'JesdRstN', 0x1),
+    ('delay', 0.010),
+    ('write', 'InitJesd', 0x0),
+    ('delay', 0.010),
+    ('write', 'EnableTx', 0x1),
+    ('delay', 0.010),
+])
+
+_INIT = surf.misc.RegSequence([
+    ('write', 'EnableTx', 0),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    _CLEAR_ALARMS,
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[59]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[37]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[60]', 0xFFFF, 0x0200),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[60]', 0xFDFF),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[62]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[76]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[77]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[75]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[77]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[78]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[0]'),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[74]', 0xFFE0, 0x1E),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[74]', 0xFFE0, 0x1E),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[74]', 0xFFE0, 0x1F),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('update', 'DacReg[74]', 0xFFE0, 0x01),
+    ('delay', 0.010), # TODO: Optimize this timeout
+    ('write', 'EnableTx', 1),
+    ('delay', 0.010), # TODO: Optimize this timeout
+])
+
 
 class Dac38J84(pr.Device):
     def __init__(self,
@@ -363,68 +426,13 @@ class Dac38J84(pr.Device):
         ##############################
         @self.command(name="ClearAlarms", description="Clear all the DAC alarms",)
         def ClearAlarms():
-            self.DacReg[100].set(0)
-            self.DacReg[101].set(0)
-            self.DacReg[102].set(0)
-            self.DacReg[103].set(0)
-            self.DacReg[104].set(0)
-            self.DacReg[105].set(0)
-            self.DacReg[106].set(0)
-            self.DacReg[107].set(0)
-            self.DacReg[108].set(0)
-            self.DacReg[109].set(0)
+            return _CLEAR_ALARMS.run(self)
 
         @self.command(name="NcoSync", description="Special DAC Init procedure to sync NCO",)
         def NcoSync():
-            self.EnableTx.set(0x0)
-            time.sleep(0.010)
-            self.InitJesd.set(0x1)
-            time.sleep(0.010)
-            self.JesdRstN.set(0x0)
-            time.sleep(0.010)
-            self.JesdRstN.set(0x1)
-            time.sleep(0.010)
-            self.InitJesd.set(0x0)
-            time.sleep(0.010)
-            self.EnableTx.set(0x1)
-            time.sleep(0.010)
+            return _NCO_SYNC.run(self)
 
         @self.command(name="Init", description="Initialization sequence for the DAC JESD core",)
         def Init():
             self.writeBlocks(force=True)
-            self.EnableTx.set(0)
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.ClearAlarms()
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[59].set( self.DacReg[59].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[37].set( self.DacReg[37].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[60].set( self.DacReg[60].value() | 0x0200 )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[60].set( self.DacReg[60].value() & 0xFDFF )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[62].set( self.DacReg[62].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[76].set( self.DacReg[76].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[77].set( self.DacReg[77].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[75].set( self.DacReg[75].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[77].set( self.DacReg[77].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[78].set( self.DacReg[78].value() )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[0].set(  self.DacReg[0].value()  )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[74].set( (self.DacReg[74].value() & 0xFFE0) | 0x1E )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[74].set( (self.DacReg[74].value() & 0xFFE0) | 0x1E )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[74].set( (self.DacReg[74].value() & 0xFFE0) | 0x1F )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.DacReg[74].set( (self.DacReg[74].value() & 0xFFE0) | 0x01 )
-            time.sleep(0.010) # TODO: Optimize this timeout
-            self.EnableTx.set(1)
-            time.sleep(0.010) # TODO: Optimize this timeout
+            return _INIT.run(self)
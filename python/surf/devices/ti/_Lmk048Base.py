@@ -9,6 +9,18 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import rogue.interfaces.memory as rim
+import surf.misc
+
+# CodeLoader ID register address -> read-only variable
+_CODE_LOADER_IDS = {
+    0x003 : 'ID_DEVICE_TYPE',
+    0x004 : 'ID_PROD_UPPER',
+    0x005 : 'ID_PROD_LOWER',
+    0x006 : 'ID_MASKREV',
+    0x00C : 'ID_VNDR_UPPER',
+    0x00D : 'ID_VNDR_LOWER',
+}
 
 class Lmk048Base(pr.Device):
     def __init__(self, allowHexFileRst=True,**kwargs):
@@ -1136,46 +1148,12 @@ class Lmk048Base(pr.Device):
         ##############################
         # Commands
         ##############################
-        @self.command(description='Load the CodeLoader .HEX file',value='',)
+        @self.command(description='Load the CodeLoader .HEX file (or its compiled .clkimg image)',value='',)
         def LoadCodeLoaderHexFile(arg):
-            with open(arg, 'r') as ifd:
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    if len(s) == 3:
-                        data = int("0x" + s[2][-2:], 0)
-                    else:
-                        data = int("0x" + s[1][-2:], 0)
-                    if addr == 0:
-                        if self.allowHexFileRst:
-                            self.LmkReg_0x0000.set(data)
-                    elif addr == 3:
-                        v = getattr(self, 'ID_DEVICE_TYPE')
-                        if (v.get() != data):
-                            print(f'ID_DEVICE_TYPE mismatch: {v.get()} != {data}')
-                    elif addr == 4:
-                        v = getattr(self, 'ID_PROD_LOWER')
-                        if (v.get() != data):
-                            print(f'ID_PROD_LOWER mismatch: {v.get()} != {data}')
-                    elif addr == 5:
-                        v = getattr(self, 'ID_PROD_UPPER')
-                        if (v.get() != data):
-                            print(f'ID_PROD_UPPER mismatch: {v.get()} != {data}')
-                    elif addr == 6:
-                        v = getattr(self, 'ID_MASKREV')
-                        if (v.get() != data):
-                            print(f'ID_MASKREV mismatch: {v.get()} != {data}')
-                    elif addr == 12:
-                        v = getattr(self, 'ID_VNDR_UPPER')
-                        if (v.get() != data):
-                            print(f'ID_VNDR_UPPER mismatch: {v.get()} != {data}')
-                    elif addr == 13:
-                        v = getattr(self, 'ID_VNDR_LOWER')
-                        if (v.get() != data):
-                            print(f'ID_VNDR_LOWER mismatch: {v.get()} != {data}')
-                    else:
-                        v = getattr(self, f'LmkReg_0x{addr:04X}')
-                        v.set(data)
+            # Compile and validate the whole file before touching the device
+            regs, ids = self._codeLoaderRegs(surf.misc.ClockConfig.open(arg, 'Lmk048'))
+            self._checkCodeLoaderIds(ids)
+            self._writeCodeLoaderRegs(regs)
 
         @self.command(description='Powerdown the sysref lines',)
         def PwrDwnSysRef():
@@ -1219,3 +1197,55 @@ class Lmk048Base(pr.Device):
         self.hideVariables(hidden=True)
         # Then unhide the most interesting ones
         self.hideVariables(hidden=False, variables=simpleViewList)
+
+    def _codeLoaderRegs(self, image):
+        # Ordered (variable, data) register writes and {address: data} ID values
+        regs = []
+        ids  = {}
+        for addr, data in image:
+            if addr == 0:
+                if self.allowHexFileRst:
+                    regs.append((self.LmkReg_0x0000, data))
+            elif addr in _CODE_LOADER_IDS:
+                ids[addr] = data
+            else:
+                regs.append((getattr(self, f'LmkReg_0x{addr:04X}'), data))
+        return regs, ids
+
+    def _checkCodeLoaderIds(self, ids):
+        # One read transaction per block of ID registers
+        variables = [getattr(self, _CODE_LOADER_IDS[addr]) for addr in ids]
+        blocks    = list({id(v._block): v._block for v in variables}.values())
+        for block in blocks:
+            pr.startTransaction(block, type=rim.Read)
+        for block in blocks:
+            pr.checkTransaction(block)
+        for v, data in zip(variables, ids.values()):
+            if (v.get(read=False) != data):
+                print(f'{v.name} mismatch: {v.get(read=False)} != {data}')
+
+    def _writeCodeLoaderRegs(self, regs):
+        # Split the file order into runs of consecutive register addresses
+        runs = []
+        for v, data in regs:
+            if runs and (runs[-1][-1][0].offset + 4 == v.offset):
+                runs[-1].append((v, data))
+            else:
+                runs.append([(v, data)])
+
+        # One block write per run (each register is its own variable block),
+        # issued in the file order, then the shadow values are updated
+        for run in runs:
+            self._rawWrite(offset=run[0][0].offset, data=[data for _, data in run])
+            for v, data in run:
+                v.set(data, write=False)
+
+            # Read back and compare the registers with verify enabled, as the variable set() does
+            if any(v._verify and (v.mode == 'RW') for v, _ in run):
+                readBack = self._rawRead(offset=run[0][0].offset, numWords=len(run))
+                readBack = readBack if isinstance(readBack, list) else [readBack]
+                for (v, data), value in zip(run, readBack):
+                    mask = (1 << v.bitSize[0]) - 1
+                    if v._verify and (v.mode == 'RW') and ((data ^ value) & mask):
+                        raise pr.MemoryError(name=v.path, address=v.address,
+                                             msg=f'Verify error: wrote 0x{data & mask:x}, read 0x{value & mask:x}')
@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 import time
 
 class Lmx2594(pr.Device):
@@ -225,9 +226,12 @@ class Lmx2594(pr.Device):
             mode        = 'RO',
         )
 
-        @self.command(description='Load the CodeLoader .HEX file',value='',)
+        @self.command(description='Load the CodeLoader .HEX file (or its compiled .clkimg image)',value='',)
         def LoadCodeLoaderHexFile(arg):
 
+            # Compile and validate the whole file before touching the device
+            image = surf.misc.ClockConfig.open(arg, 'Lmx2594')
+
             self.DataBlock.set(value=0x2410,index=0, write=True) # MUXOUT_LD_SEL=readback
 
             ##################################################################
@@ -243,14 +247,9 @@ class Lmx2594(pr.Device):
             self.DataBlock.set(value=0x2410, index=0, write=True)
 
             # 4. Program registers as shown in the register map in REVERSE order from highest to lowest.
-            with open(arg, 'r') as ifd:
-                # Note: HEX file dumped in REVERSE order
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    data = int("0x" + s[1][-4:], 0)
-                    # print( f'addr={addr}, data={hex(data)}' )
-                    self.DataBlock.set(value=data, index=addr, write=True)
+            # Note: HEX file dumped in REVERSE order (register by register in the file order)
+            for addr, data in image:
+                self.DataBlock.set(value=data, index=addr, write=True)
 
             # 5. Wait 10 ms.
             time.sleep(0.1)
@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 class Lmx2615(pr.Device):
     def __init__(self, **kwargs):
@@ -744,17 +745,11 @@ class Lmx2615(pr.Device):
             self.RESET.set(0x1)
             self.RESET.set(0x0)
 
-        @self.command(description='Load the CodeLoader Hex Export file',value='',)
+        @self.command(description='Load the CodeLoader Hex Export file (or its compiled .clkimg image)',value='',)
         def LoadCodeLoaderHexFile(arg):
-            with open(arg, 'r') as ifd:
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    if len(s) == 3:
-                        data = int("0x" + s[2][-4:], 0)
-                    else:
-                        data = int("0x" + s[1][-4:], 0)
-                    print(f'writing {addr:#04x}: {data:#06x}')
-                    self.DataBlock.set(value=data, index=addr, write=True)
+            # Compile and validate the whole file before touching the device
+            for addr, data in surf.misc.ClockConfig.open(arg, 'Lmx2615'):
+                print(f'writing {addr:#04x}: {data:#06x}')
+                self.DataBlock.set(value=data, index=addr, write=True)
 
             self.MUXOUT_LD_SEL.set(0x0)
@@ -0,0 +1,268 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Clock Configuration Module
+#-----------------------------------------------------------------------------
+# Description:
+# Compiles the clock chip vendor configuration files (ClockBuilder Pro .csv
+# register exports, TICS Pro CodeLoader .txt/.hex exports) into a validated
+# register image: the ordered (address, data) register writes of the file.
+#
+# The compiled image is cached next to the source file (<source>.clkimg) and
+# is reused as long as the SHA-256 digest of the source matches. The .clkimg
+# file can also be passed to the device loaders instead of the source file.
+#
+#    header : magic, version, family, numRegs, source SHA-256 digest
+#    addr   : numRegs x uint32
+#    data   : numRegs x uint32
+#
+# Example:
+#    image = surf.misc.ClockConfig.open('config.csv', 'Si5345')
+#    image.writeMem('config.mem')
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import hashlib
+import os
+import struct
+import tempfile
+
+class ClockConfigException(Exception):
+    pass
+
+# Wait code of the boot ROM .mem files (wait 625 ms)
+_MEM_WAIT = None
+
+# family : source format, last register address, data bits, .mem preamble/postamble
+_FAMILIES = {
+    'Si5345' : {
+        'format'   : 'csv',
+        'maxAddr'  : 0x0BFF,
+        'dataBits' : 8,
+        # Power down during the configuration load
+        'preamble' : [(0x001E, 0x01)],
+        # BW_UPDATE_PLL, power up and clear the internal error flags
+        'postamble': [(0x0514, 0x01), (0x0514, 0x00), (0x001E, 0x00), (0x0011, 0x01)],
+    },
+    'Si5394' : {
+        'format'   : 'csv',
+        'maxAddr'  : 0x0CFF,
+        'dataBits' : 8,
+        # Start configuration preamble and wait for any calibration to complete
+        'preamble' : [(0x0B24, 0xC0), (0x0B25, 0x00), (0x0540, 0x01), _MEM_WAIT],
+        # Start configuration postamble
+        'postamble': [(0x0514, 0x01), (0x001C, 0x01), (0x0540, 0x00), (0x0B24, 0xC3), (0x0B25, 0x02)],
+    },
+    'Lmk048' : {
+        'format'   : 'hex',
+        'maxAddr'  : 0x1FFF,
+        'dataBits' : 8,
+    },
+    'Lmx2594' : {
+        'format'   : 'hex',
+        'maxAddr'  : 112,
+        'dataBits' : 16,
+    },
+    'Lmx2615' : {
+        'format'   : 'hex',
+        'maxAddr'  : 1023,
+        'dataBits' : 16,
+    },
+}
+
+class ClockConfig():
+
+    MAGIC     = b'SURFCLK\0'
+    VERSION   = 1
+    EXTENSION = '.clkimg'
+
+    _HEADER = struct.Struct('<8sI16sI32s')
+
+    def __init__(self, family, addr, data, source=''):
+        if family not in _FAMILIES:
+            raise ClockConfigException(f'ClockConfig: unknown family {family!r} (expected one of {", ".join(_FAMILIES)})')
+        self.family = family
+        self.addr   = np.asarray(addr, dtype=np.uint32)
+        self.data   = np.asarray(data, dtype=np.uint32)
+        self.source = source
+
+        # Validate the whole image before anything is written to a device
+        spec = _FAMILIES[family]
+        if self.addr.shape != self.data.shape:
+            raise ClockConfigException(f'ClockConfig({source}): address and data length mismatch')
+        bad = np.flatnonzero((self.addr > spec['maxAddr']) | (self.data >> spec['dataBits'] != 0))
+        if len(bad):
+            i = int(bad[0])
+            raise ClockConfigException(
+                f'ClockConfig({source}): register {i} (0x{int(self.addr[i]):x} = 0x{int(self.data[i]):x}) '
+                f'out of range for {family}')
+
+    def __len__(self):
+        return len(self.addr)
+
+    def __iter__(self):
+        # (address, data) register writes in the file order
+        return zip(self.addr.tolist(), self.data.tolist())
+
+    @staticmethod
+    def _runs(addr, data, pageSize):
+        # Split into [(startAddr, [data, ...]), ...] runs of consecutive
+        # addresses, optionally not crossing a page boundary
+        brk = np.flatnonzero(addr[1:] != addr[:-1] + 1) + 1
+        if pageSize is not None:
+            brk = np.union1d(brk, np.flatnonzero(addr[1:] % pageSize == 0) + 1)
+        return [(int(a[0]), d.tolist()) for a, d in zip(np.split(addr, brk), np.split(data, brk)) if len(a)]
+
+    def runs(self, pageSize=None):
+        # Runs of the register writes in the file order
+        return self._runs(self.addr, self.data, pageSize)
+
+    def writtenRuns(self, pageSize=None):
+        # Runs of the written registers in address order, with the last value
+        # written to each address (the expected read back values)
+        addr, last = np.unique(self.addr[::-1], return_index=True)
+        return self._runs(addr, self.data[::-1][last], pageSize)
+
+    def writeDevice(self, device, pageSize=None):
+        # One write transaction per run in the file order (one 32-bit word per
+        # register), then the written registers are read back. Returns the
+        # [(address, written, readBack), ...] registers in address order.
+        for addr, data in self.runs(pageSize):
+            device._rawWrite(offset=(addr<<2), data=data)
+
+        regs = []
+        for addr, data in self.writtenRuns(pageSize):
+            values = device._rawRead(offset=(addr<<2), numWords=len(data))
+            values = values if isinstance(values, list) else [values]
+            regs.extend((addr+i, data[i], value) for i, value in enumerate(values))
+        return regs
+
+    @classmethod
+    def open(cls, filename, family, cache=True):
+        # Compiled image passed directly
+        if filename.endswith(cls.EXTENSION):
+            return cls.load(filename, family)
+
+        with open(filename, 'rb') as f:
+            raw = f.read()
+        digest    = hashlib.sha256(raw).digest()
+        cachePath = filename + cls.EXTENSION
+
+        if cache:
+            try:
+                return cls.load(cachePath, family, digest)
+            except (OSError, ClockConfigException):
+                pass
+
+        image = cls.parse(raw.decode(), family, source=filename)
+        if cache:
+            try:
+                image.save(cachePath, digest)
+            except OSError as e:
+                click.secho(f'ClockConfig: failed to cache {cachePath}: {e}', fg='yellow')
+        return image
+
+    @classmethod
+    def parse(cls, text, family, source=''):
+        if family not in _FAMILIES:
+            raise ClockConfigException(f'ClockConfig: unknown family {family!r} (expected one of {", ".join(_FAMILIES)})')
+        if _FAMILIES[family]['format'] == 'csv':
+            regs = cls._parseCsv(text, source)
+        else:
+            regs = cls._parseHex(text, _FAMILIES[family]['dataBits'], source)
+        return cls(family, [a for a, _ in regs], [d for _, d in regs], source=source)
+
+    @staticmethod
+    def _parseCsv(text, source):
+        # ClockBuilder Pro register export: 'Address,Data' header and '0x0B24,0xC0' rows
+        regs = []
+        for i, line in enumerate(text.splitlines()):
+            row = [field.strip() for field in line.split(',')]
+            if (not row[0]) or row[0].startswith('#') or (row[0] == 'Address'):
+                continue
+            try:
+                regs.append((int(row[0], 16), int(row[1], 16)))
+            except (ValueError, IndexError):
+                raise ClockConfigException(f'ClockConfig({source}): bad register on line {i+1}: {line.strip()!r}')
+        return regs
+
+    @staticmethod
+    def _parseHex(text, dataBits, source):
+        # TICS Pro CodeLoader export: 'R<address> [(name)] 0x<address><data>' rows
+        regs = []
+        for i, line in enumerate(text.splitlines()):
+            s = line.split()
+            if not s:
+                continue
+            try:
+                addr = int(s[0][1:], 0)
+                word = int(s[-1], 16)
+            except ValueError:
+                raise ClockConfigException(f'ClockConfig({source}): bad register on line {i+1}: {line.strip()!r}')
+            # The SPI word carries the same address as the register name
+            if (word >> dataBits) != addr:
+                raise ClockConfigException(f'ClockConfig({source}): address mismatch on line {i+1}: {line.strip()!r}')
+            regs.append((addr, word & ((1 << dataBits)-1)))
+        return regs
+
+    @classmethod
+    def load(cls, filename, family=None, digest=None):
+        with open(filename, 'rb') as f:
+            raw = f.read()
+        try:
+            magic, version, name, numRegs, source = cls._HEADER.unpack_from(raw)
+        except struct.error:
+            raise ClockConfigException(f'ClockConfig({filename}): truncated header')
+        name = name.rstrip(b'\0').decode()
+
+        if (magic != cls.MAGIC) or (version != cls.VERSION):
+            raise ClockConfigException(f'ClockConfig({filename}): not a compiled clock configuration')
+        if (family is not None) and (name != family):
+            raise ClockConfigException(f'ClockConfig({filename}): compiled for {name}, not {family}')
+        if (digest is not None) and (source != digest):
+            raise ClockConfigException(f'ClockConfig({filename}): stale image')
+        if len(raw) != cls._HEADER.size + 8*numRegs:
+            raise ClockConfigException(f'ClockConfig({filename}): truncated image')
+
+        regs = np.frombuffer(raw, dtype='<u4', offset=cls._HEADER.size).reshape(2, numRegs)
+        return cls(name, regs[0], regs[1], source=filename)
+
+    def save(self, filename, digest=b''):
+        header = self._HEADER.pack(self.MAGIC, self.VERSION, self.family.encode(), len(self), digest)
+
+        # Write to a temporary file and rename it into place
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(self.addr.astype('<u4').tobytes())
+                f.write(self.data.astype('<u4').tobytes())
+            os.replace(tmp, filename)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def writeMem(self, filename, depth=1024):
+        # Boot ROM .mem file of the Si5345.vhd/Si5394I2c.vhd firmware: one
+        # 'AAAADD,' word per register write, the configuration preamble and
+        # postamble included, zero filled up to the ROM depth
+        spec = _FAMILIES[self.family]
+        if 'preamble' not in spec:
+            raise ClockConfigException(f'ClockConfig: no boot ROM format for {self.family}')
+
+        words = []
+        for reg in spec['preamble'] + list(self) + spec['postamble']:
+            words.append('FFFFFF' if reg is _MEM_WAIT else f'{reg[0]:04X}{reg[1]:02X}')
+        if len(words) > depth:
+            raise ClockConfigException(f'ClockConfig({self.source}): {len(words)} register writes do not fit in the {depth} word ROM')
+        words += ['000000'] * (depth-len(words))
+
+        with open(filename, 'w') as ofd:
+            ofd.write(''.join(f'{word},' for word in words))
@@ -0,0 +1,103 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Flash Ready Wait Module
+#-----------------------------------------------------------------------------
+# Description:
+# Adaptive busy-polling of a flash ready/busy status.
+#
+# The device marks the start of a program/erase operation with start(). The
+# next wait() first sleeps for the (learned) typical duration of that
+# operation, then polls the ready status with an exponential backoff until
+# it is ready or the timeout expires. Per-operation latency and poll counts
+# are recorded.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import time
+
+import surf.misc
+
+class FlashReadyWait():
+
+    def __init__(self,
+            name     = 'Flash',
+            typical  = None,   # Typical duration (seconds) per operation name
+            timeout  = 10.0,   # Maximum time (seconds) to wait for ready
+            minPoll  = 20e-6,  # First polling interval (seconds)
+            maxPoll  = 20e-3,  # Largest polling interval (seconds)
+            backoff  = 2.0,    # Polling interval multiplier
+            sleepFrac= 0.8):   # Fraction of the typical duration slept before the first poll
+        self.name      = name
+        self.timeout   = timeout
+        self.minPoll   = minPoll
+        self.maxPoll   = maxPoll
+        self.backoff   = backoff
+        self.sleepFrac = sleepFrac
+
+        # Typical durations, updated with the measured latencies
+        self.typical = {'program': 0.5e-3, 'erase': 0.5, 'command': 0.0}
+        if typical is not None:
+            self.typical.update(typical)
+
+        self._op    = None
+        self._start = 0.0
+        self.resetStats()
+
+    def resetStats(self):
+        self.stats = {}
+
+    def start(self, op):
+        # Mark the start of a program/erase operation
+        self._op    = op
+        self._start = time.monotonic()
+
+    def wait(self, isReady):
+        op    = self._op if self._op is not None else 'command'
+        start = self._start if self._op is not None else time.monotonic()
+        self._op = None
+
+        # Sleep through the typical duration of the pending operation
+        remaining = min(self.sleepFrac*self.typical.get(op, 0.0), self.timeout) - (time.monotonic()-start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+        # Poll with an exponential backoff
+        polls = 0
+        delay = self.minPoll
+        while True:
+            polls += 1
+            if isReady():
+                break
+            elapsed = time.monotonic() - start
+            if elapsed > self.timeout:
+                raise surf.misc.McsException(f'{self.name}: flash not ready after {elapsed:.3f} s ({op}, {polls} polls)')
+            time.sleep(min(delay, max(0.0, self.timeout-elapsed)))
+            delay = min(delay*self.backoff, self.maxPoll)
+
+        # Record the latency and learn the typical duration
+        latency = time.monotonic() - start
+        stat = self.stats.setdefault(op, {'count': 0, 'total': 0.0, 'min': latency, 'max': 0.0, 'polls': 0})
+        stat['count'] += 1
+        stat['total'] += latency
+        stat['min']    = min(stat['min'], latency)
+        stat['max']    = max(stat['max'], latency)
+        stat['polls'] += polls
+        if (op != 'command') and (op in self.typical):
+            self.typical[op] += 0.1*(latency - self.typical[op])
+        return latency
+
+    def summary(self):
+        lines = []
+        for op, stat in sorted(self.stats.items()):
+            lines.append(
+                f'{self.name} {op:8s}: {stat["count"]} ops, '
+                f'avg {1e3*stat["total"]/stat["count"]:.3f} ms, '
+                f'min {1e3*stat["min"]:.3f} ms, max {1e3*stat["max"]:.3f} ms, '
+                f'{stat["polls"]/stat["count"]:.2f} polls/op')
+        return '\n'.join(lines)
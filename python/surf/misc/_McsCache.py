@@ -0,0 +1,206 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue MCS Cache Module
+#-----------------------------------------------------------------------------
+# Description:
+# Persistent on-disk cache of decoded MCS images.
+#
+# Entries are keyed by the SHA-256 digest and size of the source file and are
+# stored in a memory-mappable binary format:
+#
+#    header   : magic, version, numSeg, dataSize, startAddr, endAddr, lastAddr
+#    segments : numSeg x (base address, length)
+#    data     : dataSize bytes (page aligned)
+#
+# Entries are written to a temporary file and atomically renamed into place,
+# and eviction runs under an flock()'d lock file, so several processes on one
+# host can share the same cache directory. The source file indexes (.key) of
+# the evicted entries are removed with them.
+#
+# McsReader uses the cache only when enabled (cacheEn=True or the
+# SURF_MCS_CACHE_DIR environment variable set).
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import surf.misc
+
+class McsCache():
+
+    MAGIC   = b'SURFMCS\0'
+    VERSION = 1
+
+    _HEADER  = struct.Struct('<8sIIQQQQ')
+    _SEGMENT = struct.Struct('<QQ')
+    _ALIGN   = 4096
+
+    def __init__(self, cacheDir=None, maxSize=None):
+        # Cache location and size limit (bytes), defaulting to the environment
+        if cacheDir is None:
+            cacheDir = os.environ.get('SURF_MCS_CACHE_DIR', os.path.join('~', '.cache', 'surf', 'mcs'))
+        if maxSize is None:
+            maxSize = int(os.environ.get('SURF_MCS_CACHE_SIZE', 4*2**30))
+
+        self.cacheDir = os.path.abspath(os.path.expanduser(cacheDir))
+        self.maxSize  = maxSize
+
+    def key(self, filename):
+        # Content hash of the source file, memoized on its size, timestamps and inode
+        st = os.stat(filename)
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+        index = self._indexPath(filename)
+
+        try:
+            with open(index, 'r') as f:
+                memo = json.load(f)
+            if memo['stamp'] == stamp:
+                return memo['key']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 24), b''):
+                digest.update(chunk)
+        key = f'{digest.hexdigest()}-{st.st_size:x}'
+
+        self._atomicWrite(index, json.dumps({'stamp': stamp, 'key': key}).encode())
+        return key
+
+    def load(self, key):
+        # Returns (image, metadata) or None on a cache miss
+        path = self._entryPath(key)
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(self._HEADER.size)
+                magic, version, numSeg, dataSize, startAddr, endAddr, lastAddr = self._HEADER.unpack(header)
+                if (magic != self.MAGIC) or (version != self.VERSION):
+                    raise ValueError('bad header')
+                segments = [self._SEGMENT.unpack(f.read(self._SEGMENT.size)) for _ in range(numSeg)]
+
+            offset = self._dataOffset(numSeg)
+            if os.path.getsize(path) != offset + dataSize:
+                raise ValueError('truncated entry')
+
+            if dataSize:
+                data = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(dataSize,))
+            else:
+                data = np.empty(0, dtype=np.uint8)
+
+            # Mark as recently used
+            os.utime(path)
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError, struct.error):
+            # Drop entries that cannot be read back
+            self._remove(path)
+            return None
+
+        meta = {'startAddr': startAddr, 'endAddr': endAddr, 'lastAddr': lastAddr}
+        return surf.misc.McsImage(data=data, segments=segments), meta
+
+    def store(self, key, image, startAddr=0, endAddr=0, lastAddr=0):
+        numSeg = len(image.segments)
+        offset = self._dataOffset(numSeg)
+
+        header = self._HEADER.pack(self.MAGIC, self.VERSION, numSeg, image.size, startAddr, endAddr, lastAddr)
+        header += b''.join(self._SEGMENT.pack(base, length) for base, length in image.segments)
+        header += bytes(offset - len(header))
+
+        os.makedirs(self.cacheDir, exist_ok=True)
+        self._atomicWrite(self._entryPath(key), header, image.data)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        # Remove the least recently used entries until the cache fits in maxSize
+        os.makedirs(self.cacheDir, exist_ok=True)
+        with open(os.path.join(self.cacheDir, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries = []
+                for name in os.listdir(self.cacheDir):
+                    if name.endswith('.img'):
+                        try:
+                            st = os.stat(os.path.join(self.cacheDir, name))
+                        except FileNotFoundError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, name))
+
+                total = sum(size for _, size, _ in entries)
+                for _, size, name in sorted(entries):
+                    if total <= self.maxSize:
+                        break
+                    if (keep is not None) and (name == f'{keep}.img'):
+                        continue
+                    self._remove(os.path.join(self.cacheDir, name))
+                    total -= size
+
+                # Drop the source file indexes of the evicted (or lost) entries
+                for name in os.listdir(self.cacheDir):
+                    if name.endswith('.key'):
+                        path = os.path.join(self.cacheDir, name)
+                        try:
+                            with open(path, 'r') as f:
+                                key = json.load(f)['key']
+                            if os.path.exists(self._entryPath(key)):
+                                continue
+                        except (OSError, ValueError, KeyError, TypeError):
+                            pass
+                        self._remove(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def clear(self):
+        if not os.path.isdir(self.cacheDir):
+            return
+        for name in os.listdir(self.cacheDir):
+            if name.endswith('.img') or name.endswith('.key'):
+                self._remove(os.path.join(self.cacheDir, name))
+
+    def _entryPath(self, key):
+        return os.path.join(self.cacheDir, f'{key}.img')
+
+    def _indexPath(self, filename):
+        name = hashlib.sha1(os.path.realpath(filename).encode()).hexdigest()
+        return os.path.join(self.cacheDir, f'{name}.key')
+
+    def _dataOffset(self, numSeg):
+        size = self._HEADER.size + numSeg*self._SEGMENT.size
+        return ((size + self._ALIGN - 1) // self._ALIGN) * self._ALIGN
+
+    def _atomicWrite(self, path, *chunks):
+        # Write to a temporary file and rename it into place
+        os.makedirs(self.cacheDir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cacheDir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(memoryview(chunk))
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(tmp)
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                click.secho(f'McsCache: failed to remove {path}: {e}', fg='yellow')
@@ -0,0 +1,172 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue MCS Image Module
+#-----------------------------------------------------------------------------
+# Description:
+# Compact in-memory representation of a PROM image: a flat uint8 data buffer
+# plus a list of (base address, length) segments covering that buffer.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+import surf.misc
+
+class McsImage():
+
+    def __init__(self, data=None, segments=None):
+        # Flat data buffer (every segment back to back, in file order)
+        self.data = np.empty(0, dtype=np.uint8) if data is None else np.asarray(data, dtype=np.uint8)
+
+        # Default to a single segment starting at address zero
+        if segments is None:
+            segments = [(0, len(self.data))] if len(self.data) else []
+        self.segments = [(int(base), int(length)) for base, length in segments]
+
+        # Offset of each segment inside the data buffer
+        lengths = np.array([length for _, length in self.segments], dtype=np.int64)
+        self._offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self._bases   = np.array([base for base, _ in self.segments], dtype=np.int64)
+
+        if self._offsets[-1] != len(self.data):
+            raise surf.misc.McsException('McsImage: segment lengths do not match the data buffer')
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def startAddr(self):
+        return self.segments[0][0] if self.segments else 0
+
+    @property
+    def endAddr(self):
+        if not self.segments:
+            return 0
+        base, length = self.segments[-1]
+        return base + length - 1
+
+    def __len__(self):
+        return self.size
+
+    def segmentData(self, index):
+        # Zero copy view of one segment
+        return self.data[self._offsets[index]:self._offsets[index+1]]
+
+    def slice(self, address, length):
+        # Zero copy view of an address range (must be inside one segment)
+        for (base, size), offset in zip(self.segments, self._offsets):
+            if (base <= address) and (address+length <= base+size):
+                start = offset + (address-base)
+                return self.data[start:start+length]
+        raise surf.misc.McsException(f'McsImage.slice(): address range 0x{address:x}+0x{length:x} is not contiguous in the image')
+
+    def page(self, address, pageSize, fill=0xFF):
+        # Zero copy view when the page is complete, else a padded copy
+        for (base, size), offset in zip(self.segments, self._offsets):
+            if (base <= address) and (address < base+size):
+                start = offset + (address-base)
+                count = min(pageSize, base+size-address)
+                if count == pageSize:
+                    return self.data[start:start+pageSize]
+                page = np.full(pageSize, fill, dtype=np.uint8)
+                page[:count] = self.data[start:start+count]
+                return page
+        raise surf.misc.McsException(f'McsImage.page(): address 0x{address:x} is not in the image')
+
+    def chunks(self, pageSize):
+        # Iterate over (address, view) with pages counted from each segment base
+        # (the final page of a segment is shorter than pageSize)
+        for index, (base, size) in enumerate(self.segments):
+            data = self.segmentData(index)
+            for i in range(0, size, pageSize):
+                yield base+i, data[i:i+pageSize]
+
+    def pages(self, pageSize, fill=0xFF):
+        # Same as chunks(), with the final page of a segment padded to pageSize
+        for address, page in self.chunks(pageSize):
+            if len(page) != pageSize:
+                page = np.concatenate((page, np.full(pageSize-len(page), fill, dtype=np.uint8)))
+            yield address, page
+
+    def blocks(self, blockSize):
+        # Iterate over (address, view) with the image split at blockSize aligned
+        # address boundaries (e.g. PROM erase sectors)
+        for index, (base, size) in enumerate(self.segments):
+            data = self.segmentData(index)
+            address = base
+            while address < base+size:
+                stop = min(base+size, (address//blockSize + 1)*blockSize)
+                yield address, data[address-base:stop-base]
+                address = stop
+
+    def blankPages(self, pageSize, blank=0xFF):
+        # Boolean mask (in pages() order) of the pages that only hold erased bytes
+        mask = []
+        for index, (_, size) in enumerate(self.segments):
+            data = self.segmentData(index)
+            full = size - (size % pageSize)
+            mask.append((data[:full].reshape(-1, pageSize) == blank).all(axis=1))
+            if full != size:
+                mask.append(np.array([(data[full:] == blank).all()]))
+        return np.concatenate(mask) if mask else np.empty(0, dtype=bool)
+
+    def numPages(self, pageSize):
+        return sum((size+pageSize-1)//pageSize for _, size in self.segments)
+
+    def relocate(self, offset):
+        # Zero copy image with every segment moved by offset bytes
+        return McsImage(data=self.data, segments=[(base+offset, size) for base, size in self.segments])
+
+    def addresses(self, index):
+        # Address of the bytes at the given data buffer indexes
+        index = np.asarray(index, dtype=np.int64)
+        seg   = np.searchsorted(self._offsets, index, side='right') - 1
+        return self._bases[seg] + (index - self._offsets[seg])
+
+    @property
+    def entry(self):
+        return McsEntryView(self)
+
+class McsEntryView():
+    # Read-only [N,2] (address, data) accessor kept for code written against
+    # the legacy McsReader.entry table
+
+    def __init__(self, image):
+        self._image = image
+
+    def __len__(self):
+        return self._image.size
+
+    @property
+    def shape(self):
+        return (self._image.size, 2)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row, col = key
+            return self[row][col]
+
+        if isinstance(key, slice):
+            index = np.arange(*key.indices(self._image.size))
+            table = np.empty([len(index), 2], dtype=np.int64)
+            table[:, 0] = self._image.addresses(index)
+            table[:, 1] = self._image.data[index]
+            return table
+
+        index = int(key)
+        if index < 0:
+            index += self._image.size
+        if not (0 <= index < self._image.size):
+            raise IndexError('McsEntryView index out of range')
+        return (int(self._image.addresses(index)), int(self._image.data[index]))
+
+    def __iter__(self):
+        for i in range(self._image.size):
+            yield self[i]
@@ -14,156 +14,541 @@
 #-----------------------------------------------------------------------------
 
 import numpy as np
-import functools
 import click
 import gzip
-import subprocess
 import fnmatch
+import os
+import struct
+
+import surf.misc
 
 class McsException(Exception):
     pass
 
+# Lookup table: ASCII character -> hex nibble value (0x10 = not a hex digit)
+_HEX_LUT = np.full(256, 0x10, dtype=np.uint8)
+for _i, _c in enumerate(b'0123456789ABCDEF'):
+    _HEX_LUT[_c] = _i
+for _i, _c in enumerate(b'abcdef'):
+    _HEX_LUT[_c] = _i + 10
+
+# Lookup table: ASCII whitespace characters (same set as bytes.strip())
+_WS_LUT = np.zeros(256, dtype=bool)
+_WS_LUT[list(b' \t\n\r\x0b\x0c')] = True
+
+# Maximum number of bytes in a record: count + addr[2] + type + data[16] + checksum
+_MAX_REC_BYTES = 21
+
+# Number of records decoded per vectorized step (bounds the temporary memory)
+_CHUNK_LINES = 0x10000
+
+# Number of text bytes read per step by McsReader.stream()
+_STREAM_BYTES = 0x100000
+
+# Per-record error codes (in the same order that they are checked for)
+_ERR_NONE        = 0
+_ERR_START_CODE  = 1
+_ERR_MALFORMED   = 2
+_ERR_CHECKSUM    = 3
+_ERR_BYTE_COUNT  = 4
+_ERR_REC_LENGTH  = 5
+_ERR_DATA_COUNT  = 6
+_ERR_ELA_COUNT   = 7
+_ERR_ELA_ADDR    = 8
+_ERR_RECORD_TYPE = 9
+_ERR_TOO_LONG    = 10
+
 class McsReader():
 
-    def __init__(self,name="McsReader"):
-        self.entry     = []
+    def __init__(self,name="McsReader", cacheEn=None, cacheDir=None, cacheSize=None):
+        # The decoded image cache is opt-in: cacheEn=True, or SURF_MCS_CACHE_DIR set in the environment
+        if cacheEn is None:
+            cacheEn = ('SURF_MCS_CACHE_DIR' in os.environ)
+        self.cache     = surf.misc.McsCache(cacheDir=cacheDir, maxSize=cacheSize) if cacheEn else None
+        self.image     = surf.misc.McsImage()
         self.startAddr = 0
         self.endAddr   = 0
         self.size      = 0
         self.addrRange = 0
         self.lastAddr  = 0
 
-    def open(self, filename, dbg=False):
+    def open(self, filename, dbg=False, address=0):
+        # address: PROM byte address of the first byte of a .bin/.bit file
         self.startAddr = 0
         self.endAddr   = 0
         self.size      = 0
         self.addrRange = 0
         self.lastAddr  = 0
-        baseAddr       = 0
-        idx            = 0
-        firstAddr      = True
+        self.image     = surf.misc.McsImage()
 
         # Check for non-compressed .MCS file
         if fnmatch.fnmatch(filename, '*.mcs'):
             # Set the flag
             gzipEn = False
-            # Find the length of the file
-            numLines = int(subprocess.check_output(f'wc -l {filename}', shell=True).split()[0])
 
         # Check for Compressed .MCS file
         elif fnmatch.fnmatch(filename, '*.mcs.gz'):
             # Set the flag
             gzipEn = True
-            # Find the length of the file
-            numLines = int(subprocess.check_output(f'zcat {filename} | wc -l', shell=True).split()[0])
+
+        # Check for raw binary or Xilinx bitstream file
+        elif self._isBinary(filename):
+            # Set the flag
+            gzipEn = None
 
         else:
             click.secho('\nUnsupported file extension detected', fg='red')
             raise McsException('McsReader.open(): failed')
 
-        # Create an empty numpy array (up to 16B per line)
-        self.entry = np.empty([16*numLines,2],dtype=np.int32)
+        if gzipEn is None:
+            # Memory-map the data (nothing to decode or cache)
+            self._mapBinary(filename, address)
+
+        else:
+            # Check for a previously decoded copy of the file
+            cacheKey, cacheHit = self._cacheLoad(filename)
+
+            if not cacheHit:
+                # Read the whole file into memory
+                with ( gzip.open(filename, "rb") if (gzipEn) else open(filename, 'rb') ) as f:
+                    raw = f.read()
+
+                # Decode the records
+                self._parse(raw)
+                self._cacheStore(cacheKey)
+
+        # Print the MCS metadata
+        if (dbg):
+            print("mcs.size      = {}".format(hex(self.size)))
+            print("mcs.startAddr = {}".format(hex(self.startAddr)))
+            print("mcs.endAddr   = {}".format(hex(self.endAddr)))
+            print("mcs.addrRange = {}".format(hex(self.addrRange)))
+
+    def stream(self, filename, pageSize=256, address=0):
+        # Incrementally decode the file (without the cache), yielding McsImage
+        # pieces in file order. A segment is only split on a pageSize boundary
+        # (counted from the segment base), so each piece can be programmed with
+        # McsImage.pages() as soon as it arrives. The memory used is bounded by
+        # _STREAM_BYTES and not by the image size.
+        self.startAddr = 0
+        self.endAddr   = 0
+        self.size      = 0
+        self.addrRange = 0
+        self.lastAddr  = 0
+        self.image     = surf.misc.McsImage()
+
+        # Raw data: nothing to decode, the pieces are views of the memory-map
+        if self._isBinary(filename):
+            self._mapBinary(filename, address)
+            for addr, data in self.image.chunks(_STREAM_BYTES):
+                yield surf.misc.McsImage(data=data, segments=[(addr, len(data))])
+            return
+
+        with self._openFile(filename) as f:
+
+            def blocks():
+                # Text buffers ending on a line boundary
+                tail = b''
+                while True:
+                    raw = f.read(_STREAM_BYTES)
+                    if not raw:
+                        if tail:
+                            yield tail
+                        return
+                    raw = tail + raw
+                    cut = raw.rfind(b'\n') + 1
+                    tail = raw[cut:]
+                    if cut:
+                        yield raw[:cut]
+
+            # Incomplete page (and base of its segment) carried to the next piece
+            carry     = np.empty(0, dtype=np.uint8)
+            carryAddr = 0
+            segBase   = 0
+
+            for addr, count, data, _ in self._records(blocks()):
+                segments = self._segments(addr, count)
+
+                # Prepend the carried bytes (to the segment that they continue)
+                if len(carry):
+                    if segments[0][0] == carryAddr + len(carry):
+                        segments[0] = (carryAddr, segments[0][1] + len(carry))
+                    else:
+                        segments.insert(0, (carryAddr, len(carry)))
+                    data = np.concatenate((carry, data))
+                else:
+                    segBase = segments[0][0]
+
+                # Hold back the incomplete page at the end of the last segment
+                if len(segments) > 1:
+                    segBase = segments[-1][0]
+                base, length = segments[-1]
+                keep = (base + length - segBase) % pageSize
+                carry     = data[len(data)-keep:].copy()
+                carryAddr = base + length - keep
+                if keep == length:
+                    segments.pop()
+                else:
+                    segments[-1] = (base, length-keep)
+
+                self.endAddr = int(addr[-1] + count[-1] - 1)
+                self.size   += len(data) - keep
+                if segments:
+                    yield surf.misc.McsImage(data=data[:len(data)-keep], segments=segments)
+
+            if len(carry):
+                self.size += len(carry)
+                yield surf.misc.McsImage(data=carry, segments=[(carryAddr, len(carry))])
+
+        # Calculate the total size (in units of bytes)
+        self.addrRange = (self.endAddr - self.startAddr) + 1
+
+    @staticmethod
+    def _isBinary(filename):
+        return fnmatch.fnmatch(filename, '*.bin') or fnmatch.fnmatch(filename, '*.bit')
+
+    def _mapBinary(self, filename, address):
+        # Locate the data (after the header of a .bit file)
+        if fnmatch.fnmatch(filename, '*.bit'):
+            offset, length = self._bitData(filename)
+        else:
+            offset, length = 0, os.path.getsize(filename)
+
+        if length:
+            data = np.memmap(filename, dtype=np.uint8, mode='r', offset=offset, shape=(length,))
+            self.image     = surf.misc.McsImage(data=data, segments=[(address, length)])
+            self.startAddr = address
+            self.endAddr   = address + length - 1
+            self.lastAddr  = self.endAddr
+
+        self.size      = self.image.size
+        self.addrRange = (self.endAddr - self.startAddr) + 1
+
+    @staticmethod
+    def _bitData(filename):
+        # Returns the (offset, length) of the configuration data in a Xilinx .bit file.
+        # Header: <len16> magic, <len16=1>, then 'a'..'d' <len16> string fields
+        # (design, part, date, time) and 'e' <len32> followed by the data.
+        with open(filename, 'rb') as f:
+
+            def read(n):
+                b = f.read(n)
+                if len(b) != n:
+                    click.secho(f'\nTruncated .bit file header: {filename}', fg='red')
+                    raise McsException('McsReader.open(): failed')
+                return b
+
+            read(struct.unpack('>H', read(2))[0])
+            read(2)
+            while True:
+                key = read(1)
+                if key == b'e':
+                    length = struct.unpack('>I', read(4))[0]
+                    offset = f.tell()
+                    break
+                elif key in (b'a', b'b', b'c', b'd'):
+                    read(struct.unpack('>H', read(2))[0])
+                else:
+                    click.secho(f'\nInvalid .bit file header field: {key}', fg='red')
+                    raise McsException('McsReader.open(): failed')
+
+        if offset + length > os.path.getsize(filename):
+            click.secho(f'\nTruncated .bit file data: {filename}', fg='red')
+            raise McsException('McsReader.open(): failed')
+        return offset, length
+
+    @staticmethod
+    def _openFile(filename):
+        # Check for non-compressed .MCS file
+        if fnmatch.fnmatch(filename, '*.mcs'):
+            return open(filename, 'rb')
+
+        # Check for Compressed .MCS file
+        elif fnmatch.fnmatch(filename, '*.mcs.gz'):
+            return gzip.open(filename, 'rb')
+
+        else:
+            click.secho('\nUnsupported file extension detected', fg='red')
+            raise McsException('McsReader.open(): failed')
+
+    def _cacheLoad(self, filename):
+        if self.cache is None:
+            return None, False
+        try:
+            key = self.cache.key(filename)
+            hit = self.cache.load(key)
+        except OSError as e:
+            click.secho(f'McsReader: MCS cache not available: {e}', fg='yellow')
+            return None, False
+
+        if hit is None:
+            return key, False
+
+        self.image, meta = hit
+        self.startAddr = meta['startAddr']
+        self.endAddr   = meta['endAddr']
+        self.lastAddr  = meta['lastAddr']
+        self.size      = self.image.size
+        self.addrRange = (self.endAddr - self.startAddr) + 1
+        return key, True
+
+    def _cacheStore(self, key):
+        if key is None:
+            return
+        try:
+            self.cache.store(key, self.image, startAddr=self.startAddr, endAddr=self.endAddr, lastAddr=self.lastAddr)
+        except OSError as e:
+            click.secho(f'McsReader: failed to update the MCS cache: {e}', fg='yellow')
+
+    def _parse(self, raw):
+        # Per-record results collected across the chunks
+        recAddr  = []
+        recCount = []
+        recData  = []
 
         # Setup the status bar
         with click.progressbar(
-            length = numLines,
+            length = raw.count(b'\n')+1,
             label  = click.style('Reading .MCS:  ', fg='green'),
         ) as bar:
-            # Open the file
-            with ( gzip.open(filename, "rb") if (gzipEn) else open(filename, 'r') ) as f:
-                for i, line in enumerate(f):
-                    # Readout a line
-                    line = line.strip()
-
-                    # Check if GZIP and convert to standard string
-                    if (gzipEn):
-                        line = str(line)[2:-1]
-
-                    # Throttle down printf rate
-                    if ( (i&0xFFF) == 0):
-                        bar.update(0xFFF)
-
-                    # Check for "start code"
-                    if line[0] != ':':
-                        click.secho( f'\nMissing start code. Line[{i}]: ({line})', fg='red')
-                        raise McsException('McsReader.open(): failed')
-                    else:
+            for addr, count, data, lines in self._records([raw]):
+                recAddr.append(addr)
+                recCount.append(count)
+                recData.append(data)
+                # Throttle down printf rate
+                bar.update(lines)
+
+        recAddr  = np.concatenate(recAddr)  if recAddr  else np.empty(0, dtype=np.int64)
+        recCount = np.concatenate(recCount) if recCount else np.empty(0, dtype=np.int64)
+        recData  = np.concatenate(recData)  if recData  else np.empty(0, dtype=np.uint8)
 
-                        hexBytes = [int(line[j:j+2], 16) for j in range(1, len(line), 2)]
-
-                        s = functools.reduce(lambda x,y: x+y, hexBytes[:-1]) & 0xFF
-                        c = (hexBytes[-1]*-1) & 0xFF
-
-                        if s != c:
-                            click.secho('\nBad checksum on line: {:s}. Sum: {:x}, checksum: {:x}'.format(line, s, c), fg='red')
-                            raise McsException('McsReader.open(): failed')
-
-                        # Parse out the bytes
-                        byteCount = hexBytes[0]
-                        addr = int(hexBytes[1])<<8 | int(hexBytes[2])
-                        recordType = hexBytes[3]
-
-                        if byteCount > 16:
-                            click.secho('\nInvalid byte count: {:d}'.format(byteCount), fg='red')
-                            raise McsException('McsReader.open(): failed')
-
-                        elif recordType == 0: # Data RecordType
-
-                            if byteCount == 0:
-                                click.secho(f'\nInvalid byte count: {byteCount} for recordType: {recordType}', fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            for j in range(byteCount):
-                                # Put the address and data into a list
-                                address = baseAddr + addr + j
-                                data = hexBytes[j+4]
-                                self.entry[idx] = [address, data]
-                                idx = idx + 1
-                                # Check if not the start address
-                                if (address != self.startAddr):
-                                    # Check for non-contiguous address
-                                    if ( address != (self.lastAddr+1) ) and firstAddr is False:
-                                        click.secho('\n non-contiguous address detected: PreviousAddress={:x}, CurrentAddress={:x}'.format(self.lastAddr,address), fg='red')
-                                        raise McsException('McsReader.open(): failed')
-                                    else:
-                                        self.lastAddr = address
-                                        firstAddr     = False
-                            # Save the last address
-                            self.endAddr = address
-
-                        elif recordType == 1: # End Of File RecordType
-                            break
-
-                        elif recordType == 4: #Extended Linear Address RecordType
-                            # Check for an invalid byte count
-                            if byteCount != 2:
-                                click.secho(f'\nMcsReader.open():Byte count: {byteCount} must be 2 for ELA records', fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            # Check for an invalid address header
-                            elif addr != 0:
-                                click.secho('\nAddr: {:x} must be 0 for ELA records'.format(addr), fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            # Update the base address
-                            baseAddr = int(line[9:11]+line[11:13], 16)* (2**16)
-                            # Check for first address index (which is always the first line)
-                            if (i==0):
-                                self.startAddr = baseAddr
-                                self.lastAddr  = baseAddr
-                        else: # Undefined RecordType
-                            click.secho('\nInvalid record type: {:d}'.format(recordType), fg='red')
-                            raise McsException('McsReader.open(): failed')
-
-            # Close the status bar
-            bar.update(numLines)
+        # Merge the data records into contiguous segments
+        if len(recAddr):
+            self.image = surf.misc.McsImage(
+                data     = recData,
+                segments = self._segments(recAddr, recCount),
+            )
+
+            # Save the last address
+            self.endAddr = int(recAddr[-1] + recCount[-1] - 1)
 
         # Set the size of the entry array
-        self.size = idx
+        self.size = self.image.size
 
         # Calculate the total size (in units of bytes)
         self.addrRange = (self.endAddr - self.startAddr) + 1
 
-        # Print the MCS metadata
-        if (dbg):
-            print("mcs.size      = {}".format(hex(self.size)))
-            print("mcs.startAddr = {}".format(hex(self.startAddr)))
-            print("mcs.endAddr   = {}".format(hex(self.endAddr)))
-            print("mcs.addrRange = {}".format(hex(self.addrRange)))
+    def _records(self, blocks):
+        # Decode the records of an iterator of text buffers (each ending on a
+        # line boundary) and yield the (address, count, data, lines) of the
+        # Data records one chunk at a time. Records are checked in file order:
+        # a bad record raises after the Data records before it were yielded.
+        lineOffset = 0
+        baseAddr   = 0
+
+        # Last Data record (address, count) of the previous chunk
+        prevAddr  = np.empty(0, dtype=np.int64)
+        prevCount = np.empty(0, dtype=np.int64)
+
+        for raw in blocks:
+            # Locate the (whitespace stripped) records in the text buffer
+            buf = np.frombuffer(raw, dtype=np.uint8)
+            lineNum, starts, lengths = self._splitLines(buf)
+            numLines = len(starts)
+
+            for first in range(0, numLines, _CHUNK_LINES):
+                last = min(first+_CHUNK_LINES, numLines)
+
+                # Decode all records of the chunk at once
+                recs, err = self._decode(buf, starts[first:last], lengths[first:last])
+                rtype = recs[:, 3]
+
+                # Processing stops at the first failing or End Of File record
+                stop = np.flatnonzero((err != _ERR_NONE) | (rtype == 1))
+                n    = int(stop[0]) if len(stop) else (last-first)
+
+                # Check for first address index (which is always the first line)
+                if (lineOffset == 0) and (first == 0) and (n > 0) and (lineNum[0] == 0) and (rtype[0] == 4):
+                    self.startAddr = int(self._elaAddr(recs[:1])[0])
+                    self.lastAddr  = self.startAddr
+
+                # Resolve the Extended Linear Address for every record
+                isEla = (rtype[:n] == 4)
+                elaIdx = np.maximum.accumulate(np.where(isEla, np.arange(n), -1)) if n else np.empty(0, dtype=np.int64)
+                base = np.where(elaIdx >= 0, self._elaAddr(recs[:n])[elaIdx], baseAddr)
+                if isEla.any():
+                    baseAddr = int(base[-1])
+
+                # Collect the Data records
+                isData   = np.flatnonzero(rtype[:n] == 0)
+                dataRecs = recs[isData]
+                mask     = np.arange(16)[None, :] < dataRecs[:, :1]
+                addr     = base[isData].astype(np.int64) + ((dataRecs[:, 1].astype(np.int64) << 8) | dataRecs[:, 2])
+                count    = dataRecs[:, 0].astype(np.int64)
+                data     = dataRecs[:, 4:20][mask]
+
+                # Check for non-contiguous addresses (reported before any later record error)
+                self._checkContiguous(np.concatenate((prevAddr, addr)), np.concatenate((prevCount, count)))
+                if len(addr):
+                    prevAddr  = addr[-1:]
+                    prevCount = count[-1:]
+
+                # Report the first failing record
+                if len(stop) and (err[n] != _ERR_NONE):
+                    i = first + n
+                    self._raiseRecordError(int(err[n]), lineOffset+lineNum[i], raw[starts[i]:starts[i]+lengths[i]].decode(errors='replace'))
+
+                if len(addr):
+                    yield addr, count, data, last-first
+                if len(stop):
+                    return
+
+            lineOffset += raw.count(b'\n')
+
+    @staticmethod
+    def _segments(recAddr, recCount):
+        # (base, length) of the runs of contiguous Data records
+        split = np.flatnonzero(recAddr[1:] != recAddr[:-1] + recCount[:-1]) + 1
+        first = np.concatenate(([0], split))
+        lengths = np.add.reduceat(recCount, first)
+        return list(zip(recAddr[first].tolist(), lengths.tolist()))
+
+    @property
+    def entry(self):
+        # Legacy [N,2] (address, data) accessor
+        return self.image.entry
+
+    @staticmethod
+    def _splitLines(buf):
+        # Find the line boundaries
+        nl     = np.flatnonzero(buf == 0x0A)
+        starts = np.concatenate(([0], nl+1)).astype(np.int64)
+        ends   = np.concatenate((nl, [len(buf)])).astype(np.int64)
+
+        # Strip the leading and trailing whitespace
+        while True:
+            ws = (starts < ends)
+            ws[ws] = _WS_LUT[buf[starts[ws]]]
+            if not ws.any():
+                break
+            starts[ws] += 1
+        while True:
+            ws = (starts < ends)
+            ws[ws] = _WS_LUT[buf[ends[ws]-1]]
+            if not ws.any():
+                break
+            ends[ws] -= 1
+
+        # Ignore the empty lines
+        lineNum = np.flatnonzero(ends > starts)
+        return lineNum, starts[lineNum], (ends-starts)[lineNum]
+
+    @staticmethod
+    def _decode(buf, starts, lengths):
+        # Number of hex encoded bytes in each record
+        numBytes = (lengths - 1) // 2
+        valid    = np.arange(_MAX_REC_BYTES)[None, :] < np.minimum(numBytes, _MAX_REC_BYTES)[:, None]
+
+        # Gather the high and low nibble of every byte
+        idx = np.where(valid, starts[:, None] + 1 + 2*np.arange(_MAX_REC_BYTES)[None, :], 0)
+        hi  = _HEX_LUT[buf[idx]]
+        lo  = _HEX_LUT[buf[np.where(valid, idx+1, 0)]]
+        recs = np.where(valid, (hi << 4) | (lo & 0xF), 0).astype(np.uint8)
+
+        # Checksum over all the bytes (including the checksum byte) must be zero
+        badHex   = (valid & (((hi | lo) & 0x10) != 0)).any(axis=1)
+        checksum = recs.sum(axis=1, dtype=np.uint32) & 0xFF
+
+        count = recs[:, 0]
+        addr  = (recs[:, 1].astype(np.uint32) << 8) | recs[:, 2]
+        rtype = recs[:, 3]
+
+        err = np.select(
+            [
+                buf[starts] != ord(':'),
+                numBytes > _MAX_REC_BYTES,
+                badHex | ((lengths-1) % 2 != 0) | (numBytes < 5),
+                checksum != 0,
+                count > 16,
+                numBytes != count.astype(np.int64) + 5,
+                (rtype == 0) & (count == 0),
+                (rtype == 4) & (count != 2),
+                (rtype == 4) & (addr != 0),
+                (rtype != 0) & (rtype != 1) & (rtype != 4),
+            ],
+            [_ERR_START_CODE, _ERR_TOO_LONG] + list(range(_ERR_MALFORMED, _ERR_RECORD_TYPE+1)),
+            default = _ERR_NONE,
+        )
+        return recs, err
+
+    @staticmethod
+    def _elaAddr(recs):
+        return ((recs[:, 4].astype(np.int64) << 8) | recs[:, 5]) << 16
+
+    def _checkContiguous(self, recAddr, recCount):
+        if len(recAddr) == 0:
+            return
+
+        # Bytes located at the start address are skipped by the check
+        first = recAddr
+        last  = recAddr + recCount - 1
+        inner = np.flatnonzero((first < self.startAddr) & (self.startAddr < last))
+        if len(inner):
+            # Split the records around the skipped byte
+            first = np.insert(first, inner+1, self.startAddr+1)
+            last  = np.insert(last,  inner, self.startAddr-1)
+        first = np.where(first == self.startAddr, first+1, first)
+        last  = np.where(last  == self.startAddr, last-1, last)
+
+        keep = np.flatnonzero(first <= last)
+        if len(keep) > 1:
+            bad = np.flatnonzero(first[keep[1:]] != last[keep[:-1]] + 1)
+            if len(bad):
+                i = int(bad[0])
+                self._raiseContiguous(int(last[keep[i]]), int(first[keep[i+1]]))
+        if len(keep):
+            self.lastAddr = int(last[keep[-1]])
+
+    @staticmethod
+    def _raiseContiguous(lastAddr, address):
+        click.secho('\n non-contiguous address detected: PreviousAddress={:x}, CurrentAddress={:x}'.format(lastAddr,address), fg='red')
+        raise McsException('McsReader.open(): failed')
+
+    @staticmethod
+    def _raiseRecordError(code, i, line):
+        # Records longer than the vectorized decoder handles are classified here
+        hexBytes = b''
+        if code != _ERR_START_CODE:
+            try:
+                hexBytes = bytes.fromhex(line[1:])
+            except ValueError:
+                code = _ERR_MALFORMED
+        if code == _ERR_TOO_LONG:
+            if (sum(hexBytes) & 0xFF) != 0:
+                code = _ERR_CHECKSUM
+            elif hexBytes[0] > 16:
+                code = _ERR_BYTE_COUNT
+            else:
+                code = _ERR_REC_LENGTH
+
+        if code == _ERR_START_CODE:
+            click.secho( f'\nMissing start code. Line[{i}]: ({line})', fg='red')
+        elif code == _ERR_MALFORMED:
+            click.secho( f'\nMalformed record. Line[{i}]: ({line})', fg='red')
+        elif code == _ERR_CHECKSUM:
+            s = sum(hexBytes[:-1]) & 0xFF
+            c = (hexBytes[-1]*-1) & 0xFF
+            click.secho('\nBad checksum on line: {:s}. Sum: {:x}, checksum: {:x}'.format(line, s, c), fg='red')
+        elif code == _ERR_BYTE_COUNT:
+            click.secho('\nInvalid byte count: {:d}'.format(hexBytes[0]), fg='red')
+        elif code == _ERR_REC_LENGTH:
+            click.secho( f'\nRecord length does not match byte count: {hexBytes[0]}. Line[{i}]: ({line})', fg='red')
+        elif code == _ERR_DATA_COUNT:
+            click.secho(f'\nInvalid byte count: {hexBytes[0]} for recordType: {hexBytes[3]}', fg='red')
+        elif code == _ERR_ELA_COUNT:
+            click.secho(f'\nMcsReader.open():Byte count: {hexBytes[0]} must be 2 for ELA records', fg='red')
+        elif code == _ERR_ELA_ADDR:
+            click.secho('\nAddr: {:x} must be 0 for ELA records'.format((hexBytes[1]<<8) | hexBytes[2]), fg='red')
+        else:
+            click.secho('\nInvalid record type: {:d}'.format(hexBytes[3]), fg='red')
+        raise McsException('McsReader.open(): failed')
@@ -0,0 +1,112 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue MCS Writer Module
+#-----------------------------------------------------------------------------
+# Description:
+# Writes an McsImage to a raw binary (.bin) or an Intel-HEX (.mcs/.mcs.gz)
+# file. The Intel-HEX records are encoded with NumPy lookup tables, 64kB
+# (one Extended Linear Address) at a time.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import gzip
+import fnmatch
+
+import surf.misc
+
+# Lookup table: nibble value -> ASCII hex digit
+_HEX_CHARS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+
+# Data bytes per record
+_REC_BYTES = 16
+
+# Address range of one Extended Linear Address record
+_ELA_SIZE = 0x10000
+
+class McsWriter():
+
+    def __init__(self, name="McsWriter", fill=0xFF, compressLevel=6):
+        # Name used in the error messages
+        self.name          = name
+        # Value of the bytes between the segments of a .bin file
+        self.fill          = fill
+        self.compressLevel = compressLevel
+
+    def write(self, filename, image):
+        # Check for raw binary file
+        if fnmatch.fnmatch(filename, '*.bin'):
+            with open(filename, 'wb') as f:
+                self._writeBin(f, image)
+
+        # Check for non-compressed .MCS file
+        elif fnmatch.fnmatch(filename, '*.mcs'):
+            with open(filename, 'wb') as f:
+                self._writeMcs(f, image)
+
+        # Check for Compressed .MCS file
+        elif fnmatch.fnmatch(filename, '*.mcs.gz'):
+            with gzip.open(filename, 'wb', compresslevel=self.compressLevel) as f:
+                self._writeMcs(f, image)
+
+        else:
+            click.secho(f'\n{self.name}.write(): unsupported file extension detected: {filename}', fg='red')
+            raise surf.misc.McsException(f'{self.name}.write(): failed')
+
+    def _writeBin(self, f, image):
+        # Flat copy of startAddr to endAddr (gaps between the segments filled)
+        address = image.startAddr
+        for index, (base, size) in enumerate(image.segments):
+            if base > address:
+                f.write(bytes([self.fill]) * (base-address))
+            f.write(memoryview(image.segmentData(index)))
+            address = base + size
+
+    def _writeMcs(self, f, image):
+        ela = None
+        for address, data in image.blocks(_ELA_SIZE):
+            # Extended Linear Address record when entering a new 64kB window
+            upper = address // _ELA_SIZE
+            if upper != ela:
+                f.write(self._encode(np.array([[2, 0, 0, 4, (upper >> 8) & 0xFF, upper & 0xFF]], dtype=np.uint8)))
+                ela = upper
+
+            # Full 16-byte Data records
+            offset = address % _ELA_SIZE
+            full   = len(data) - (len(data) % _REC_BYTES)
+            if full:
+                recs = np.empty([full // _REC_BYTES, 4+_REC_BYTES], dtype=np.uint8)
+                addr = offset + _REC_BYTES*np.arange(len(recs))
+                recs[:, 0] = _REC_BYTES
+                recs[:, 1] = addr >> 8
+                recs[:, 2] = addr & 0xFF
+                recs[:, 3] = 0
+                recs[:, 4:] = data[:full].reshape(-1, _REC_BYTES)
+                f.write(self._encode(recs))
+
+            # Final (shorter) Data record
+            if full != len(data):
+                addr = offset + full
+                head = np.array([len(data)-full, addr >> 8, addr & 0xFF, 0], dtype=np.uint8)
+                f.write(self._encode(np.concatenate((head, data[full:]))[None, :]))
+
+        # End Of File record
+        f.write(self._encode(np.array([[0, 0, 0, 1]], dtype=np.uint8)))
+
+    @staticmethod
+    def _encode(recs):
+        # Append the checksum and hex encode [N, M] record bytes into ':...\n' lines
+        recs  = np.concatenate((recs, (-recs.sum(axis=1, dtype=np.uint32) & 0xFF).astype(np.uint8)[:, None]), axis=1)
+        lines = np.empty([len(recs), 2 + 2*recs.shape[1]], dtype=np.uint8)
+        lines[:, 0]    = ord(':')
+        lines[:, 1:-1:2] = _HEX_CHARS[recs >> 4]
+        lines[:, 2:-1:2] = _HEX_CHARS[recs & 0xF]
+        lines[:, -1]   = ord('\n')
+        return lines.tobytes()
@@ -0,0 +1,252 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Memory Transaction Record/Replay Module
+#-----------------------------------------------------------------------------
+# Description:
+# MemRecorder is a memory hub (tap) inserted in front of the memory slave of
+# the devices: it records the write and read transaction stream of a
+# deterministic procedure (e.g. Adc32Rf45.Init) into a replay file.
+#
+# MemReplay is a memory master connected to the same memory slave: it issues
+# the recorded stream again at any base address, without the per variable
+# overhead. Writes to consecutive addresses are merged into bulk transactions,
+# transactions are not waited for one by one and only the recorded reads are
+# verified.
+#
+# The idle gaps longer than minDelay between two recorded transactions (e.g.
+# the hardware waits of the procedure) are recorded as delay records. The
+# replay waits for the outstanding transactions, then sleeps for the recorded
+# gap, and writes are never merged across a delay.
+#
+#    header  : magic, version, numRecords
+#    records : type (uint8), address offset (uint64), size (uint32), data
+#    delay   : type 0xFF, offset 0, size 8, gap in seconds (float64)
+#
+# Example:
+#    recorder = surf.misc.MemRecorder()
+#    recorder._setSlave(srp)
+#    root.add(AmcCarrier(memBase=recorder))
+#    ...
+#    with recorder.record('adcInit.rply', base=root.Adc[0].address, size=0x80000):
+#        root.Adc[0].Init()
+#
+#    replay = surf.misc.MemReplay()
+#    replay._setSlave(srp)
+#    for adc in root.Adc.values():
+#        replay.run('adcInit.rply', address=adc.address)
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.memory as rim
+import contextlib
+import threading
+import struct
+import time
+
+class MemReplayException(Exception):
+    pass
+
+_MAGIC   = b'SURFRPLY'
+_VERSION = 2
+_HEADER  = struct.Struct('<8sIQ')
+_RECORD  = struct.Struct('<BQI')
+_DELAY   = 0xFF
+_GAP     = struct.Struct('<d')
+
+def _readReplay(filename):
+    # Returns the [(tranType, offset, data), ...] records
+    with open(filename, 'rb') as f:
+        raw = f.read()
+    try:
+        magic, version, numRecords = _HEADER.unpack_from(raw)
+    except struct.error:
+        raise MemReplayException(f'MemReplay({filename}): truncated header')
+    if (magic != _MAGIC) or (version not in (1, _VERSION)):
+        raise MemReplayException(f'MemReplay({filename}): not a replay file')
+
+    records = []
+    pos = _HEADER.size
+    for _ in range(numRecords):
+        try:
+            tranType, offset, size = _RECORD.unpack_from(raw, pos)
+        except struct.error:
+            raise MemReplayException(f'MemReplay({filename}): truncated record {len(records)}')
+        pos += _RECORD.size
+        if pos + size > len(raw):
+            raise MemReplayException(f'MemReplay({filename}): truncated record {len(records)}')
+        if (tranType == _DELAY) and (size != _GAP.size):
+            raise MemReplayException(f'MemReplay({filename}): bad delay record {len(records)}')
+        records.append((tranType, offset, raw[pos:pos+size]))
+        pos += size
+    return records
+
+def _writeReplay(filename, records):
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(records)))
+        for tranType, offset, data in records:
+            f.write(_RECORD.pack(tranType, offset, len(data)))
+            f.write(data)
+
+class MemRecorder(rim.Hub):
+
+    def __init__(self):
+        super().__init__(0, 0)
+        self._lock     = threading.Lock()
+        self._records  = None
+        self._base     = 0
+        self._size     = None
+        self._minDelay = 0.0
+        self._lastDone = None
+
+    @contextlib.contextmanager
+    def record(self, filename, base=0, size=None, minDelay=1.0e-3):
+        # Record the transactions to [base, base+size) while in the context,
+        # and the gaps longer than minDelay (seconds) between them
+        with self._lock:
+            self._records  = []
+            self._base     = base
+            self._size     = size
+            self._minDelay = minDelay
+            self._lastDone = None
+        try:
+            yield self
+        finally:
+            with self._lock:
+                records, self._records = self._records, None
+
+        # Only a complete procedure is written to the file
+        _writeReplay(filename, records)
+
+    def _inWindow(self, address, size):
+        return (self._records is not None) and (self._base <= address) and ((self._size is None) or (address + size <= self._base + self._size))
+
+    def _append(self, start, tranType, offset, data):
+        # Called with the lock held: the record, preceded by the idle gap
+        if (self._lastDone is not None) and (start - self._lastDone > self._minDelay):
+            self._records.append((_DELAY, 0, _GAP.pack(start - self._lastDone)))
+        self._records.append((tranType, offset, data))
+        self._lastDone = time.monotonic()
+
+    def _doTransaction(self, transaction):
+        address  = transaction.address()
+        size     = transaction.size()
+        tranType = transaction.type()
+
+        # Not recorded: asynchronous pass through, as the default Hub
+        if not self._inWindow(address, size):
+            super()._doTransaction(transaction)
+            return
+
+        with transaction.lock():
+            if transaction.expired():
+                return
+            start = time.monotonic()
+
+            # Writes: the data is known when issued, pass through and record
+            if tranType in (rim.Write, rim.Post):
+                data = bytearray(size)
+                transaction.getData(data, 0)
+                with self._lock:
+                    if self._inWindow(address, size):
+                        self._append(start, tranType, address - self._base, bytes(data))
+
+        if tranType in (rim.Write, rim.Post):
+            super()._doTransaction(transaction)
+            return
+
+        # Reads: forward and wait for this transaction only (the lock is not held)
+        # to record the data read back
+        with transaction.lock():
+            if transaction.expired():
+                return
+            data = bytearray(size)
+            self._waitTransaction(self._reqTransaction(address, data, size, 0, tranType))
+            error = self._getError()
+            if error:
+                self._clearError()
+                transaction.error(error)
+                return
+
+            with self._lock:
+                if self._inWindow(address, size):
+                    self._append(start, tranType, address - self._base, bytes(data))
+
+            transaction.setData(data, 0)
+            transaction.done()
+
+class MemReplay(rim.Master):
+
+    def __init__(self, window=256):
+        super().__init__()
+        # Maximum number of outstanding transactions
+        self.window  = window
+        self.metrics = {}
+
+    def run(self, filename, address=0, verify=True):
+        records = _readReplay(filename)
+        start   = time.monotonic()
+
+        # Merge the writes of the same type to consecutive addresses
+        maxAccess = self._reqMaxAccess()
+        merged = []
+        for tranType, offset, data in records:
+            if (tranType in (rim.Read, rim.Verify)) and not verify:
+                continue
+            last = merged[-1] if merged else None
+            if ((last is not None) and (tranType == last[0]) and (tranType in (rim.Write, rim.Post)) and
+                    (offset == last[1] + len(last[2])) and (len(last[2]) + len(data) <= maxAccess)):
+                last[2] += data
+            else:
+                merged.append([tranType, offset, bytearray(data)])
+
+        # Issue the transactions without waiting for them one by one
+        reads   = []
+        delays  = 0
+        pending = 0
+        for tranType, offset, data in merged:
+            if tranType == _DELAY:
+                # Recorded hardware wait: the previous transactions complete first
+                self._wait(address)
+                pending = 0
+                time.sleep(_GAP.unpack(data)[0])
+                delays += 1
+                continue
+            if pending == self.window:
+                self._wait(address)
+                pending = 0
+            pending += 1
+            if tranType in (rim.Read, rim.Verify):
+                buffer = bytearray(len(data))
+                self._reqTransaction(address + offset, buffer, len(buffer), 0, rim.Read)
+                reads.append((offset, bytes(data), buffer))
+            else:
+                self._reqTransaction(address + offset, data, len(data), 0, tranType)
+        self._wait(address)
+
+        self.metrics = {
+            'records'      : len(records),
+            'transactions' : len(merged) - delays,
+            'reads'        : len(reads),
+            'delays'       : delays,
+            'elapsed'      : time.monotonic() - start,
+        }
+
+        # Verify the recorded reads
+        mismatch = [offset for offset, expected, buffer in reads if bytes(buffer) != expected]
+        if mismatch:
+            raise MemReplayException(
+                f'MemReplay({filename}): {len(mismatch)} read(s) mismatched at 0x{address:x}, first at offset 0x{mismatch[0]:x}')
+        return self.metrics
+
+    def _wait(self, address):
+        self._waitTransaction(0)
+        error = self._getError()
+        if error:
+            self._clearError()
+            raise MemReplayException(f'MemReplay: transaction error at 0x{address:x}: {error}')
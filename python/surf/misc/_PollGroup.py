@@ -0,0 +1,137 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Poll Group Module
+#-----------------------------------------------------------------------------
+# Description:
+# By default a device gets one memory block per register word (variables
+# sharing a word share a block) and the poller issues one read transaction per
+# block holding a polled variable. PollGroupLayout consolidates the polled
+# status registers of a device into a few contiguous custom blocks, so the
+# poll load scales with the address ranges and not with the variable count.
+#
+# The groups are either computed (runs of adjacent polled RO registers) or
+# declared by the device as [(offset, size), ...] byte ranges. A declared
+# range may span unmapped but readable words (e.g. legacy registers). The
+# groups are limited to maxSize bytes, which must not exceed the maximum
+# access size of the memory path of the device.
+#
+# Example (at the end of Device.__init__):
+#    surf.misc.PollGroupLayout(self).apply()
+#    surf.misc.PollGroupLayout(self, ranges=[(0x00, 0x28), (0x70, 0x0C)]).apply()
+#
+#    print(surf.misc.PollGroupLayout.report(root))
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import rogue.interfaces.memory as rim
+
+def _extent(var):
+    # Byte range [lo, hi) of the 32-bit words used by a RemoteVariable
+    bits = max(bitOffset + bitSize for bitOffset, bitSize in zip(var.bitOffset, var.bitSize))
+    lo   = var.offset - (var.offset % 4)
+    hi   = var.offset + (bits + 7) // 8
+    return lo, hi + (-hi % 4)
+
+class PollGroupLayout():
+
+    def __init__(self, device, ranges=None, maxSize=0x100):
+        self.device  = device
+        self.maxSize = maxSize
+
+        # (lo, hi, var) of the remote variables, in address order
+        self._vars = sorted(
+            ((*_extent(var), var) for var in device.variables.values() if isinstance(var, pr.RemoteVariable) and var.offset is not None),
+            key=lambda x: (x[0], x[1]))
+
+        if ranges is None:
+            self.groups = self._compute()
+        else:
+            self.groups = [self._validate(offset, size) for offset, size in ranges]
+
+    def _compute(self):
+        # Runs of adjacent polled RO registers, extended over the variables sharing their words
+        groups = []
+        lo = hi = None
+        for vlo, vhi, var in self._vars:
+            if (lo is not None) and (vlo < hi):
+                hi = max(hi, vhi)
+            elif (lo is not None) and (vlo == hi) and (var.mode == 'RO') and (var.pollInterval > 0) and (vhi-lo <= self.maxSize):
+                hi = vhi
+            else:
+                groups.append((lo, hi))
+                lo, hi = (vlo, vhi) if (var.mode == 'RO') and (var.pollInterval > 0) else (None, None)
+        groups.append((lo, hi))
+
+        # Only the groups replacing several default blocks are kept
+        return [(lo, hi-lo) for lo, hi in groups if (lo is not None) and (len(self._blocks(lo, hi)) > 1)]
+
+    def _validate(self, offset, size):
+        if (offset % 4) or (size % 4) or (size <= 0) or (size > self.maxSize):
+            raise ValueError(f'PollGroupLayout({self.device.path}): bad range (0x{offset:x}, 0x{size:x})')
+        for vlo, vhi, var in self._vars:
+            if (vlo < offset+size) and (offset < vhi):
+                if (vlo < offset) or (vhi > offset+size):
+                    raise ValueError(f'PollGroupLayout({self.device.path}): {var.name} crosses the range (0x{offset:x}, 0x{size:x})')
+                if var.mode == 'WO':
+                    raise ValueError(f'PollGroupLayout({self.device.path}): WO variable {var.name} in the range (0x{offset:x}, 0x{size:x})')
+        return (offset, size)
+
+    def _blocks(self, lo=None, hi=None):
+        # Default blocks (variables sharing a word are merged): [[lo, hi, pollInterval], ...]
+        blocks = []
+        for vlo, vhi, var in self._vars:
+            if (lo is not None) and not (lo <= vlo < hi):
+                continue
+            if blocks and (vlo < blocks[-1][1]):
+                blocks[-1][1] = max(blocks[-1][1], vhi)
+            else:
+                blocks.append([vlo, vhi, 0])
+            if var.pollInterval > 0:
+                blocks[-1][2] = var.pollInterval if blocks[-1][2] == 0 else min(blocks[-1][2], var.pollInterval)
+        return blocks
+
+    def load(self, grouped=True):
+        # Returns (transactions, bytes) per poll cycle and transactions per second
+        reads = [(hi-lo, interval) for lo, hi, interval in self._blocks() if interval > 0]
+        if grouped:
+            reads = [(hi-lo, interval) for lo, hi, interval in self._blocks()
+                     if (interval > 0) and not any(offset <= lo < offset+size for offset, size in self.groups)]
+            for offset, size in self.groups:
+                intervals = [interval for _, _, interval in self._blocks(offset, offset+size) if interval > 0]
+                if intervals:
+                    reads.append((size, min(intervals)))
+        return len(reads), sum(size for size, _ in reads), sum(1.0/interval for _, interval in reads)
+
+    def apply(self):
+        for offset, size in self.groups:
+            self.device.addCustomBlock(rim.Block(offset, size))
+        self.device._pollGroupLayout = self
+        return self
+
+    def summary(self):
+        txn, size, rate = self.load()
+        txn0, size0, rate0 = self.load(grouped=False)
+        return (f'{self.device.path}: {txn} transactions, {size} bytes per poll cycle, {rate:.1f} transactions/s '
+                f'(default blocks: {txn0} transactions, {size0} bytes, {rate0:.1f} transactions/s)')
+
+    @staticmethod
+    def report(node):
+        # Poll load of every device of the tree, with the applied layouts
+        lines = []
+        total = [0, 0, 0.0, 0, 0, 0.0]
+        for device in [node] + node.deviceList:
+            layout = getattr(device, '_pollGroupLayout', None) or PollGroupLayout(device, ranges=[])
+            load = layout.load() + layout.load(grouped=False)
+            if load[3] == 0:
+                continue
+            total = [t + x for t, x in zip(total, load)]
+            lines.append(f'{device.path:64s} {load[0]:5d} {load[1]:7d} B {load[2]:8.1f}/s  (default {load[3]:5d} {load[4]:7d} B {load[5]:8.1f}/s)')
+        lines.append(f'{"Total":64s} {total[0]:5d} {total[1]:7d} B {total[2]:8.1f}/s  (default {total[3]:5d} {total[4]:7d} B {total[5]:8.1f}/s)')
+        return '\n'.join(lines)
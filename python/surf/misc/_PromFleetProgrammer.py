@@ -0,0 +1,146 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM Fleet Programmer Module
+#-----------------------------------------------------------------------------
+# Description:
+# Programs the same image into many PROM devices (e.g. one AxiMicronN25Q per
+# board, in one or several roots) concurrently. The image is parsed once and
+# shared read-only by every board, the boards are programmed by a bounded
+# thread pool, progress is aggregated into a single status bar and a failure
+# on one board does not stop the others. The PROMs can be read back (dumped)
+# in parallel the same way.
+#
+# Example:
+#    fleet = surf.misc.PromFleetProgrammer([root.Board[i].AxiMicronN25Q for i in range(40)])
+#    results = fleet.program('image.mcs.gz')
+#    results = fleet.dump('board{index}.mcs.gz', address=0x0, length=0x1000000)
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import concurrent.futures
+import datetime
+import threading
+import click
+import time
+
+import surf.misc
+
+class PromFleetProgrammer():
+
+    def __init__(self, devices, maxWorkers=8):
+        # PROM devices implementing surf.misc.PromBackend
+        self.devices    = list(devices)
+        self.maxWorkers = maxWorkers
+        self.results    = []
+
+    def program(self, image, diffMode=False, skipBlank=True):
+        # Parse the file only once for the whole fleet
+        if not isinstance(image, surf.misc.McsImage):
+            mcs = surf.misc.McsReader()
+            mcs.open(image)
+            image = mcs.image
+
+        def job(device, prog, index):
+            device.promBeginProgram()
+            prog.program(image, diffMode=diffMode, skipBlank=skipBlank)
+
+        # Every board contributes its write and verify bytes to one status bar
+        return self._runAll('Programming', 'program', 2*image.size, job)
+
+    def dump(self, filename, address, length):
+        # Read back the same address range of every board into its own file
+        # (filename is formatted with the board {index} and {name}, e.g. 'board{index}.mcs.gz')
+        writer = surf.misc.McsWriter()
+
+        def job(device, prog, index):
+            device.promBeginProgram()
+            image = prog.dump(address, length)
+            writer.write(filename.format(index=index, name=prog.name), image)
+
+        return self._runAll('Reading', 'dump', length, job)
+
+    def _runAll(self, verb, operation, perBoard, job):
+        self.results = []
+        if not self.devices:
+            return self.results
+
+        click.secho(f'{verb} {len(self.devices)} PROM(s) with up to {self.maxWorkers} in parallel', fg='green')
+        start = time.monotonic()
+        lock  = threading.Lock()
+
+        with click.progressbar(
+            length = max(1, perBoard*len(self.devices)),
+            label  = click.style(f'{verb} PROMs:', fg='green'),
+        ) as bar:
+
+            def advance(n):
+                with lock:
+                    bar.update(n)
+
+            def run(index):
+                return self._runOne(index, operation, job, perBoard, advance)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self.maxWorkers, len(self.devices)))) as pool:
+                self.results = list(pool.map(run, range(len(self.devices))))
+
+        elapsed = time.monotonic() - start
+        failed  = [r for r in self.results if not r['passed']]
+        click.secho(self.summary(), fg='red' if failed else 'green')
+        click.secho(
+            f'{verb} {len(self.results)-len(failed)} of {len(self.results)} PROM(s) done in {datetime.timedelta(seconds=int(elapsed))}',
+            fg='red' if failed else 'green',
+        )
+        return self.results
+
+    def _runOne(self, index, operation, job, perBoard, advance):
+        done = [0]
+
+        def progress(n):
+            done[0] += n
+            advance(n)
+
+        device = self.devices[index]
+        name   = getattr(device, 'path', str(device))
+        prog   = surf.misc.PromProgrammer(device, name=name, quiet=True, progress=progress)
+        result = {'name': name, 'operation': operation, 'passed': False, 'error': None, 'elapsed': 0.0, 'metrics': None, 'report': None}
+        start  = time.monotonic()
+
+        # Isolate the per-board failures
+        try:
+            job(device, prog, index)
+            result['passed'] = True
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'.strip()
+        finally:
+            result['elapsed'] = time.monotonic() - start
+            result['metrics'] = dict(prog.metrics)
+            result['report']  = prog.report
+            # Account for the skipped (diff mode) or aborted work
+            advance(max(0, perBoard-done[0]))
+
+        return result
+
+    def summary(self):
+        lines = []
+        for r in self.results:
+            m = r['metrics']
+            status = 'PASSED' if r['passed'] else 'FAILED'
+            if r['operation'] == 'dump':
+                line = f'{r["name"]}: {status} in {r["elapsed"]:.1f} s (read 0x{m["bytesRead"]:x} bytes in {m["readTime"]:.1f} s'
+            else:
+                line = (f'{r["name"]}: {status} in {r["elapsed"]:.1f} s '
+                        f'(erase {m["eraseTime"]:.1f} s, write {m["writeTime"]:.1f} s, verify {m["verifyTime"]:.1f} s')
+            if m['sectorsChanged'] or m['sectorsSkipped']:
+                line += f', {m["sectorsChanged"]} sector(s) changed'
+            lines.append(line + ')')
+            if r['error'] is not None:
+                lines.append(f'    {r["error"]}')
+            if (r['report'] is not None) and not r['report'].passed:
+                lines += [f'    {text}' for text in str(r['report']).split('\n')]
+        return '\n'.join(lines)
@@ -0,0 +1,85 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM Layout Module
+#-----------------------------------------------------------------------------
+# Description:
+# Multi-boot PROM layout: named partitions (e.g. golden image, update image,
+# user data) at fixed PROM byte offsets.
+#
+# Example:
+#    layout = surf.misc.PromLayout([
+#        surf.misc.PromPartition('Golden', offset=0x0000000, size=0x1000000),
+#        surf.misc.PromPartition('Update', offset=0x1000000, size=0x1000000),
+#        surf.misc.PromPartition('User',   offset=0x2000000, size=0x0100000),
+#    ])
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import surf.misc
+
+class PromPartition():
+
+    def __init__(self, name, offset, size, reloadAddress=None, description=''):
+        self.name          = name
+        self.offset        = offset
+        self.size          = size
+        # Address passed to AxiVersion.FpgaReloadAtAddress() (defaults to the offset)
+        self.reloadAddress = offset if reloadAddress is None else reloadAddress
+        self.description   = description
+
+    @property
+    def end(self):
+        # First address after the partition
+        return self.offset + self.size
+
+    def locate(self, image):
+        # Images built for address zero (e.g. .bin/.bit files) are moved to the
+        # partition offset, anything else must already be inside the partition
+        if (image.size != 0) and (image.startAddr == 0) and (self.offset != 0):
+            image = image.relocate(self.offset)
+        if image.size and not ((self.offset <= image.startAddr) and (image.endAddr < self.end)):
+            raise surf.misc.McsException(
+                f'PromPartition: image 0x{image.startAddr:x}-0x{image.endAddr:x} does not fit in '
+                f'partition {self.name} (0x{self.offset:x}-0x{self.end-1:x})')
+        return image
+
+    def __str__(self):
+        return f'{self.name:16s} 0x{self.offset:08x} - 0x{self.end-1:08x} (0x{self.size:x} bytes) {self.description}'.rstrip()
+
+class PromLayout():
+
+    def __init__(self, partitions=None):
+        self.partitions = {}
+        for partition in (partitions or []):
+            self.add(partition)
+
+    def add(self, partition):
+        if partition.name in self.partitions:
+            raise surf.misc.McsException(f'PromLayout: duplicate partition {partition.name}')
+        if partition.size <= 0:
+            raise surf.misc.McsException(f'PromLayout: partition {partition.name} is empty')
+        for other in self.partitions.values():
+            if (partition.offset < other.end) and (other.offset < partition.end):
+                raise surf.misc.McsException(f'PromLayout: partition {partition.name} overlaps {other.name}')
+        self.partitions[partition.name] = partition
+
+    def __getitem__(self, name):
+        if name not in self.partitions:
+            raise surf.misc.McsException(f'PromLayout: unknown partition {name!r} (expected one of {", ".join(self.partitions)})')
+        return self.partitions[name]
+
+    def __iter__(self):
+        return iter(sorted(self.partitions.values(), key=lambda p: p.offset))
+
+    def others(self, name):
+        # All the partitions except the named one
+        return [p for p in self if p.name != name]
+
+    def __str__(self):
+        return '\n'.join(str(p) for p in self)
@@ -0,0 +1,469 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM Programmer Module
+#-----------------------------------------------------------------------------
+# Description:
+# Device independent PROM programming engine: erase planning, page
+# scheduling (with blank page skipping), differential programming, bulk
+# verify and timing/metrics collection. The device specific commands are
+# provided by a PromBackend (usually the PROM pr.Device itself).
+#
+# PROM cores with a checksum engine (PromBackend.promCrc) are verified and
+# diffed by comparing the CRC32 of every sector with the CRC32 of the image,
+# only the mismatching sectors are read back.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import hashlib
+import queue
+import threading
+import time
+import zlib
+
+import surf.misc
+
+class PromBackend():
+    # Bytes per program/read burst
+    PAGE_SIZE   = 256
+
+    # Byte address step between erase commands
+    ERASE_SIZE  = 0x10000
+
+    # Largest physical erase block (granularity of the differential mode)
+    SECTOR_SIZE = 0x10000
+
+    # Only complete words of WORD_SIZE bytes are compared on verify
+    WORD_SIZE   = 1
+
+    def promEraseBlock(self, address):
+        # Erase the block that contains the byte address
+        raise NotImplementedError
+
+    def promWritePage(self, address, page):
+        # Program PAGE_SIZE bytes (numpy uint8 array) at the byte address
+        raise NotImplementedError
+
+    def promReadPage(self, address):
+        # Return PAGE_SIZE bytes (numpy uint8 array) read from the byte address
+        raise NotImplementedError
+
+    def promCrc(self, address, length):
+        # CRC32 (zlib.crc32) of length bytes from the byte address computed by
+        # the PROM core, None when the core has no checksum engine
+        return None
+
+    def promBeginProgram(self):
+        # Device setup before a complete erase/write/verify sequence
+        pass
+
+    def promBeginErase(self):
+        pass
+
+    def promBeginWrite(self):
+        pass
+
+    def promBeginRead(self):
+        pass
+
+class PromProgrammer():
+
+    def __init__(self, backend, name='PROM', quiet=False, progress=None):
+        self.backend  = backend
+        self.name     = name
+        self.report   = None
+        # quiet: no status bars or messages (e.g. when programming several PROMs at once)
+        self.quiet    = quiet
+        # progress(nbytes): called as the write and verify status bars advance
+        self.progress = progress
+        self.resetMetrics()
+
+    def resetMetrics(self):
+        self.metrics = {
+            'eraseTime'      : 0.0,
+            'writeTime'      : 0.0,
+            'verifyTime'     : 0.0,
+            'diffTime'       : 0.0,
+            'blocksErased'   : 0,
+            'bytesWritten'   : 0,
+            'bytesSkipped'   : 0,
+            'sectorsChanged' : 0,
+            'sectorsSkipped' : 0,
+            'streamWait'     : 0.0,
+            'readTime'       : 0.0,
+            'bytesRead'      : 0,
+            'sectorsCrc'     : 0,
+            'sectorsReadBack': 0,
+        }
+
+    def program(self, image, diffMode=False, skipBlank=True):
+        # Full (erase/write/verify) or differential programming of an McsImage
+        self.resetMetrics()
+        if diffMode:
+            self.diff(image)
+        else:
+            self.erase(image)
+            self.write(image, skipBlank=skipBlank)
+            self.verifyCrc(image, name='verifyProm()')
+        if not self.quiet:
+            click.secho(self.summary(), fg='green')
+        return self.metrics
+
+    def eraseBlocks(self, image):
+        # Erase addresses of all the ERASE_SIZE aligned blocks covered by the image
+        size   = self.backend.ERASE_SIZE
+        blocks = []
+        for addr, data in image.blocks(size):
+            block = addr - (addr % size)
+            if not blocks or blocks[-1] != block:
+                blocks.append(block)
+        return blocks
+
+    def erase(self, image):
+        start  = time.monotonic()
+        blocks = self.eraseBlocks(image)
+        self.backend.promBeginErase()
+        with self._progressbar('Erasing PROM:  ', iterable=blocks) as bar:
+            for addr in bar:
+                self.backend.promEraseBlock(addr)
+        self.metrics['blocksErased'] += len(blocks)
+        self.metrics['eraseTime']    += time.monotonic() - start
+
+    def write(self, image, skipBlank=True):
+        with self._progressbar('Writing PROM:  ', length=image.size) as bar:
+            self._writePages(image, skipBlank, bar)
+            # Close the status bar
+            bar.update(image.size)
+
+    def programStream(self, source, skipBlank=True, depth=4):
+        # Erase/write/verify the McsImage pieces produced by source() (e.g.
+        # lambda: McsReader.stream(filename, PAGE_SIZE)) while they are being
+        # decoded. The pieces are decoded by a producer thread, at most depth
+        # pieces ahead. source() is called again to stream the image for the verify.
+        #
+        # An erase command can clear a whole SECTOR_SIZE block (e.g. P30 main
+        # blocks, S25FL 256kB sectors), so the erase is done once per sector
+        # when it is first reached: from that address to the end of the sector.
+        self.resetMetrics()
+
+        sectorSize = self.backend.SECTOR_SIZE
+        eraseSize  = self.backend.ERASE_SIZE
+        erased = set()
+        pieces = self._pipeline(source(), depth)
+        try:
+            with self._progressbar('Erase/Write PROM:', iterable=pieces) as bar:
+                for piece in bar:
+                    start  = time.monotonic()
+                    blocks = []
+                    for block in self.eraseBlocks(piece):
+                        sector = block - (block % sectorSize)
+                        if sector not in erased:
+                            erased.add(sector)
+                            blocks.extend(range(block, sector+sectorSize, eraseSize))
+                    if blocks:
+                        self.backend.promBeginErase()
+                        for block in blocks:
+                            self.backend.promEraseBlock(block)
+                    self.metrics['blocksErased'] += len(blocks)
+                    self.metrics['eraseTime']    += time.monotonic() - start
+                    self._writePages(piece, skipBlank)
+        finally:
+            pieces.close()
+
+        start  = time.monotonic()
+        self.report = surf.misc.PromVerifyReport(sectorSize=self.backend.SECTOR_SIZE)
+        pieces = self._pipeline(source(), depth)
+        try:
+            with self._progressbar('Verifying PROM:', iterable=pieces) as bar:
+                for piece in bar:
+                    self._verifyPages(piece)
+        finally:
+            pieces.close()
+        self.metrics['verifyTime'] += time.monotonic() - start
+
+        if not self.quiet:
+            click.secho(self.summary(), fg='green')
+        self.report.check('verifyProm()', echo=not self.quiet)
+        return self.metrics
+
+    def verify(self, image, name='verifyProm()', check=True):
+        start = time.monotonic()
+        self.report = surf.misc.PromVerifyReport(sectorSize=self.backend.SECTOR_SIZE)
+        with self._progressbar('Verifying PROM:', length=image.size) as bar:
+            self._verifyPages(image, bar)
+            # Close the status bar
+            bar.update(image.size)
+        self.metrics['verifyTime'] += time.monotonic() - start
+        if check:
+            self.report.check(name, echo=not self.quiet)
+        return self.report
+
+    def verifyCrc(self, image, name='verifyPromCrc()', check=True):
+        # Same as verify(), but only the sectors with a CRC mismatch are read back
+        start   = time.monotonic()
+        sectors = list(image.blocks(self.backend.SECTOR_SIZE))
+        self.backend.promBeginRead()
+        first   = self._sectorCrc(*sectors[0]) if sectors else None
+        if first is None:
+            # No checksum engine
+            return self.verify(image, name=name, check=check)
+
+        self.report = surf.misc.PromVerifyReport(sectorSize=self.backend.SECTOR_SIZE)
+        failed = []
+        with self._progressbar('Verifying PROM:', length=image.size) as bar:
+            for i, (addr, data) in enumerate(sectors):
+                match = first if (i == 0) else self._sectorCrc(addr, data)
+                if match:
+                    self.report.bytesChecked += len(self._words(data))
+                else:
+                    failed.append((addr, data))
+                bar.update(len(data))
+
+        # Locate the mismatching bytes
+        for addr, data in failed:
+            self.report.compare(addr, self._words(data), self.readRange(addr, len(data)))
+        self.metrics['sectorsReadBack'] += len(failed)
+        self.metrics['verifyTime']      += time.monotonic() - start
+        if check:
+            self.report.check(name, echo=not self.quiet)
+        return self.report
+
+    def diff(self, image):
+        sectorSize = self.backend.SECTOR_SIZE
+
+        # Compare every sector with the file (CRC32 or read back)
+        start   = time.monotonic()
+        sectors = list(image.blocks(sectorSize))
+        changed = []
+        self.backend.promBeginRead()
+        with self._progressbar('Diffing PROM:  ', iterable=sectors) as bar:
+            for addr, data in bar:
+                match = self._sectorCrc(addr, data)
+                if match is None:
+                    match = np.array_equal(self.readRange(addr, len(data)), data)
+                if not match:
+                    changed.append((addr, data))
+        self.metrics['sectorsChanged'] += len(changed)
+        self.metrics['sectorsSkipped'] += len(sectors) - len(changed)
+        self.metrics['diffTime']       += time.monotonic() - start
+        if not self.quiet:
+            click.secho(f'{len(changed)} of {len(sectors)} sector(s) differ, {len(sectors)-len(changed)} sector(s) skipped', fg='green')
+
+        # Erase and write only the changed sectors
+        sub = surf.misc.McsImage(
+            data     = np.concatenate([data for _, data in changed]) if changed else None,
+            segments = [(addr, len(data)) for addr, data in changed],
+        )
+        if changed:
+            self.erase(sub)
+            self.write(sub)
+
+        # Verify the changed sectors
+        return self.verifyCrc(sub, name='diffProm()')
+
+    def _sectorCrc(self, address, data):
+        # True/False if the PROM CRC32 matches the image bytes, None without checksum engine
+        data = self._words(data)
+        crc  = self.backend.promCrc(address, len(data))
+        if crc is None:
+            return None
+        self.metrics['sectorsCrc'] += 1
+        return crc == zlib.crc32(data)
+
+    def _writePages(self, image, skipBlank=True, bar=None):
+        start    = time.monotonic()
+        pageSize = self.backend.PAGE_SIZE
+        # Erased pages (all 0xFF) do not need to be programmed
+        blank    = image.blankPages(pageSize) if skipBlank else np.zeros(image.numPages(pageSize), dtype=bool)
+        self.backend.promBeginWrite()
+        for i, (addr, page) in enumerate(image.pages(pageSize)):
+            if not blank[i]:
+                self.backend.promWritePage(addr, page)
+            # Throttle down printf rate
+            if (bar is not None) and ( (i&0xF) == 0xF ):
+                bar.update(16*pageSize)
+        skipped = min(int(blank.sum())*pageSize, image.size)
+        self.metrics['bytesWritten'] += image.size - skipped
+        self.metrics['bytesSkipped'] += skipped
+        self.metrics['writeTime']    += time.monotonic() - start
+
+    def _verifyPages(self, image, bar=None):
+        pageSize = self.backend.PAGE_SIZE
+        self.backend.promBeginRead()
+        for i, (addr, data) in enumerate(image.chunks(pageSize)):
+            # Compare PROM to file
+            self.report.compare(addr, self._words(data), self.backend.promReadPage(addr))
+            # Throttle down printf rate
+            if (bar is not None) and ( (i&0xF) == 0xF ):
+                bar.update(16*pageSize)
+
+    def _pipeline(self, pieces, depth):
+        # Run the pieces iterator in a producer thread, at most depth pieces ahead
+        fifo = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    fifo.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def producer():
+            try:
+                for piece in pieces:
+                    if not put((piece, None)):
+                        return
+                put((None, None))
+            except Exception as e:
+                put((None, e))
+            finally:
+                if hasattr(pieces, 'close'):
+                    pieces.close()
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        try:
+            while True:
+                # Time spent waiting on the producer (decode not hidden behind the PROM access)
+                start = time.monotonic()
+                piece, err = fifo.get()
+                self.metrics['streamWait'] += time.monotonic() - start
+                if err is not None:
+                    raise err
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            stop.set()
+            thread.join()
+
+    def programPartition(self, image, layout, name, fullGuard=False, skipBlank=True):
+        # Erase/write/verify an image into one partition of a surf.misc.PromLayout
+        # and check that the PROM outside of the partition did not change: the
+        # sectors of the other partitions next to it (or all of them with fullGuard)
+        partition  = layout[name]
+        sectorSize = self.backend.SECTOR_SIZE
+        if (partition.offset % sectorSize) or (partition.size % sectorSize):
+            raise surf.misc.McsException(f'{self.name}: partition {name} is not aligned to the 0x{sectorSize:x} byte erase sectors')
+        image = partition.locate(image)
+
+        guard = []
+        for other in layout.others(name):
+            start = other.offset if fullGuard else max(other.offset, partition.offset-sectorSize)
+            stop  = other.end    if fullGuard else min(other.end,    partition.end+sectorSize)
+            if start < stop:
+                guard.append((other.name, start, stop-start))
+
+        before = self._guardDigests(guard)
+        self.program(image, skipBlank=skipBlank)
+        after  = self._guardDigests(guard)
+
+        touched = [region for region, a, b in zip(guard, before, after) if a != b]
+        if touched:
+            for other, start, length in touched:
+                click.secho(f'{self.name}: partition {other} changed in 0x{start:x}-0x{start+length-1:x}', fg='red')
+            raise surf.misc.McsException(f'{self.name}: programming partition {name} modified other partitions')
+        return self.metrics
+
+    def _guardDigests(self, guard):
+        digests = []
+        self.backend.promBeginRead()
+        for _, start, length in guard:
+            digest = hashlib.sha256()
+            # Read in 1MB steps to bound the memory
+            for offset in range(0, length, 0x100000):
+                digest.update(self.readRange(start+offset, min(0x100000, length-offset)).tobytes())
+            digests.append(digest.digest())
+        return digests
+
+    def dump(self, address, length):
+        # Read back an address range into an McsImage (e.g. for surf.misc.McsWriter)
+        if (address % self.backend.WORD_SIZE) or (length % self.backend.WORD_SIZE):
+            raise surf.misc.McsException(f'{self.name}.dump(): address and length must be multiples of {self.backend.WORD_SIZE} bytes')
+
+        start    = time.monotonic()
+        pageSize = self.backend.PAGE_SIZE
+        data     = np.empty(length, dtype=np.uint8)
+        self.backend.promBeginRead()
+        with self._progressbar('Reading PROM:  ', length=length) as bar:
+            for i, offset in enumerate(range(0, length, pageSize)):
+                count = min(pageSize, length-offset)
+                data[offset:offset+count] = self.backend.promReadPage(address+offset)[:count]
+                # Throttle down printf rate
+                if ( (i&0xF) == 0xF ):
+                    bar.update(16*pageSize)
+            # Close the status bar
+            bar.update(length)
+        self.metrics['bytesRead'] += length
+        self.metrics['readTime']  += time.monotonic() - start
+        return surf.misc.McsImage(data=data, segments=[(address, length)] if length else [])
+
+    def readRange(self, address, length):
+        pageSize = self.backend.PAGE_SIZE
+        return np.concatenate([self.backend.promReadPage(page) for page in range(address, address+length, pageSize)])[:length]
+
+    def summary(self):
+        m = self.metrics
+        lines = [f'{self.name}: erase {m["eraseTime"]:.1f} s ({m["blocksErased"]} blocks), '
+                 f'write {m["writeTime"]:.1f} s (0x{m["bytesWritten"]:x} bytes written, 0x{m["bytesSkipped"]:x} blank bytes skipped), '
+                 f'verify {m["verifyTime"]:.1f} s']
+        if m['sectorsChanged'] or m['sectorsSkipped']:
+            lines.append(f'{self.name}: diff {m["diffTime"]:.1f} s ({m["sectorsChanged"]} sector(s) changed, {m["sectorsSkipped"]} skipped)')
+        if m['sectorsCrc']:
+            lines.append(f'{self.name}: {m["sectorsCrc"]} sector CRC(s) checked, {m["sectorsReadBack"]} sector(s) read back')
+        if m['streamWait']:
+            lines.append(f'{self.name}: waited {m["streamWait"]:.1f} s for the image decode')
+        return '\n'.join(lines)
+
+    def _progressbar(self, label, iterable=None, length=None):
+        bar = None if self.quiet else click.progressbar(iterable=iterable, length=length, label=click.style(label, fg='green'))
+        if (bar is not None) and (self.progress is None):
+            return bar
+        return _ProgressTap(bar, iterable, length, self.progress)
+
+    def _words(self, data):
+        # Only complete words are compared
+        return data[:len(data) - (len(data) % self.backend.WORD_SIZE)]
+
+class _ProgressTap():
+    # Status bar stand-in that forwards the byte progress to a callback
+    # (and to the click status bar, unless quiet)
+
+    def __init__(self, bar, iterable, length, progress):
+        self._bar      = bar
+        self._iterable = iterable
+        self._length   = length
+        self._progress = progress
+        self._pos      = 0
+
+    def __enter__(self):
+        if self._bar is not None:
+            self._bar.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        if self._bar is not None:
+            self._bar.__exit__(*args)
+
+    def __iter__(self):
+        return iter(self._iterable if self._bar is None else self._bar)
+
+    def update(self, n):
+        if self._bar is not None:
+            self._bar.update(n)
+        if (self._length is not None) and (self._progress is not None):
+            # Never report past the end of the bar
+            n = min(n, self._length-self._pos)
+            if n > 0:
+                self._pos += n
+                self._progress(n)
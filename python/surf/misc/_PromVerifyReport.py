@@ -0,0 +1,73 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM Verify Report Module
+#-----------------------------------------------------------------------------
+# Description:
+# Accumulates the result of a bulk PROM verify: mismatch count, the first
+# mismatching addresses and the erase sectors that contain mismatches.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+
+import surf.misc
+
+class PromVerifyReport():
+
+    def __init__(self, sectorSize=0x10000, maxAddrs=16):
+        self.sectorSize   = sectorSize
+        self.maxAddrs     = maxAddrs
+        self.bytesChecked = 0
+        self.count        = 0
+        self.mismatches   = [] # First maxAddrs (address, expected, actual) byte mismatches, actual is None if not read back
+        self.sectors      = set()
+
+    @property
+    def passed(self):
+        return self.count == 0
+
+    def compare(self, address, expected, actual):
+        # Compare a block of image bytes against the bytes read back from the PROM
+        expected = np.asarray(expected, dtype=np.uint8)
+        actual   = np.asarray(actual, dtype=np.uint8)[:len(expected)]
+        self.bytesChecked += len(expected)
+
+        # Fast path for matching blocks
+        if np.array_equal(expected, actual):
+            return True
+
+        # The bytes missing from a short read back are mismatches
+        bad = np.flatnonzero(expected[:len(actual)] != actual)
+        bad = np.concatenate((bad, np.arange(len(actual), len(expected)))).astype(np.int64)
+        if len(bad) == 0:
+            return True
+
+        self.count += len(bad)
+        self.sectors.update(((address + bad) // self.sectorSize * self.sectorSize).tolist())
+        for i in bad[:max(0, self.maxAddrs-len(self.mismatches))].tolist():
+            self.mismatches.append((address+i, int(expected[i]), int(actual[i]) if i < len(actual) else None))
+        return False
+
+    def __str__(self):
+        if self.passed:
+            return f'PROM verify passed: 0x{self.bytesChecked:x} bytes checked'
+        lines = [f'PROM verify failed: {self.count} of 0x{self.bytesChecked:x} bytes mismatch in {len(self.sectors)} sector(s)']
+        lines += [f'    Addr = 0x{addr:x}: MCS = 0x{exp:x} != PROM = ' + ('missing' if act is None else f'0x{act:x}') for addr, exp, act in self.mismatches]
+        if self.count > len(self.mismatches):
+            lines.append(f'    ... {self.count-len(self.mismatches)} more')
+        lines.append('    Sectors: ' + ' '.join(f'0x{sector:x}' for sector in sorted(self.sectors)))
+        return '\n'.join(lines)
+
+    def check(self, name='verifyProm()', echo=True):
+        # Print the report and raise an exception if anything mismatched
+        if not self.passed:
+            if echo:
+                click.secho(f'\n{self}', fg='red')
+            raise surf.misc.McsException(f'{name} Failed\n\n')
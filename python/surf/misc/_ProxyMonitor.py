@@ -0,0 +1,174 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Proxy Monitor Module
+#-----------------------------------------------------------------------------
+# Description:
+# Instrumentation of the software memory proxies (surf.axi.AxiLiteMasterProxy,
+# surf.xilinx.SpiPs): all the downstream transactions of a proxy are served
+# one at a time by its poll worker thread. The monitor keeps track of the
+# worker queue depth, the per transaction type latency (queued to completed)
+# histogram, the Done/status poll count and the error count.
+#
+# The counters are updated by the poll worker (no register access) and are
+# read through the RO LocalVariables. ResetCounters() clears them.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import rogue.interfaces.memory as rim
+import threading
+import bisect
+
+class ProxyMonitor(pr.Device):
+
+    # Latency histogram bin upper edges (seconds), the last bin is unbounded
+    BINS = [100e-6, 1e-3, 10e-3, 100e-3, 1.0]
+
+    TYPES = {
+        rim.Read   : 'Read',
+        rim.Write  : 'Write',
+        rim.Verify : 'Verify',
+    }
+
+    # Bucket of the unsupported transaction types (e.g. Post), errored by the proxies
+    OTHER = 'Other'
+
+    def __init__(self, queue, description='Proxy transaction queue, latency, poll and error counters', **kwargs):
+        super().__init__(description=description, **kwargs)
+        self._queue = queue
+        self._lock  = threading.Lock()
+        self._resetCounters()
+
+        self.add(pr.LocalVariable(
+            name        = 'QueueDepth',
+            description = 'Number of transactions waiting for the poll worker',
+            mode        = 'RO',
+            value       = 0,
+            localGet    = lambda: self._queue.qsize(),
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'QueueDepthMax',
+            description = 'Queue depth high-water mark',
+            mode        = 'RO',
+            value       = 0,
+            localGet    = lambda: self._queueMax,
+        ))
+
+        for typeName in self._typeNames():
+            self._addTypeVariables(typeName)
+
+        self.add(pr.LocalVariable(
+            name        = 'PollCount',
+            description = 'Number of Done/status polls of the proxied transactions',
+            mode        = 'RO',
+            value       = 0,
+            localGet    = lambda: self._polls,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'PollsPerTransaction',
+            description = 'Average number of Done/status polls per transaction',
+            mode        = 'RO',
+            value       = 0.0,
+            disp        = '{:.2f}',
+            localGet    = lambda: self._polls / max(self._total(), 1),
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'ErrorRate',
+            description = 'Fraction of the transactions completed with an error',
+            mode        = 'RO',
+            value       = 0.0,
+            disp        = '{:.6f}',
+            localGet    = lambda: sum(s['errors'] for s in self._stats.values()) / max(self._total(), 1),
+        ))
+
+        @self.command(description='Clear the queue high-water mark, latency, poll and error counters')
+        def ResetCounters():
+            self._resetCounters()
+
+    def _addTypeVariables(self, typeName):
+        self.add(pr.LocalVariable(
+            name        = f'{typeName}Count',
+            description = f'Number of {typeName} transactions',
+            mode        = 'RO',
+            value       = 0,
+            localGet    = lambda: self._stats[typeName]['count'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = f'{typeName}Errors',
+            description = f'Number of {typeName} transactions completed with an error',
+            mode        = 'RO',
+            value       = 0,
+            localGet    = lambda: self._stats[typeName]['errors'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = f'{typeName}LatencyMean',
+            description = f'{typeName} transaction mean latency (queued to completed)',
+            mode        = 'RO',
+            value       = 0.0,
+            units       = 'ms',
+            disp        = '{:.3f}',
+            localGet    = lambda: 1000.0 * self._stats[typeName]['latency'] / max(self._stats[typeName]['count'], 1),
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = f'{typeName}LatencyMax',
+            description = f'{typeName} transaction maximum latency (queued to completed)',
+            mode        = 'RO',
+            value       = 0.0,
+            units       = 'ms',
+            disp        = '{:.3f}',
+            localGet    = lambda: 1000.0 * self._stats[typeName]['latencyMax'],
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = f'{typeName}LatencyHist',
+            description = f'{typeName} transaction latency histogram: <100us, <1ms, <10ms, <100ms, <1s, >=1s',
+            mode        = 'RO',
+            value       = [0] * (len(self.BINS)+1),
+            localGet    = lambda: list(self._stats[typeName]['hist']),
+        ))
+
+    def _resetCounters(self):
+        with self._lock:
+            self._queueMax = 0
+            self._polls    = 0
+            self._stats    = {
+                typeName : {'count': 0, 'errors': 0, 'latency': 0.0, 'latencyMax': 0.0, 'hist': [0] * (len(self.BINS)+1)}
+                for typeName in self._typeNames()
+            }
+
+    def _typeNames(self):
+        return list(self.TYPES.values()) + [self.OTHER]
+
+    def _total(self):
+        return sum(s['count'] for s in self._stats.values())
+
+    def queued(self):
+        # Called by the proxy after a transaction is put in the worker queue
+        depth = self._queue.qsize()
+        if depth > self._queueMax:
+            with self._lock:
+                self._queueMax = max(self._queueMax, depth)
+
+    def completed(self, tranType, latency, polls, error):
+        # Called by the poll worker when a transaction is completed
+        typeName = self.TYPES.get(tranType, self.OTHER)
+        with self._lock:
+            self._polls += polls
+            stats = self._stats[typeName]
+            stats['count']      += 1
+            stats['errors']     += 1 if error else 0
+            stats['latency']    += latency
+            stats['latencyMax']  = max(stats['latencyMax'], latency)
+            stats['hist'][bisect.bisect_right(self.BINS, latency)] += 1
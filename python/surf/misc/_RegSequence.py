@@ -0,0 +1,200 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Register Sequence Module
+#-----------------------------------------------------------------------------
+# Description:
+# Declarative register sequences (e.g. the ADC/DAC initialization routines)
+# and their executor. A sequence is an ordered list of steps:
+#
+#    ('write',   path, value)             write a register (or a variable)
+#    ('update',  path[, mask[, bits]])    write back the current value: (value & mask) | bits
+#    ('delay',   seconds)                 barrier, then wait
+#    ('barrier',)                         wait for all the outstanding writes
+#    ('call',    path)                    barrier, then execute a command
+#
+# A RegSequence can also be used as a step (included in place). The paths are
+# relative to the device the sequence runs on (e.g. 'CH[0].MainDigital_index_0x044').
+#
+# Between two barriers, writes to whole registers at consecutive addresses are
+# coalesced into one block transaction, and variable (bit field) writes are
+# started without waiting for each one to complete. The write order is kept.
+# The variables with verify enabled are read back and compared, as in set().
+#
+# Example:
+#    timing = surf.misc.RegSequence([
+#        ('write', 'GeneralAddr_index_0x012', 0x04),
+#        ('delay', 0.250),
+#    ]).run(device)
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import rogue.interfaces.memory as rim
+import time
+
+# step : (minimum, maximum) number of arguments
+_STEPS = {
+    'write'   : (2, 2),
+    'update'  : (1, 3),
+    'delay'   : (1, 1),
+    'barrier' : (0, 0),
+    'call'    : (1, 1),
+}
+
+class RegSequence():
+
+    def __init__(self, steps):
+        self.steps = []
+        for step in steps:
+            if isinstance(step, RegSequence):
+                self.steps += step.steps
+            elif (not isinstance(step, tuple)) or (not step) or (step[0] not in _STEPS):
+                raise ValueError(f'RegSequence: unknown step {step!r}')
+            elif not (_STEPS[step[0]][0] <= len(step)-1 <= _STEPS[step[0]][1]):
+                raise ValueError(f'RegSequence: wrong number of arguments in step {step!r}')
+            else:
+                self.steps.append(step)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def run(self, device):
+        # Returns the per step timing: [(label, number of writes, seconds), ...]
+        executor = _RegSequenceExecutor(device)
+        for step in self.steps:
+            getattr(executor, step[0])(*step[1:])
+        executor.barrier()
+        return executor.timing
+
+    @staticmethod
+    def summary(timing):
+        lines = [f'{label:48s} {count:4d} {1000.0*elapsed:9.3f} ms' for label, count, elapsed in timing]
+        lines.append(f'{"Total":48s} {sum(t[1] for t in timing):4d} {1000.0*sum(t[2] for t in timing):9.3f} ms')
+        return '\n'.join(lines)
+
+class _RegSequenceExecutor():
+
+    def __init__(self, device):
+        self.device = device
+        self.nodes     = {}
+        self.registers = {}
+        self.timing    = []
+
+        # Coalesced register writes: start offset, [(path, value), ...]
+        self.runOffset = 0
+        self.run       = []
+
+        # Outstanding variable writes: id(block) -> block
+        self.blocks     = {}
+        self.blockStart = 0.0
+        self.blockLabel = ''
+        self.blockCount = 0
+
+    def node(self, path):
+        if path not in self.nodes:
+            node = self.device
+            for name in path.split('.'):
+                node = node.node(name)
+                if node is None:
+                    raise ValueError(f'RegSequence: {self.device.path}.{path} not found')
+            self.nodes[path] = node
+        return self.nodes[path]
+
+    def isRegister(self, var):
+        # Variable covering every used bit of its 32-bit word (e.g. Adc32Rf45 *_index_0xNNN,
+        # Dac38J84 DacReg[n]): it can be written as a whole word, outside of its block
+        if id(var) not in self.registers:
+            self.registers[id(var)] = False
+            if (isinstance(var, pr.RemoteVariable) and (len(var.bitSize) == 1) and
+                    (var.bitOffset == [0]) and (var.bitSize[0] <= 32) and (var.offset % 4 == 0)):
+                lo = 8*var.offset + var.bitSize[0]
+                hi = 8*var.offset + 32
+                self.registers[id(var)] = not any(
+                    (lo < 8*other.offset + bitOffset + bitSize) and (8*other.offset + bitOffset < hi)
+                    for other in var.parent.variables.values()
+                    if isinstance(other, pr.RemoteVariable) and (other is not var)
+                    for bitOffset, bitSize in zip(other.bitOffset, other.bitSize))
+        return self.registers[id(var)]
+
+    def write(self, path, value):
+        var = self.node(path)
+        if self.isRegister(var):
+            offset = var.address - self.device.address
+            if (not self.run) or (offset != self.runOffset + 4*len(self.run)):
+                self.flush()
+                self.runOffset = offset
+            var.set(value, write=False)
+            self.run.append((path, value))
+        else:
+            # Write only the variable bytes of its block, do not wait for the completion
+            self.flush()
+            block = var._block
+            if id(block) in self.blocks:
+                pr.checkTransaction(block)
+            elif not self.blocks:
+                self.blockStart = time.monotonic()
+                self.blockLabel = path
+            var.set(value, write=False)
+            pr.startTransaction(block, type=rim.Write, forceWr=True, variable=var)
+            if var._verify:
+                # Read back and compare, as the variable set() does
+                pr.startTransaction(block, type=rim.Verify, variable=var)
+            self.blocks[id(block)] = block
+            self.blockCount += 1
+
+    def update(self, path, mask=0xFFFF_FFFF, bits=0):
+        self.write(path, (self.node(path).value() & mask) | bits)
+
+    def flush(self):
+        # One block transaction for the coalesced register writes
+        if not self.run:
+            return
+        self.wait()
+        start = time.monotonic()
+        self.device._rawWrite(offset=self.runOffset, data=[value for _, value in self.run])
+
+        # Read back and compare the registers with verify enabled, as the variable set() does
+        if any(self.node(path)._verify for path, _ in self.run):
+            readBack = self.device._rawRead(offset=self.runOffset, numWords=len(self.run))
+            readBack = readBack if isinstance(readBack, list) else [readBack]
+            for (path, value), data in zip(self.run, readBack):
+                var  = self.node(path)
+                mask = (1 << var.bitSize[0]) - 1
+                if var._verify and ((data ^ value) & mask):
+                    raise pr.MemoryError(name=var.path, address=var.address,
+                                         msg=f'Verify error: wrote 0x{value & mask:x}, read 0x{data & mask:x}')
+
+        self.timing.append((f'write {self.run[0][0]}', len(self.run), time.monotonic()-start))
+        self.run = []
+
+    def wait(self):
+        # Wait for the outstanding variable writes
+        if not self.blocks:
+            return
+        for block in self.blocks.values():
+            pr.checkTransaction(block)
+        self.timing.append((f'write {self.blockLabel}', self.blockCount, time.monotonic()-self.blockStart))
+        self.blocks     = {}
+        self.blockCount = 0
+
+    def barrier(self):
+        self.flush()
+        self.wait()
+
+    def delay(self, seconds):
+        self.barrier()
+        start = time.monotonic()
+        time.sleep(seconds)
+        self.timing.append(('delay', 0, time.monotonic()-start))
+
+    def call(self, path):
+        self.barrier()
+        start = time.monotonic()
+        self.node(path)()
+        self.timing.append((f'call {path}', 0, time.monotonic()-start))
@@ -8,3 +8,16 @@
 ## the terms contained in the LICENSE.txt file.
 ##############################################################################
 from surf.misc._McsReader import *
+from surf.misc._McsImage import *
+from surf.misc._McsCache import *
+from surf.misc._McsWriter import *
+from surf.misc._PromVerifyReport import *
+from surf.misc._FlashReadyWait import *
+from surf.misc._PromProgrammer import *
+from surf.misc._PromLayout import *
+from surf.misc._PromFleetProgrammer import *
+from surf.misc._ClockConfig import *
+from surf.misc._RegSequence import *
+from surf.misc._MemReplay import *
+from surf.misc._ProxyMonitor import *
+from surf.misc._PollGroup import *
@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 import click
 import datetime
@@ -424,6 +425,9 @@ class Pgp4AxiLRxStatus(pr.Device):
             linkedGet    = getBitErrorRate,
         ))
 
+        # Status counters polled with block reads
+        surf.misc.PollGroupLayout(self).apply()
+
 class Pgp4AxiLTxStatus(pr.Device):
     def __init__(self,
                  description     = "TX Status of PGP 4 link",
@@ -539,6 +543,9 @@ class Pgp4AxiLTxStatus(pr.Device):
             disp         = '{:0.3f}',
         ))
 
+        # Status counters polled with block reads
+        surf.misc.PollGroupLayout(self).apply()
+
 class Pgp4AxiL(pr.Device):
     def __init__(self,
                  description     = "Configuration and status a PGP 4 link",
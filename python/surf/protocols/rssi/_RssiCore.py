@@ -16,6 +16,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 class RssiCore(pr.Device):
     def __init__(self, **kwargs):
@@ -537,3 +538,6 @@ class RssiCore(pr.Device):
         def C_InjectFault():
             self.InjectFault.set(1)
             self.InjectFault.set(0)
+
+        # Status counters polled with one block read
+        surf.misc.PollGroupLayout(self).apply()
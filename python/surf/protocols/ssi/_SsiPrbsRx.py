@@ -12,6 +12,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 
 class SsiPrbsRx(pr.Device):
     def __init__(self,
@@ -228,5 +229,8 @@ class SsiPrbsRx(pr.Device):
             function     = pr.BaseCommand.touchOne
         ))
 
+        # Status counters polled with 3 block reads (0x14 is the legacy errBitStrbCnt register, reads zero)
+        surf.misc.PollGroupLayout(self, ranges=[(0x00, 0x28), (0x70, 0x0C), (0x80, 0x08)]).apply()
+
     def countReset(self):
         self.CountReset()
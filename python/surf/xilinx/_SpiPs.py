@@ -25,21 +25,39 @@
 #   ADDR[33:02] = SPI Address available
 #   ADDR[01:00] = Unused (32-bit word alignment)
 #-----------------------------------------------------------------------------
+# autoIncrement: SPI Device Indexes of the parts with address auto-increment.
+# Queued transactions of the same type to consecutive addresses of these
+# parts are merged into one streaming transfer (address bytes sent once).
+#-----------------------------------------------------------------------------
 
 import pyrogue as pr
 import rogue
+import surf.misc
 
+import collections
+import contextlib
 import threading
 import time
 import queue
 
 class _Regs(pr.Device):
+
+    # TX/RX FIFO depth (bytes), a transfer chunk is limited by the 7-bit RX watermark
+    FIFO_DEPTH = 128
+    FIFO_CHUNK = 127
+
     def __init__(self,
-            pollPeriod = 0.0,
+            pollPeriod    = 0.0,
+            timeout       = 1.0,
+            autoIncrement = (),
             **kwargs):
         super().__init__(**kwargs)
 
-        self._pollPeriod = pollPeriod
+        self._pollPeriod    = pollPeriod
+        self._timeout       = timeout
+        self._autoIncrement = frozenset(autoIncrement)
+        self._monitor       = None
+        self._polls         = 0
 
         self._queue = queue.Queue()
         self._pollThread = threading.Thread(target=self._pollWorker)
@@ -396,80 +414,153 @@ class _Regs(pr.Device):
         # print (f'{self.path}.ClearTxFifo()')
 
         # Clear TXFIFO and check if TX_FIFO_not_full (TX_FIFO_not_full = 0x04)
+        deadline = time.monotonic() + self._timeout
         while ( (self.SR.get(read=True) & 0x04) != 0x04 ):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{self.path}: TX FIFO clear timeout ({self._timeout} s)')
             self.SR.set(0x7F)
 
     def ClearRxFifo(self):
         # print (f'{self.path}.ClearRxFifo()')
 
         # Clear RXFIFO and check if RX_FIFO_not_empty (RX_FIFO_not_empty = 0x10)
+        deadline = time.monotonic() + self._timeout
         while ( (self.SR.get(read=True) & 0x10) != 0 ):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{self.path}: RX FIFO clear timeout ({self._timeout} s)')
             self.RXD.get(read=True)
             self.SR.set(0x7F)
-        for i in range(128):
-            self.RXD.get(read=True)
+        self._fifoRead(self.FIFO_DEPTH)
 
     ####################################################################
 
     def transfer(self, csValue, txBuffer, byteSize):
 
-        # Set the RX watermark
-        if self.RXWR.value() != byteSize:
-            self.RXWR.set(byteSize)
-
         # Set CS
         if self.CS.value() != csValue:
             self.CS.set(csValue)
 
-        # Load the TX FIFO
-        self.Man_start_en.set(1)
-        for i in range(byteSize):
-            self.TXD.set(txBuffer[i])
+        # Transfers larger than the FIFO are split in FIFO sized chunks (CS kept asserted)
+        rxBuffer = []
+        for start in range(0, byteSize, self.FIFO_CHUNK):
+            size = min(self.FIFO_CHUNK, byteSize-start)
 
-        # Start the transfer
-        self.Manual_CS.set(1) # Force manual due to observed CS glitch in waveforms when AUTO CS
-        self.Man_start_en.set(0)
+            # Set the RX watermark
+            if self.RXWR.value() != size:
+                self.RXWR.set(size)
 
-        # Create the RX buffer and clear the "Rx FIFO Not Empty" flag
-        rxBuffer = [None for x in range(byteSize)]
-        # self.SR.set(0x10)
+            # Load the TX FIFO
+            self.Man_start_en.set(1)
+            self._fifoWrite(txBuffer[start:start+size])
 
-        # Wait for the buffer to fill out: Rx FIFO Not Empty = 0x10
-        while ( (self.SR.get(read=True) & 0x10) == 0 ):
-            time.sleep(self._pollPeriod)
+            # Start the transfer
+            if start == 0:
+                self.Manual_CS.set(1) # Force manual due to observed CS glitch in waveforms when AUTO CS
+            self.Man_start_en.set(0)
 
-        # Read the RX FIFO
-        self.Manual_CS.set(0) # release manual due to observed CS glitch in waveforms when AUTO CS
-        for i in range(byteSize):
-            rxBuffer[i] = self.RXD.get(read=True)
+            # Wait for the buffer to fill out: Rx FIFO Not Empty = 0x10
+            try:
+                self._waitRxFifo()
+            except RuntimeError:
+                self.Manual_CS.set(0)
+                raise
+
+            # Read the RX FIFO
+            if start+size == byteSize:
+                self.Manual_CS.set(0) # release manual due to observed CS glitch in waveforms when AUTO CS
+            rxBuffer += self._fifoRead(size)
 
         # Return the RX buffer
         return rxBuffer
 
+    def _waitRxFifo(self):
+        # Start with back-to-back polls and back off up to pollPeriod (1 ms if zero)
+        delay    = 0.0
+        maxDelay = self._pollPeriod if self._pollPeriod > 0.0 else 1.0e-3
+        deadline = time.monotonic() + self._timeout
+        self._polls += 1
+        while ( (self.SR.get(read=True) & 0x10) == 0 ):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{self.path}: SPI transfer timeout ({self._timeout} s)')
+            time.sleep(delay)
+            delay = min(max(2.0*delay, 10.0e-6), maxDelay)
+            self._polls += 1
+
+    def _fifoWrite(self, data):
+        # TXD writes issued back-to-back (one FIFO register, no address increment) and waited for once
+        buffers = [bytearray(value.to_bytes(4, 'little', signed=False)) for value in data]
+        for buffer in buffers:
+            self._reqTransaction(self.offset | 0x1C, buffer, 4, 0, rogue.interfaces.memory.Write)
+        self._fifoWait()
+
+    def _fifoRead(self, size):
+        # RXD reads issued back-to-back and waited for once
+        buffers = [bytearray(4) for i in range(size)]
+        for buffer in buffers:
+            self._reqTransaction(self.offset | 0x20, buffer, 4, 0, rogue.interfaces.memory.Read)
+        self._fifoWait()
+        return [buffer[0] for buffer in buffers]
+
+    def _fifoWait(self):
+        self._waitTransaction(0)
+        error = self._getError()
+        if error:
+            self._clearError()
+            raise RuntimeError(f'{self.path}: FIFO access failed: {error}')
+
     ####################################################################
 
     def proxyTransaction(self, transaction):
-        self._queue.put(transaction)
+        self._queue.put((time.monotonic(), transaction))
+        if self._monitor is not None:
+            self._monitor.queued()
+
+    def _decode(self, transaction):
+        # Returns (devIdx, addrBytes, dataBytes, SPI address, isRead), isRead is None for unsupported types
+        virtualAddress = transaction.address()
+        if transaction.type() == rogue.interfaces.memory.Write:
+            isRead = False
+        elif (transaction.type() == rogue.interfaces.memory.Read) or (transaction.type() == rogue.interfaces.memory.Verify):
+            isRead = True
+        else:
+            isRead = None
+        return ((virtualAddress >> 48) & 0x7, (virtualAddress >> 44) & 0x7, (virtualAddress >> 40) & 0x7,
+                (virtualAddress >> 2) & 0xFFFFFFFF, isRead)
 
     def _pollWorker(self):
+        backlog = collections.deque()
         while True:
             #print('Main thread loop start')
-            transaction = self._queue.get()
-            if transaction is None:
+            item = backlog.popleft() if backlog else self._queue.get()
+            if item is None:
                 return
-
-            with self._memLock, transaction.lock():
+            items = [item]
+            devIdx, addrBytes, dataBytes, spiAddr, isRead = self._decode(item[1])
+
+            # Coalesce the queued transactions to the next addresses of an auto-increment device
+            # into one streaming transfer (address bytes sent once, limited to one FIFO chunk)
+            if (devIdx in self._autoIncrement) and (isRead is not None) and (dataBytes != 0):
+                while (not backlog) and (addrBytes + (len(items)+1)*dataBytes <= self.FIFO_CHUNK):
+                    try:
+                        nextItem = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if (nextItem is None) or (self._decode(nextItem[1]) != (devIdx, addrBytes, dataBytes, spiAddr+len(items), isRead)):
+                        backlog.append(nextItem)
+                    else:
+                        items.append(nextItem)
+
+            self._polls = 0
+            with self._memLock, contextlib.ExitStack() as stack:
+                for queued, transaction in items:
+                    stack.enter_context(transaction.lock())
                 #tranId = transaction.id()
                 #print(f'Woke the pollWorker with id: {tranId}')
 
-                # Get the transaction virtual address
-                virtualAddress = transaction.address()
+                # Get the first transaction virtual address
+                virtualAddress = items[0][1].address()
 
-                # Decode the  virtual address metadata
-                devIdx    = (virtualAddress >> 48) & 0x7
-                addrBytes = (virtualAddress >> 44) & 0x7
-                dataBytes = (virtualAddress >> 40) & 0x7
-                byteSize  = addrBytes + dataBytes
+                byteSize  = addrBytes + len(items)*dataBytes
                 txBuffer  = [0x00 for x in range(byteSize)]
 
                 # Fill the address bytes
@@ -477,20 +568,21 @@ class _Regs(pr.Device):
                     txBuffer[i] = ( virtualAddress >> ( 8*(addrBytes-1-i) )+2 ) & 0xFF
 
                 # Check for write transaction
-                if transaction.type() == rogue.interfaces.memory.Write:
-                    # Convert data bytes to int and write data to proxy register
-                    dataBa = bytearray(4)
-                    transaction.getData(dataBa, 0)
-                    data = int.from_bytes(dataBa, 'little', signed=False)
+                if isRead is False:
+                    for k, (queued, transaction) in enumerate(items):
+                        # Convert data bytes to int and write data to proxy register
+                        dataBa = bytearray(4)
+                        transaction.getData(dataBa, 0)
+                        data = int.from_bytes(dataBa, 'little', signed=False)
 
-                    # Fill the data bytes
-                    for i in range(dataBytes):
-                        txBuffer[i+addrBytes] = ( data >> ( 8*(dataBytes-1-i) ) ) & 0xFF
+                        # Fill the data bytes
+                        for i in range(dataBytes):
+                            txBuffer[i+addrBytes+k*dataBytes] = ( data >> ( 8*(dataBytes-1-i) ) ) & 0xFF
 
                     #print(f'Started write transaction: {tranId}')
 
                 # Check for read or verify transaction
-                elif (transaction.type() == rogue.interfaces.memory.Read) or (transaction.type() == rogue.interfaces.memory.Verify):
+                elif isRead is True:
 
                     # Set the R/W bit
                     txBuffer[0] |= 0x80
@@ -499,38 +591,59 @@ class _Regs(pr.Device):
                 else:
                     # Post transactions not allowed
                     transaction.error(f'Unsupported transaction type {transaction.type()}')
-                    return
+                    self._completed(transaction, queued, True)
+                    continue
 
                 # Kick off the proxy transaction
-                rxBuffer = self.transfer((0xF ^ 0x1 <<devIdx), txBuffer, byteSize)
+                try:
+                    rxBuffer = self.transfer((0xF ^ 0x1 <<devIdx), txBuffer, byteSize)
 
-                # Check the error flag
-                resp = (self.SR.get(read=True) & 0x2)
+                    # Check the error flag
+                    resp = (self.SR.get(read=True) & 0x2)
 
-                # Clear status register by writing 1 to the write to clear bits
-                self.SR.set(0x7F)
+                    # Clear status register by writing 1 to the write to clear bits
+                    self.SR.set(0x7F)
 
-                #print(f'Resp: {resp}')
-                if resp != 0:
-                    self.ResetHw()
-                    transaction.error(f'AXIL tranaction failed with RESP: {resp}')
+                    #print(f'Resp: {resp}')
+                    error = None if resp == 0 else f'AXIL tranaction failed with RESP: {resp}'
+                except Exception as e:
+                    error = str(e)
 
-                # Finish the transaction
-                elif transaction.type() == rogue.interfaces.memory.Write:
-                    transaction.done()
+                if error is not None:
+                    # The reset goes over the same bus: its failure must not stop the worker
+                    try:
+                        self.ResetHw()
+                    except Exception as e:
+                        error = f'{error} (ResetHw failed: {e})'
 
-                else:
-                    # parse the rxBuffer
-                    data = 0x0
-                    for i in range(dataBytes):
-                        data = (data << 8) | rxBuffer[i+addrBytes]
+                # Split the result back into the original transactions
+                for k, (queued, transaction) in enumerate(items):
+                    if error is not None:
+                        transaction.error(error)
+
+                    # Finish the transaction
+                    elif isRead is False:
+                        transaction.done()
+
+                    else:
+                        # parse the rxBuffer
+                        data = 0x0
+                        for i in range(dataBytes):
+                            data = (data << 8) | rxBuffer[i+addrBytes+k*dataBytes]
 
-                    #print(f'Got read data: {data:x}')
-                    dataBa = bytearray(data.to_bytes(4, 'little', signed=False))
+                        #print(f'Got read data: {data:x}')
+                        dataBa = bytearray(data.to_bytes(4, 'little', signed=False))
 
-                    #print(dataBa)
-                    transaction.setData(dataBa, 0)
-                    transaction.done()
+                        #print(dataBa)
+                        transaction.setData(dataBa, 0)
+                        transaction.done()
+
+                    self._completed(transaction, queued, error is not None)
+                    self._polls = 0
+
+    def _completed(self, transaction, queued, error):
+        if self._monitor is not None:
+            self._monitor.completed(transaction.type(), time.monotonic()-queued, self._polls, error)
 
     def _stop(self):
         self._queue.put(None)
@@ -550,20 +663,31 @@ class SpiPs(pr.Device):
 
     def __init__(self,
             hidden     = True,
-            pollPeriod = 0.0,
+            pollPeriod    = 0.0,
+            timeout       = 1.0,
+            autoIncrement = (),
             **kwargs):
         super().__init__(hidden=hidden, **kwargs)
 
         self.add(_Regs(
-            name       = 'Regs',
-            memBase    = self,
-            offset     = 0x0000,
-            hidden     = hidden,
-            pollPeriod = pollPeriod,
-            expand     = False,
+            name          = 'Regs',
+            memBase       = self,
+            offset        = 0x0000,
+            hidden        = hidden,
+            pollPeriod    = pollPeriod,
+            timeout       = timeout,
+            autoIncrement = autoIncrement,
+            expand        = False,
         ))
         self.proxy = _ProxySlave(self.Regs)
 
+        self.add(surf.misc.ProxyMonitor(
+            name   = 'Monitor',
+            queue  = self.Regs._queue,
+            expand = False,
+        ))
+        self.Regs._monitor = self.Monitor
+
     def add(self, node):
         pr.Node.add(self, node)
 
@@ -11,8 +11,16 @@
 # the terms contained in the LICENSE.txt file.
 #-----------------------------------------------------------------------------
 
-import csv
 import argparse
+import importlib.util
+import os
+
+# Load the surf.misc.ClockConfig compiler module alone: importing the surf
+# package would require rogue, which a firmware build host may not have
+_spec = importlib.util.spec_from_file_location(
+    '_ClockConfig', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python', 'surf', 'misc', '_ClockConfig.py'))
+_ClockConfig = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_ClockConfig)
 
 #################################################################
 
@@ -40,45 +48,5 @@ args = parser.parse_args()
 
 #################################################################
 
-# Init the counter
-cnt = 0
-
-# Open the output file
-ofd = open(args.memPath, 'w')
-
-# Power down during the configuration load
-ofd.write('001E' + '01' + ',')
-cnt = cnt + 1
-
-# Open the .CSV file
-with open(args.csvFile) as csvfile:
-    reader = csv.reader(csvfile, delimiter=',', quoting=csv.QUOTE_NONE)
-
-    # Loop through the rows in the CSV file
-    for row in reader:
-        if (row[0]!='Address'):
-            offset = row[0]
-            data   = row[1]
-            ofd.write(offset[2:] + data[2:] + ',')
-            cnt = cnt + 1
-
-# Execute the Page5.BW_UPDATE_PLL command
-ofd.write('0514' + '01' + ',')
-ofd.write('0514' + '00' + ',')
-cnt = cnt + 2
-
-# Power Up after the configuration load
-ofd.write('001E' + '00' + ',')
-cnt = cnt + 1
-
-# Clear the internal error flags
-ofd.write('0011' + '01' + ',')
-cnt = cnt + 1
-
-# Fill the reset of the BRAM with zeros
-for i in range(1024-cnt):
-    ofd.write('0000' + '00' + ',')
-    cnt = cnt + 1
-
-# Close the file
-ofd.close()
+# Compile the .CSV file (configuration preamble/postamble and zero fill included)
+_ClockConfig.ClockConfig.open(args.csvFile, 'Si5345', cache=False).writeMem(args.memPath)
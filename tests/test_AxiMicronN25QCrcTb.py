@@ -0,0 +1,191 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+# dut_tb
+import logging
+import random
+import zlib
+import cocotb
+from cocotb.clock      import Clock
+from cocotb.triggers   import RisingEdge, FallingEdge, First
+from cocotbext.axi     import AxiLiteBus, AxiLiteMaster, AxiResp
+from cocotb.regression import TestFactory
+
+# test_AxiMicronN25QCrcTb
+from cocotb_test.simulator import run
+import pytest
+import glob
+import os
+
+class SpiFlash:
+    # Minimal SPI (mode 0) FLASH model: READ (0x03) and 4-byte READ (0x13) commands only
+    def __init__(self, dut, size):
+        self.dut    = dut
+        self.memory = bytes(random.getrandbits(8) for _ in range(size))
+        self.dut.miso.setimmediatevalue(0)
+        cocotb.start_soon(self._run())
+
+    async def _shiftIn(self, nbytes):
+        value = 0
+        for _ in range(8*nbytes):
+            await RisingEdge(self.dut.sck)
+            value = (value << 1) | int(self.dut.mosi.value)
+        return value
+
+    async def _run(self):
+        while True:
+            await FallingEdge(self.dut.csL)
+            cmd = await self._shiftIn(1)
+            if cmd not in (0x03, 0x13):
+                continue
+            address = await self._shiftIn(4 if cmd == 0x13 else 3)
+
+            # Shift out the data (MSB first) on the falling edges until the chip select is released
+            while True:
+                byte = self.memory[address % len(self.memory)]
+                for bit in range(7, -1, -1):
+                    await First(FallingEdge(self.dut.sck), RisingEdge(self.dut.csL))
+                    if self.dut.csL.value == 1:
+                        break
+                    self.dut.miso.value = (byte >> bit) & 0x1
+                else:
+                    address += 1
+                    continue
+                break
+
+class TB:
+    def __init__(self, dut):
+
+        # Pointer to DUT object
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.DEBUG)
+
+        # Start clock (100 MHz) in a separate thread
+        cocotb.start_soon(Clock(dut.S_AXI_ACLK, 10.0, units='ns').start())
+
+        # Create the AXI-Lite Master
+        self.axil = AxiLiteMaster(
+            bus   = AxiLiteBus.from_prefix(dut, 'S_AXI'),
+            clock = dut.S_AXI_ACLK,
+            reset = dut.S_AXI_ARESETN,
+            reset_active_level=False)
+
+        # Create the SPI FLASH model
+        self.flash = SpiFlash(dut, 0x1000)
+
+    async def cycle_reset(self):
+        self.dut.S_AXI_ARESETN.setimmediatevalue(0)
+        await RisingEdge(self.dut.S_AXI_ACLK)
+        await RisingEdge(self.dut.S_AXI_ACLK)
+        self.dut.S_AXI_ARESETN.value = 0
+        await RisingEdge(self.dut.S_AXI_ACLK)
+        await RisingEdge(self.dut.S_AXI_ACLK)
+        self.dut.S_AXI_ARESETN.value = 1
+        await RisingEdge(self.dut.S_AXI_ACLK)
+        await RisingEdge(self.dut.S_AXI_ACLK)
+
+    async def write(self, address, value):
+        wrTxn = await self.axil.write(address=address, data=value.to_bytes(4, 'little'))
+        assert wrTxn.resp == AxiResp.OKAY
+
+    async def read(self, address):
+        rdTxn = await self.axil.read(address=address, length=4)
+        assert rdTxn.resp == AxiResp.OKAY
+        return int.from_bytes(rdTxn.data, 'little')
+
+    async def crc(self, address, size, addr32BitMode):
+        await self.write(0x04, int(addr32BitMode))
+        await self.write(0x08, address)
+        await self.write(0x10, size)
+        assert await self.read(0x10) == size
+        # Start the checksum engine with the READ command
+        await self.write(0x14, (0x13 if addr32BitMode else 0x03) << 16)
+        # The result read is held off until the engine is done
+        return await self.read(0x18)
+
+async def dut_tb(dut):
+
+    # Initialize the DUT
+    tb = TB(dut)
+
+    # Reset DUT
+    await tb.cycle_reset()
+
+    for addr32BitMode in [False, True]:
+        for address, size in [(0x000, 1), (0x123, 255), (0x800, 0x400), (0x000, 0)]:
+            crc = await tb.crc(address, size, addr32BitMode)
+            expected = zlib.crc32(tb.flash.memory[address:address+size])
+            tb.log.info(f'addr32BitMode={addr32BitMode} address=0x{address:x} size=0x{size:x} crc=0x{crc:08x} expected=0x{expected:08x}')
+            assert crc == expected
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(dut_tb)
+    factory.generate_tests()
+
+tests_dir = os.path.dirname(__file__)
+tests_module = 'AxiMicronN25QCrcTb'
+
+@pytest.mark.parametrize(
+    "parameters", [
+        None
+    ])
+def test_AxiMicronN25QCrcTb(parameters):
+
+    # https://github.com/themperek/cocotb-test#arguments-for-simulatorrun
+    # https://github.com/themperek/cocotb-test/blob/master/cocotb_test/simulator.py
+    run(
+        # top level HDL
+        toplevel = f'surf.{tests_module}'.lower(),
+
+        # name of the file that contains @cocotb.test() -- this file
+        # https://docs.cocotb.org/en/stable/building.html?#envvar-MODULE
+        module = f'test_{tests_module}',
+
+        # https://docs.cocotb.org/en/stable/building.html?#var-TOPLEVEL_LANG
+        toplevel_lang = 'vhdl',
+
+        # VHDL source files to include.
+        # Can be specified as a list or as a dict of lists with the library name as key,
+        # if the simulator supports named libraries.
+        vhdl_sources = {
+            'surf'   : glob.glob(f'{tests_dir}/../build/SRC_VHDL/surf/*'),
+            'ruckus' : glob.glob(f'{tests_dir}/../build/SRC_VHDL/ruckus/*'),
+        },
+
+        # A dictionary of top-level parameters/generics.
+        parameters = parameters,
+
+        # The directory used to compile the tests. (default: sim_build)
+        sim_build = f'{tests_dir}/sim_build/{tests_module}',
+
+        # A dictionary of extra environment variables set in simulator process.
+        extra_env=parameters,
+
+        # Select a simulator
+        simulator="ghdl",
+
+        # VHDL compile arguments
+        vhdl_compile_args = [
+            '-fsynopsys',       # use of synopsys package "std_logic_arith" needs the -fsynopsys option
+            '-frelaxed-rules',  # -frelaxed-rules option to allow IP integrator attributes
+            '-fexplicit',       # When two operators are overloaded, give preference to the explicit declaration (-fexplicit)
+            '-Wno-elaboration', # Hide warnings about functions called before elaborated of its body
+            '-Wno-hide',        # Declaration of "axiconfig" hides function in AxiPkg.vhd
+            '-Wno-specs',       # Warning related to IP skim layers attributes
+            '-O2',              # Optimize the generated simulation code for speed (no change to VHDL semantics)
+        ],
+
+        ########################################################################
+        # Dump waveform to file ($ gtkwave sim_build/path/To/{tests_module}.ghw)
+        ########################################################################
+        # sim_args =[f'--wave={tests_module}.ghw'],
+    )